@@ -1,32 +1,69 @@
-from flask import Flask, jsonify, request
+from flask import Blueprint, Flask, Response, jsonify, request, stream_with_context, url_for
 from flask_cors import CORS
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
-from concurrent.futures import ThreadPoolExecutor
 from config import Config
 from utils.validation import validate_moodcheck_request
 from utils.logger import logger
-from services.vision import extract_mood
-from services.shopping import search_all_queries, detect_budget_from_prompt, detect_item_type_from_prompt, filter_by_item_type
-from services.trends import get_trend_summary
+from utils.cache import TieredCache, cache_stats
+from utils.executors import PoolSaturated, get_pool, pool_stats
+from utils.images import image_prep_stats
+from utils.uploads import DecompressRequestMiddleware
+from services.product_sessions import create_session, get_session, next_page, seen_filter
+from services.trends import get_related_queries, get_trend_summaries, get_trend_summary, start_trend_table
+from services.trend_store import store_stats
+from services.query_planner import planner_stats
+from services.trend_table import table_stats
+from services.pipeline import run_moodcheck, MoodcheckError
+from services.jobs import IdempotencyKeyReused, get_job, submit_job
+import hmac
+import json
+import queue
 import time
+from typing import Optional
 
-# Validate config on startup
-Config.validate()
+api = Blueprint('api', __name__)
 
-app = Flask(__name__)
-CORS(app)
-
-# Rate limiting
+# Rate limiting (bound to each app in create_app)
 limiter = Limiter(
     get_remote_address,
-    app=app,
     default_limits=["100 per day", "20 per hour"],
     storage_uri="memory://"
 )
 
 
-@app.route('/health', methods=['GET'])
+def create_app(config: Optional[dict] = None) -> Flask:
+    """
+    Build the Flask app.
+
+    Used by gunicorn (see gunicorn.conf.py for the serving modes), the
+    tests and the load benchmark.
+
+    Args:
+        config: Optional Flask config overrides (e.g. {'RATELIMIT_ENABLED': False})
+
+    Returns:
+        Configured Flask app
+    """
+    # Validate config on startup
+    Config.validate()
+
+    app = Flask(__name__)
+    # Bodies are size-checked as they stream in (multipart parts, JSON and
+    # gzip/deflate-encoded uploads alike) rather than after buffering
+    app.config['MAX_CONTENT_LENGTH'] = int(Config.MAX_REQUEST_MB * 1024 * 1024)
+    if config:
+        app.config.update(config)
+
+    CORS(app)
+    limiter.init_app(app)
+    app.register_blueprint(api)
+
+    app.wsgi_app = DecompressRequestMiddleware(app.wsgi_app, app.config['MAX_CONTENT_LENGTH'])
+    return app
+
+
+@api.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint."""
     return jsonify({
@@ -35,7 +72,47 @@ def health_check():
     })
 
 
-@app.route('/api/trend/<keyword>', methods=['GET'])
+@api.route('/api/metrics', methods=['GET'])
+@limiter.limit("30 per minute")
+def metrics():
+    """
+    Operational counters for sizing caches and worker pools.
+
+    Disabled (404) unless METRICS_TOKEN is set; requests must then send
+    "Authorization: Bearer <METRICS_TOKEN>" (401 otherwise).
+
+    Returns:
+        - caches: per-cache hits, misses, evictions, hit_rate, size
+        - pools: per-pool queue depth, wait times and saturation
+        - image_prep: bytes and estimated vision tokens saved by downscaling
+        - trend_table: background refresher state (last refresh, failures, size)
+        - trend_store: keywords and date range in the offline trend history
+    """
+    if not Config.METRICS_TOKEN:
+        return jsonify({
+            'success': False,
+            'error': 'Not found'
+        }), 404
+
+    expected = f'Bearer {Config.METRICS_TOKEN}'.encode()
+    if not hmac.compare_digest(request.headers.get('Authorization', '').encode(), expected):
+        return jsonify({
+            'success': False,
+            'error': 'Unauthorized'
+        }), 401
+
+    return jsonify({
+        'success': True,
+        'caches': cache_stats(),
+        'pools': pool_stats(),
+        'image_prep': image_prep_stats(),
+        'trend_table': table_stats(),
+        'trend_store': store_stats(),
+        'query_planner': planner_stats()
+    })
+
+
+@api.route('/api/trend/<keyword>', methods=['GET'])
 @limiter.limit("30 per minute")
 def get_trend(keyword):
     """
@@ -56,282 +133,362 @@ def get_trend(keyword):
     })
 
 
-@app.route('/api/moodcheck', methods=['POST'])
+@api.route('/api/trend/<keyword>/related', methods=['GET'])
+@limiter.limit("30 per minute")
+def get_related(keyword):
+    """
+    Get related searches for an aesthetic/keyword (rising first, then top).
+
+    Served from a long-lived cache that scripts/precompute_related.py fills
+    for the known aesthetics; other keywords are fetched on first request.
+
+    Returns:
+        - keyword: the normalized keyword
+        - related: up to 5 related search terms
+    """
+    logger.info(f"Related trends request for: {keyword}")
+    return jsonify({
+        'success': True,
+        'keyword': keyword.lower().strip(),
+        'related': get_related_queries(keyword)
+    })
+
+
+@api.route('/api/trends', methods=['GET'])
+@limiter.limit("30 per minute")
+def get_trends():
+    """
+    Get trend summaries for several aesthetics in one call.
+
+    Query params:
+        - k: comma-separated keywords (may also be repeated), at most
+          TRENDS_BATCH_MAX
+
+    Returns:
+        - trends: one summary per keyword, in request order, each the same
+          as /api/trend/<keyword> returns for it
+    """
+    keywords = [kw.strip() for param in request.args.getlist('k') for kw in param.split(',') if kw.strip()]
+    if not keywords:
+        return jsonify({
+            'success': False,
+            'error': 'At least one keyword is required (?k=a,b,c)'
+        }), 400
+    if len(keywords) > Config.TRENDS_BATCH_MAX:
+        return jsonify({
+            'success': False,
+            'error': f'At most {Config.TRENDS_BATCH_MAX} keywords per request'
+        }), 400
+
+    logger.info(f"Trend batch request for {len(keywords)} keywords")
+    return jsonify({
+        'success': True,
+        'trends': get_trend_summaries(keywords)
+    })
+
+
+@api.route('/api/moodcheck', methods=['POST'])
 @limiter.limit("10 per minute")
 def moodcheck():
     """
     Main endpoint: Analyze images and return mood + products.
 
-    Request body:
+    Request body (JSON):
         - images: array of base64 encoded images (1-5)
         - prompt: optional string modifier (max 200 chars)
 
+    Or multipart/form-data with raw image bytes in one or more `images`
+    file parts and `prompt` / `max_products` as form fields. Either body
+    may be sent gzip- or deflate-compressed (Content-Encoding).
+
+    Streaming: send `Accept: text/event-stream` (or `?stream=1`) to receive
+    Server-Sent Events as each stage finishes: vibe, trend, products
+    (provisional), coherence (swaps patch), then done (full response).
+
     Response:
         - success: boolean
         - vibe: mood profile object
         - products: array of product objects
         - search_queries_used: array of queries used
     """
-    start_time = time.time()
+    params, error = load_moodcheck_params()
+    if error is not None:
+        return error
+    images, prompt, max_products, decoded = params
 
+    if wants_event_stream():
+        return stream_moodcheck(images, prompt, max_products, decoded=decoded)
+
+    try:
+        response = run_moodcheck(images, prompt, max_products=max_products, decoded=decoded)
+    except MoodcheckError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+    return jsonify(response), 200
+
+
+@api.route('/api/moodcheck/jobs', methods=['POST'])
+@limiter.limit("10 per minute")
+def create_moodcheck_job():
+    """
+    Start a moodcheck in the background and return its job id immediately.
+
+    Takes the same body as /api/moodcheck. Send an `Idempotency-Key` header
+    to make retries safe: a repeat request with the same key gets the
+    existing job instead of starting a new one. Reusing a key with a
+    different body is rejected with 422.
+
+    Response (202 for a new job, 200 for an existing one):
+        - success: boolean
+        - job_id: poll GET /api/moodcheck/jobs/<job_id>
+        - status: 'queued' | 'running' | 'done' | 'failed'
+    """
+    params, error = load_moodcheck_params()
+    if error is not None:
+        return error
+    images, prompt, max_products, decoded = params
+
+    def work(report):
+        return run_moodcheck(images, prompt, max_products=max_products, emit=report, decoded=decoded)
+
+    try:
+        job, created = submit_job(
+            work,
+            idempotency_key=request.headers.get('Idempotency-Key'),
+            fingerprint=TieredCache.make_key(images, prompt, max_products)
+        )
+    except IdempotencyKeyReused as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 422
+    except PoolSaturated:
+        logger.warning("Moodcheck job rejected: jobs pool saturated")
+        response = jsonify({
+            'success': False,
+            'error': 'Too many moodchecks in progress. Please retry shortly.'
+        })
+        response.headers['Retry-After'] = '5'
+        return response, 503
+
+    response = jsonify({
+        'success': True,
+        'job_id': job['id'],
+        'status': job['status']
+    })
+    response.headers['Location'] = url_for('api.get_moodcheck_job', job_id=job['id'])
+    return response, 202 if created else 200
+
+
+@api.route('/api/moodcheck/jobs/<job_id>', methods=['GET'])
+@limiter.limit("120 per minute")
+def get_moodcheck_job(job_id):
+    """
+    Poll a moodcheck job.
+
+    Response:
+        - success: boolean
+        - job: id, status, stages (pipeline events seen so far: vibe, trend,
+          products, coherence), progress (0-1), partial (early vibe/trend/
+          products payloads while running), result (the /api/moodcheck
+          response once done), error (if failed)
+    """
+    job = get_job(job_id)
+    if job is None:
+        return jsonify({
+            'success': False,
+            'error': 'Job not found'
+        }), 404
+
+    return jsonify({
+        'success': True,
+        'job': job
+    }), 200
+
+
+def load_moodcheck_params():
+    """
+    Read and validate a moodcheck request body.
+
+    Returns:
+        tuple: ((images, prompt, max_products, decoded), None) for a valid
+        request, or (None, error_response) with a 400 response to return
+    """
     # Get request data
-    data = request.get_json()
+    data = read_moodcheck_request()
 
     # Log request
     image_count = len(data.get('images', [])) if data else 0
     prompt_preview = data.get('prompt', '')[:50] if data else ''
     logger.info(f"Moodcheck request: {image_count} images, prompt: '{prompt_preview}...'")
 
-    # Step 1: Validate request
-    is_valid, errors = validate_moodcheck_request(data)
+    # Validate request (decoding each image once; later stages reuse the bytes)
+    decoded = []
+    is_valid, errors = validate_moodcheck_request(data, decoded)
     if not is_valid:
         logger.warning(f"Validation failed: {errors}")
-        return jsonify({
+        return None, (jsonify({
             'success': False,
             'error': 'Invalid request',
             'details': errors
-        }), 400
+        }), 400)
 
     images = data.get('images', [])
+    if images and hasattr(images[0], 'read'):
+        # Raw uploads: the vision model is sent data URIs
+        images = [image.data_uri() for image in decoded]
     prompt = data.get('prompt', '')
     max_products = min(data.get('max_products', 20), 50)  # Cap at 50
+    return (images, prompt, max_products, decoded), None
+
+
+def read_moodcheck_request() -> Optional[dict]:
+    """
+    The moodcheck request as a dict, from a JSON or multipart/form-data body.
 
-    # Step 2: Extract mood from images
+    Multipart image parts are left as (spooled) file objects for
+    validate_moodcheck_request to size-check and sniff.
+    """
+    if request.mimetype != 'multipart/form-data':
+        return request.get_json()
+
+    data = {
+        'images': request.files.getlist('images'),
+        'prompt': request.form.get('prompt', ''),
+    }
     try:
-        logger.info("Calling Vision API...")
-        vision_start = time.time()
-        mood_profile = extract_mood(images, prompt)
-        vision_time = time.time() - vision_start
-        logger.info(f"Vision API completed in {vision_time:.2f}s - Mood: {mood_profile.get('name')}")
-    except Exception as e:
-        logger.error(f"Vision API error: {e}")
-        return jsonify({
-            'success': False,
-            'error': 'Unable to analyze images. Please try again.'
-        }), 500
+        data['max_products'] = int(request.form['max_products'])
+    except (KeyError, ValueError):
+        pass
+    return data
 
-    # Step 3 & 4: Search for products AND fetch trend data in parallel
-    search_queries = mood_profile.get('search_queries', [])
-    budget = detect_budget_from_prompt(prompt)
-    item_type = detect_item_type_from_prompt(prompt)
-    vibe_name = mood_profile.get('name', '')
-
-    # If specific item type detected, modify queries to focus on it
-    if item_type:
-        logger.info(f"Detected item type: {item_type} - modifying search queries")
-        # Extract the specific item word from prompt (e.g., "boots" from "boho boots")
-        item_word = None
-        prompt_lower = prompt.lower()
-        from services.shopping import ITEM_TYPE_KEYWORDS
-        for keyword in ITEM_TYPE_KEYWORDS.get(item_type, []):
-            if keyword in prompt_lower:
-                item_word = keyword
-                break
 
-        # Create item-specific queries using the vibe name
-        if item_word and vibe_name:
-            search_queries = [
-                f"{vibe_name} {item_word} women",
-                f"{item_word} {vibe_name} style",
-                f"womens {item_word} {mood_profile.get('mood', '')}",
-                f"{item_word} {' '.join(mood_profile.get('textures', [])[:2])}",
-                f"trendy {item_word} {vibe_name}",
-                f"{item_word} outfit {vibe_name}",
-            ]
-            logger.info(f"Modified queries: {search_queries}")
-
-    products = []
-    trend = None
-
-    def fetch_products():
+def wants_event_stream() -> bool:
+    """True if the client opted in to the SSE variant of an endpoint."""
+    if request.args.get('stream') in ('1', 'true'):
+        return True
+    return request.accept_mimetypes.best == 'text/event-stream'
+
+
+def format_sse(event: str, payload: dict) -> str:
+    """Serialize one Server-Sent Event."""
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+
+def stream_moodcheck(images: list, prompt: str, max_products: int, decoded: Optional[list] = None):
+    """
+    Run the moodcheck pipeline on the 'jobs' pool and stream its stage
+    events to the client as they arrive. Returns 503 when the pool is
+    saturated, like moodcheck jobs.
+    """
+    events = queue.Queue()
+
+    def run():
         try:
-            logger.info("Searching Google Shopping...")
-            start = time.time()
-            result = search_all_queries(
-                search_queries,
+            result = run_moodcheck(
+                images, prompt,
                 max_products=max_products,
-                budget=budget,
-                vibe_profile=mood_profile
+                emit=lambda event, payload: events.put((event, payload)),
+                decoded=decoded
             )
-            logger.info(f"Shopping completed in {time.time() - start:.2f}s - Found {len(result)} products")
-            return result
+            events.put(('done', result))
+        except MoodcheckError as e:
+            events.put(('error', {'success': False, 'error': str(e)}))
         except Exception as e:
-            logger.error(f"Shopping API error: {e}")
-            return []
+            logger.error(f"Streaming moodcheck failed: {e}")
+            events.put(('error', {'success': False, 'error': 'Internal server error'}))
 
-    def fetch_trend():
-        if not vibe_name:
-            return None
-        try:
-            logger.info(f"Fetching trend data for '{vibe_name}'...")
-            start = time.time()
-            # Pass style_archetype for smarter keyword extraction
-            style_archetype = mood_profile.get('style_archetype') if mood_profile else None
-            result = get_trend_summary(vibe_name, style_archetype=style_archetype)
-            logger.info(f"Trend data fetched in {time.time() - start:.2f}s")
-            return result
-        except Exception as e:
-            logger.error(f"Trend API error: {e}")
-            return None
-
-    # Run both in parallel
-    parallel_start = time.time()
-    with ThreadPoolExecutor(max_workers=2) as executor:
-        products_future = executor.submit(fetch_products)
-        trend_future = executor.submit(fetch_trend)
-        products = products_future.result()
-        trend = trend_future.result()
-    logger.info(f"Parallel fetch completed in {time.time() - parallel_start:.2f}s")
-
-    # Filter by item type if detected
-    if item_type:
-        products = filter_by_item_type(products, item_type)
-        logger.info(f"Filtered to {len(products)} {item_type} items")
-
-    # Step 5: Build response
-    response = {
-        'success': True,
-        'vibe': {
-            'name': mood_profile.get('name', 'Your Mood'),
-            'mood': mood_profile.get('mood', ''),
-            'color_palette': mood_profile.get('color_palette', []),
-            'textures': mood_profile.get('textures', []),
-            'key_pieces': mood_profile.get('key_pieces', []),
-            'avoid': mood_profile.get('avoid', [])
-        },
-        'trend': trend,
-        'products': products,
-        'search_queries_used': search_queries[:8],
-        'detected_item_type': item_type  # Frontend can use this to pre-select filter
-    }
-
-    total_time = time.time() - start_time
-    logger.info(f"Moodcheck completed in {total_time:.2f}s")
+    try:
+        get_pool('jobs').submit(run)
+    except PoolSaturated:
+        logger.warning("Streaming moodcheck rejected: jobs pool saturated")
+        response = jsonify({
+            'success': False,
+            'error': 'Too many moodchecks in progress. Please retry shortly.'
+        })
+        response.headers['Retry-After'] = '5'
+        return response, 503
+
+    def generate():
+        while True:
+            event, payload = events.get()
+            yield format_sse(event, payload)
+            if event in ('done', 'error'):
+                break
 
-    return jsonify(response), 200
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
 
 
-# Aesthetic-specific signature accessories
-AESTHETIC_ACCESSORIES = {
-    "western": ["cowboy boots women", "western belt women", "turquoise jewelry", "fringe bag", "cowgirl hat"],
-    "coastal": ["swimsuit women", "bikini set", "beach cover up", "straw tote bag", "espadrilles women"],
-    "tropical": ["swimsuit women", "bikini set", "sarong wrap", "raffia bag", "platform sandals"],
-    "beach": ["swimsuit women", "bikini set", "beach dress", "woven tote", "slide sandals"],
-    "boho": ["fringe boots women", "layered necklaces", "wide brim hat", "embroidered bag", "ankle boots suede"],
-    "bohemian": ["fringe boots women", "statement earrings", "floppy hat", "crossbody bag leather", "gladiator sandals"],
-    "minimalist": ["structured tote bag", "simple gold jewelry", "white sneakers women", "leather belt slim", "watch women minimal"],
-    "quiet luxury": ["cashmere scarf", "leather loafers women", "gold hoops small", "structured handbag", "ballet flats leather"],
-    "parisian": ["ballet flats women", "silk scarf", "structured handbag", "gold jewelry classic", "kitten heels"],
-    "athleisure": ["running sneakers women", "gym bag", "sports bra", "leggings high waist", "baseball cap"],
-    "glamorous": ["statement earrings", "clutch bag evening", "strappy heels", "sparkle jewelry", "evening bag"],
-    "mob wife": ["fur coat women", "gold chunky jewelry", "designer sunglasses", "leopard print heels", "statement handbag"],
-    "cottagecore": ["mary jane shoes", "wicker basket bag", "pearl jewelry", "floral headband", "lace socks"],
-    "scandinavian": ["minimalist watch", "leather backpack", "wool scarf", "white sneakers clean", "structured bag"],
-    "corporate": ["structured tote leather", "pointed toe heels", "pearl earrings", "silk blouse", "watch classic women"],
-    "old money": ["loafers leather women", "pearl necklace", "silk scarf", "tennis bracelet", "ballet flats"],
-    "coquette": ["ballet flats bow", "ribbon hair accessories", "pearl jewelry", "mini bag", "mary janes"],
-    "dark academia": ["oxford shoes women", "leather satchel", "vintage watch", "gold rimmed glasses", "wool beret"],
-    "grunge": ["combat boots women", "choker necklace", "crossbody bag chain", "silver rings", "platform boots"],
-    "vintage": ["cat eye sunglasses", "pearl earrings", "structured handbag", "heels kitten", "silk scarf vintage"],
-    "streetwear": ["chunky sneakers", "bucket hat", "crossbody bag", "baseball cap", "platform sneakers"],
-}
-
-
-@app.route('/api/more-products', methods=['POST'])
+@api.route('/api/more-products', methods=['POST'])
 @limiter.limit("20 per minute")
 def more_products():
     """
-    Fetch more products for an existing vibe profile.
-    Uses different search query variations to get fresh results.
+    Fetch the next page of products for a vibe.
+
+    Pages come from the candidate pool the moodcheck already fetched and
+    scored (session_id); new searches only run when the pool runs dry.
 
     Request body:
-        - vibe_profile: the mood profile object from initial request
-        - exclude_ids: array of product IDs to exclude (already shown)
+        - session_id: from the moodcheck response
+        - vibe_profile: the mood profile object, only needed without a
+          session (or when it has expired)
+        - seen: token from the previous response, sent with vibe_profile
+          so a new session skips products already shown
+        - exclude_ids: array of product IDs to exclude (older clients; the
+          session and seen token make it unnecessary)
         - max_products: number of products to return (default 20)
 
     Response:
         - success: boolean
         - products: array of new product objects
+        - session_id: pass back for the following page
+        - source: 'pool' or 'search'
+        - remaining: products left in the pool
+        - seen: compact token of every product shown so far
     """
     start_time = time.time()
 
-    data = request.get_json()
-    if not data or 'vibe_profile' not in data:
+    data = request.get_json(silent=True) or {}
+    session_id = data.get('session_id')
+    vibe_profile = data.get('vibe_profile')
+    exclude_ids = data.get('exclude_ids', [])
+    max_products = min(data.get('max_products', 20), 30)
+
+    if session_id and get_session(session_id) is None and not vibe_profile:
         return jsonify({
             'success': False,
-            'error': 'Missing vibe_profile'
+            'error': 'Session expired'
+        }), 410
+    if not session_id and not vibe_profile:
+        return jsonify({
+            'success': False,
+            'error': 'Missing session_id or vibe_profile'
         }), 400
 
-    vibe_profile = data['vibe_profile']
-    exclude_ids = set(data.get('exclude_ids', []))
-    max_products = min(data.get('max_products', 20), 30)
-
-    logger.info(f"More products request for '{vibe_profile.get('name', 'Unknown')}', excluding {len(exclude_ids)} items")
-
-    # Generate alternative search queries to get fresh results
-    vibe_name = vibe_profile.get('name', '')
-    key_pieces = vibe_profile.get('key_pieces', [])
-    textures = vibe_profile.get('textures', [])
-    color_palette = vibe_profile.get('color_palette', [])
-
-    # Create varied queries using different combinations
-    alt_queries = []
-
-    # Add aesthetic-specific accessories first (signature items for the vibe)
-    vibe_lower = vibe_name.lower()
-    for aesthetic_key, accessories in AESTHETIC_ACCESSORIES.items():
-        if aesthetic_key in vibe_lower:
-            for accessory in accessories[:3]:  # Top 3 signature accessories
-                alt_queries.append(f"{accessory} {vibe_name}")
-            logger.info(f"Added {aesthetic_key} accessories: {accessories[:3]}")
-            break
-
-    # Use key pieces with vibe name
-    for piece in key_pieces[:4]:
-        alt_queries.append(f"{piece} {vibe_name} style women")
-
-    # Use textures
-    for texture in textures[:2]:
-        alt_queries.append(f"{texture} {vibe_name} clothing women")
-
-    # Use colors
-    for color in color_palette[:2]:
-        color_name = color.get('name', '') if isinstance(color, dict) else color
-        if color_name:
-            alt_queries.append(f"{color_name} {vibe_name} fashion women")
-
-    # Add some general style queries
-    alt_queries.extend([
-        f"{vibe_name} outfit ideas women",
-        f"{vibe_name} wardrobe essentials",
-        f"trending {vibe_name} fashion"
-    ])
-
-    logger.info(f"Alternative queries: {alt_queries[:6]}")
-
     try:
-        # Search with alternative queries
-        products = search_all_queries(
-            alt_queries[:8],
-            max_products=max_products + len(exclude_ids),  # Get extra to account for exclusions
-            budget=None,
-            vibe_profile=vibe_profile
-        )
-
-        # Filter out already-shown products
-        fresh_products = []
-        for p in products:
-            product_id = p.get('id', '') + p.get('product_url', '')
-            if product_id not in exclude_ids:
-                fresh_products.append(p)
-                if len(fresh_products) >= max_products:
-                    break
+        page = next_page(session_id, max_products, exclude_ids) if session_id else None
+        if page is None:
+            # No (live) session: start one with an empty pool, filled by search
+            logger.info(f"More products request for '{vibe_profile.get('name', 'Unknown')}' without a session")
+            seen = seen_filter(exclude_ids, token=data.get('seen'))
+            session_id = create_session(vibe_profile, pool=[], seen=seen)
+            page = next_page(session_id, max_products)
+        products, info = page
 
-        logger.info(f"More products completed in {time.time() - start_time:.2f}s - Found {len(fresh_products)} new products")
+        logger.info(f"More products completed in {time.time() - start_time:.2f}s - Found {len(products)} new products ({info['source']})")
 
         return jsonify({
             'success': True,
-            'products': fresh_products
+            'products': products,
+            'session_id': session_id,
+            **info
         }), 200
 
     except Exception as e:
@@ -342,7 +499,7 @@ def more_products():
         }), 500
 
 
-@app.errorhandler(500)
+@api.app_errorhandler(500)
 def internal_error(error):
     logger.error(f"Internal server error: {error}")
     return jsonify({
@@ -351,7 +508,15 @@ def internal_error(error):
     }), 500
 
 
-@app.errorhandler(404)
+@api.app_errorhandler(413)
+def request_too_large(error):
+    return jsonify({
+        'success': False,
+        'error': f'Request too large (max {Config.MAX_REQUEST_MB:g}MB)'
+    }), 413
+
+
+@api.app_errorhandler(404)
 def not_found(error):
     return jsonify({
         'success': False,
@@ -359,8 +524,13 @@ def not_found(error):
     }), 404
 
 
+app = create_app()
+
+
 if __name__ == '__main__':
     logger.info(f"Starting Moodboard API on port {Config.PORT}")
+    if Config.TREND_TABLE:
+        start_trend_table()
     app.run(
         host='0.0.0.0',
         port=Config.PORT,
@@ -0,0 +1,132 @@
+"""
+Time the compiled lexicon lookups against the substring loops they replaced.
+
+Generates a synthetic result set (the ~240 products one moodcheck fetches)
+and runs brand scoring, blocklist, retailer and category checks over it
+with both implementations. No network access needed.
+
+Usage (from backend/):
+    python benchmarks/lexicon_benchmark.py --products 240 --repeat 200
+"""
+import argparse
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.shopping import (
+    BLOCKED_BRANDS,
+    CURATED_BRANDS,
+    EDITORIAL_BRANDS,
+    ITEM_TYPE_KEYWORDS,
+    TRENDING_BRANDS,
+    TRUSTED_RETAILERS,
+    detect_product_category,
+    get_brand_score,
+    is_blocked_brand,
+    is_trusted_retailer,
+)
+
+ADJECTIVES = ['Oversized', 'Cropped', 'Ribbed', 'Linen', 'Cashmere', 'Vintage', 'Pleated', 'Satin']
+UNKNOWN_BRANDS = ['Studio Nine', 'Maison Lune', 'Field Day', 'Atelier Rose']
+
+
+# --- Previous implementations, kept here for comparison -----------------------
+
+def legacy_brand_score(brand):
+    if not brand:
+        return 0
+    brand_lower = brand.lower().strip()
+    in_curated = any(c in brand_lower or brand_lower in c for c in CURATED_BRANDS)
+    in_editorial = any(e in brand_lower or brand_lower in e for e in EDITORIAL_BRANDS)
+    in_trending = any(t in brand_lower or brand_lower in t for t in TRENDING_BRANDS)
+    if in_editorial and in_trending:
+        return 4
+    elif in_editorial:
+        return 3
+    elif in_trending:
+        return 2
+    elif in_curated:
+        return 1
+    return 0
+
+
+def legacy_is_blocked(brand, name):
+    brand_lower = brand.lower().strip()
+    name_lower = name.lower()
+    return any(b in brand_lower or b in name_lower for b in BLOCKED_BRANDS)
+
+
+def legacy_is_trusted(retailer):
+    retailer_lower = retailer.lower().strip()
+    return any(t in retailer_lower or retailer_lower in t for t in TRUSTED_RETAILERS)
+
+
+def legacy_category(name):
+    name_lower = name.lower()
+    for category, keywords in ITEM_TYPE_KEYWORDS.items():
+        for keyword in keywords:
+            if keyword in name_lower:
+                return category
+    return 'Other'
+
+
+# -----------------------------------------------------------------------------
+
+def make_products(count, seed=7):
+    rng = random.Random(seed)
+    brands = sorted(CURATED_BRANDS | EDITORIAL_BRANDS | TRENDING_BRANDS | BLOCKED_BRANDS) + UNKNOWN_BRANDS
+    retailers = sorted(TRUSTED_RETAILERS) + ['Etsy', 'Boutique Co']
+    keywords = [kw for kws in ITEM_TYPE_KEYWORDS.values() for kw in kws]
+    products = []
+    for _ in range(count):
+        brand = rng.choice(brands).title()
+        products.append({
+            'brand': brand,
+            'retailer': rng.choice(retailers).title(),
+            'name': f"{brand} {rng.choice(ADJECTIVES)} {rng.choice(keywords).title()}",
+        })
+    return products
+
+
+def run_lexicon(products):
+    for p in products:
+        is_blocked_brand(p['brand'], p['name'])
+        get_brand_score(p['brand'])
+        is_trusted_retailer(p['retailer'])
+        detect_product_category(p['name'])
+
+
+def run_legacy(products):
+    for p in products:
+        legacy_is_blocked(p['brand'], p['name'])
+        legacy_brand_score(p['brand'])
+        legacy_is_trusted(p['retailer'])
+        legacy_category(p['name'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--products', type=int, default=240)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    products = make_products(args.products)
+    # Fresh titles every round so the lexicon's memo cache can't hide the work
+    batches = [make_products(args.products, seed=i) for i in range(args.repeat)]
+
+    legacy = min(timeit.repeat(lambda: run_legacy(products), number=args.repeat, repeat=3))
+    warm = min(timeit.repeat(lambda: run_lexicon(products), number=args.repeat, repeat=3))
+    cold = min(timeit.repeat(lambda: [run_lexicon(b) for b in batches], number=1, repeat=3))
+
+    per_batch = lambda total: total / args.repeat * 1000
+    print(f"{args.products} products x {args.repeat} batches")
+    print(f"  substring loops      {per_batch(legacy):7.3f} ms/batch")
+    print(f"  lexicon (new titles) {per_batch(cold):7.3f} ms/batch  {legacy / cold:5.1f}x")
+    print(f"  lexicon (repeats)    {per_batch(warm):7.3f} ms/batch  {legacy / warm:5.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,158 @@
+"""
+Compare concurrent-request capacity of the gunicorn serving modes.
+
+Starts the app under gunicorn.conf.py once per SERVER_MODE with upstream
+calls replaced by fixed sleeps (no API credits used), then drives it with
+--clients concurrent moodcheck clients for --duration seconds while a
+probe polls /health. Reports moodcheck throughput and latency, and how
+long /health takes while the workers are busy.
+
+Usage (from backend/):
+    python benchmarks/load_benchmark.py --modes sync gevent --clients 40
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+import requests
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def stub_app():
+    """
+    The real app with the moodcheck pipeline and trend lookups replaced by
+    sleeps of BENCH_UPSTREAM_LATENCY seconds (what a request spends waiting
+    on OpenAI/SerpApi), and rate limits off. Loaded by gunicorn as
+    'benchmarks.load_benchmark:stub_app()'.
+    """
+    os.environ.setdefault('OPENAI_API_KEY', 'benchmark')
+    os.environ.setdefault('SERPAPI_KEY', 'benchmark')
+    sys.path.insert(0, BACKEND_DIR)
+    import app as app_module
+
+    latency = float(os.getenv('BENCH_UPSTREAM_LATENCY', 2.0))
+
+    def run_moodcheck(images, prompt, max_products=20, emit=None, decoded=None):
+        time.sleep(latency)
+        return {'success': True, 'vibe': {'name': 'Benchmark'}, 'products': []}
+
+    def get_trend_summary(keyword, style_archetype=None):
+        time.sleep(latency / 4)
+        return {'direction': 'stable'}
+
+    app_module.run_moodcheck = run_moodcheck
+    app_module.get_trend_summary = get_trend_summary
+    return app_module.create_app({'RATELIMIT_ENABLED': False})
+
+
+def start_server(mode: str, port: int, workers: int, latency: float) -> subprocess.Popen:
+    env = dict(os.environ, SERVER_MODE=mode, BENCH_UPSTREAM_LATENCY=str(latency), TREND_TABLE='false')
+    process = subprocess.Popen(
+        [
+            sys.executable, '-m', 'gunicorn',
+            '-c', 'gunicorn.conf.py',
+            '--bind', f'127.0.0.1:{port}',
+            '--workers', str(workers),
+            'benchmarks.load_benchmark:stub_app()',
+        ],
+        cwd=BACKEND_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            requests.get(f'http://127.0.0.1:{port}/health', timeout=1)
+            return process
+        except requests.RequestException:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"{mode} server didn't start")
+
+
+def percentile(values, pct: float) -> float:
+    if not values:
+        return float('nan')
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct))]
+
+
+def run_load(port: int, clients: int, duration: float):
+    base = f'http://127.0.0.1:{port}'
+    stop_at = time.time() + duration
+    latencies, health_latencies = [], []
+    errors = [0]
+    lock = threading.Lock()
+
+    def client():
+        session = requests.Session()
+        while time.time() < stop_at:
+            start = time.perf_counter()
+            try:
+                response = session.post(f'{base}/api/moodcheck', json={'prompt': 'coastal grandmother'}, timeout=120)
+                ok = response.status_code == 200
+            except requests.RequestException:
+                ok = False
+            with lock:
+                if ok:
+                    latencies.append(time.perf_counter() - start)
+                else:
+                    errors[0] += 1
+
+    def probe():
+        session = requests.Session()
+        while time.time() < stop_at:
+            start = time.perf_counter()
+            try:
+                session.get(f'{base}/health', timeout=120)
+                health_latencies.append(time.perf_counter() - start)
+            except requests.RequestException:
+                pass
+            time.sleep(0.25)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)] + [threading.Thread(target=probe)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    return latencies, health_latencies, errors[0], elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--modes', nargs='+', default=['sync', 'gthread', 'gevent'])
+    parser.add_argument('--clients', type=int, default=40)
+    parser.add_argument('--duration', type=float, default=20)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--latency', type=float, default=2.0, help='Simulated upstream seconds per moodcheck')
+    parser.add_argument('--port', type=int, default=5099)
+    args = parser.parse_args()
+
+    print(f"{args.clients} clients, {args.workers} workers, {args.latency}s upstream latency, {args.duration}s per mode\n")
+    print(f"  {'mode':<8} {'req/s':>7} {'p50':>7} {'p95':>7} {'errors':>7} {'health p50':>11} {'health p95':>11}")
+    for mode in args.modes:
+        server = start_server(mode, args.port, args.workers, args.latency)
+        try:
+            latencies, health, errors, elapsed = run_load(args.port, args.clients, args.duration)
+        finally:
+            server.terminate()
+            server.wait()
+        print(
+            f"  {mode:<8} {len(latencies) / elapsed:7.1f} "
+            f"{statistics.median(latencies) if latencies else float('nan'):6.2f}s "
+            f"{percentile(latencies, 0.95):6.2f}s {errors:7d} "
+            f"{statistics.median(health) if health else float('nan'):10.3f}s "
+            f"{percentile(health, 0.95):10.3f}s"
+        )
+
+
+if __name__ == '__main__':
+    main()
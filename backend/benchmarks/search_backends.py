@@ -0,0 +1,64 @@
+"""
+Compare the 'threads' and 'async' product search backends.
+
+Runs the same batch of queries through iter_search_results with each
+backend, clearing the search cache between rounds so every query hits
+SerpApi. Uses real API credits: rounds * len(QUERIES) calls per backend.
+
+Usage (from backend/):
+    python benchmarks/search_backends.py --rounds 3
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from services.shopping import iter_search_results, search_cache
+
+QUERIES = [
+    "quiet luxury cashmere sweater women",
+    "coastal grandmother linen pants",
+    "old money blazer women",
+    "clean girl gold hoop earrings",
+    "mob wife faux fur coat",
+    "balletcore wrap cardigan",
+    "dark academia plaid skirt",
+    "boho maxi dress women",
+]
+
+
+def run_round(backend: str, queries, num_results: int) -> float:
+    Config.SEARCH_BACKEND = backend
+    search_cache.clear()
+    start = time.perf_counter()
+    count = sum(len(products) for _, products in iter_search_results(queries, num_results))
+    elapsed = time.perf_counter() - start
+    print(f"  {backend:<8} {elapsed:6.2f}s  {count} products")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rounds', type=int, default=3)
+    parser.add_argument('--num-results', type=int, default=10)
+    args = parser.parse_args()
+
+    timings = {'threads': [], 'async': []}
+    for i in range(args.rounds):
+        print(f"Round {i + 1}/{args.rounds}")
+        # Alternate order so neither backend always runs first
+        order = ['threads', 'async'] if i % 2 == 0 else ['async', 'threads']
+        for backend in order:
+            timings[backend].append(run_round(backend, QUERIES, args.num_results))
+
+    print("\nMedian wall time")
+    for backend, values in timings.items():
+        print(f"  {backend:<8} {statistics.median(values):6.2f}s")
+
+
+if __name__ == '__main__':
+    main()
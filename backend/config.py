@@ -14,6 +14,118 @@ class Config:
     SERPAPI_KEY = os.getenv('SERPAPI_KEY')
     FLASK_ENV = os.getenv('FLASK_ENV', 'development')
     PORT = int(os.getenv('PORT', 5000))
+    # Bearer token for GET /api/metrics; the endpoint is disabled (404) when unset
+    METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
+    # Shared on-disk cache (set CACHE_DIR to an empty string to keep caches in memory only)
+    CACHE_DIR = os.getenv('CACHE_DIR', str(Path(__file__).parent / 'cache'))
+    SEARCH_CACHE_TTL = int(os.getenv('SEARCH_CACHE_TTL', 6 * 60 * 60))  # 6 hours
+    SEARCH_CACHE_SIZE = int(os.getenv('SEARCH_CACHE_SIZE', 512))
+    TREND_CACHE_TTL = int(os.getenv('TREND_CACHE_TTL', 12 * 60 * 60))  # 12 hours
+    TREND_STALE_TTL = int(os.getenv('TREND_STALE_TTL', 3 * 24 * 60 * 60))  # serve stale up to 3 days more
+    TREND_NEGATIVE_TTL = int(os.getenv('TREND_NEGATIVE_TTL', 6 * 60 * 60))  # 'no_data' results
+    TREND_CACHE_SIZE = int(os.getenv('TREND_CACHE_SIZE', 256))
+    TREND_RELATED_TTL = int(os.getenv('TREND_RELATED_TTL', 7 * 24 * 60 * 60))  # 7 days
+    # Keyword variants compared in one Google Trends request (Google allows 5).
+    # A winning variant that peaks below TREND_MIN_BATCH_PEAK on the shared
+    # 0-100 scale is re-fetched alone for full resolution
+    TREND_BATCH_SIZE = int(os.getenv('TREND_BATCH_SIZE', 5))
+    TREND_MIN_BATCH_PEAK = int(os.getenv('TREND_MIN_BATCH_PEAK', 10))
+    # Precompute trends for the known keyword universe in the background and
+    # serve /api/trend and the moodcheck trend step from that table. One
+    # worker per machine refreshes it (TREND_TABLE_PATH is shared); requests
+    # fall back to live lookups until the first refresh completes
+    TREND_TABLE = os.getenv('TREND_TABLE', 'true').lower() == 'true'
+    TREND_TABLE_PATH = os.getenv('TREND_TABLE_PATH', os.path.join(CACHE_DIR, 'trend_table.json') if CACHE_DIR else '')
+    TREND_TABLE_INTERVAL = int(os.getenv('TREND_TABLE_INTERVAL', 12 * 60 * 60))  # 12 hours
+    TREND_TABLE_RETRY = int(os.getenv('TREND_TABLE_RETRY', 30 * 60))  # after a throttled refresh
+    TREND_TABLE_PACE = float(os.getenv('TREND_TABLE_PACE', 2.0))  # seconds between keywords
+    TREND_TABLE_POLL = int(os.getenv('TREND_TABLE_POLL', 60))  # how often followers reload
+    # Offline interest-over-time history (memory-mapped; see services/trend_store.py),
+    # read before the trend table or live lookups. Series whose newest point is
+    # older than TREND_STORE_MAX_AGE days are ignored
+    TREND_STORE_DIR = os.getenv('TREND_STORE_DIR', os.path.join(CACHE_DIR, 'trend_store') if CACHE_DIR else '')
+    TREND_STORE_MAX_AGE = int(os.getenv('TREND_STORE_MAX_AGE', 14))
+    TRENDS_BATCH_MAX = int(os.getenv('TRENDS_BATCH_MAX', 50))  # keywords per /api/trends call
+    # Longest a moodcheck waits for its trend lookup once products are ranked
+    TREND_TIMEOUT = float(os.getenv('TREND_TIMEOUT', 15))  # seconds
+    MOOD_CACHE_TTL = int(os.getenv('MOOD_CACHE_TTL', 7 * 24 * 60 * 60))  # 7 days
+    MOOD_CACHE_SIZE = int(os.getenv('MOOD_CACHE_SIZE', 256))
+    VIBE_SCORE_TTL = int(os.getenv('VIBE_SCORE_TTL', 7 * 24 * 60 * 60))  # 7 days
+    VIBE_SCORE_CACHE_SIZE = int(os.getenv('VIBE_SCORE_CACHE_SIZE', 4096))
+
+    # Product search backend: 'threads' (GoogleSearch per thread) or 'async' (pooled httpx client)
+    SEARCH_BACKEND = os.getenv('SEARCH_BACKEND', 'threads')
+    SEARCH_ASYNC_CONCURRENCY = int(os.getenv('SEARCH_ASYNC_CONCURRENCY', 16))
+    SEARCH_TIMEOUT = int(os.getenv('SEARCH_TIMEOUT', 30))
+    # Queries whose canonical token sets overlap at least this much (Jaccard)
+    # are searched once (services/query_planner.py)
+    QUERY_SIMILARITY = float(os.getenv('QUERY_SIMILARITY', 0.6))
+
+    # Product re-ranking: how many products are scored from images (the rest,
+    # up to 50, by name), and how many images go in each concurrent request
+    RERANK_VISUAL_LIMIT = int(os.getenv('RERANK_VISUAL_LIMIT', 20))
+    RERANK_CHUNK_SIZE = int(os.getenv('RERANK_CHUNK_SIZE', 5))
+
+    # Demote products whose thumbnails are far (CIE76 delta-E) from the vibe's
+    # palette before re-ranking; thumbnails not fetched within the budget are kept as-is
+    PALETTE_PREFILTER = os.getenv('PALETTE_PREFILTER', 'true').lower() == 'true'
+    PALETTE_MAX_DELTA_E = float(os.getenv('PALETTE_MAX_DELTA_E', 35))
+    PALETTE_FETCH_BUDGET = float(os.getenv('PALETTE_FETCH_BUDGET', 1.5))  # seconds
+    THUMB_COLOR_TTL = int(os.getenv('THUMB_COLOR_TTL', 30 * 24 * 60 * 60))  # 30 days
+    THUMB_COLOR_CACHE_SIZE = int(os.getenv('THUMB_COLOR_CACHE_SIZE', 4096))
+
+    # Drop products with dead or placeholder images; URLs are checked while
+    # searches are still running, then waited on for at most the budget
+    IMAGE_VALIDATION = os.getenv('IMAGE_VALIDATION', 'true').lower() == 'true'
+    IMAGE_VALIDATION_BUDGET = float(os.getenv('IMAGE_VALIDATION_BUDGET', 2.0))  # seconds
+    IMAGE_MIN_KB = float(os.getenv('IMAGE_MIN_KB', 2))
+    IMAGE_VALID_TTL = int(os.getenv('IMAGE_VALID_TTL', 7 * 24 * 60 * 60))  # 7 days
+    IMAGE_INVALID_TTL = int(os.getenv('IMAGE_INVALID_TTL', 6 * 60 * 60))  # 6 hours
+    IMAGE_VALIDITY_CACHE_SIZE = int(os.getenv('IMAGE_VALIDITY_CACHE_SIZE', 8192))
+    # Keep downloaded thumbnail bytes on disk, addressed by content hash
+    THUMBNAIL_STORE = os.getenv('THUMBNAIL_STORE', 'false').lower() == 'true'
+    THUMBNAIL_DIR = os.getenv('THUMBNAIL_DIR', str(Path(__file__).parent / 'cache' / 'thumbnails'))
+
+    # Shared worker pools, per process (see utils/executors.py)
+    PIPELINE_POOL_SIZE = int(os.getenv('PIPELINE_POOL_SIZE', 32))
+    SERPAPI_POOL_SIZE = int(os.getenv('SERPAPI_POOL_SIZE', 16))
+    OPENAI_POOL_SIZE = int(os.getenv('OPENAI_POOL_SIZE', 8))
+    TRENDS_POOL_SIZE = int(os.getenv('TRENDS_POOL_SIZE', 4))
+    IMAGES_POOL_SIZE = int(os.getenv('IMAGES_POOL_SIZE', 16))
+    CPU_POOL_SIZE = int(os.getenv('CPU_POOL_SIZE', os.cpu_count() or 2))
+    JOBS_POOL_SIZE = int(os.getenv('JOBS_POOL_SIZE', 8))  # background moodchecks (jobs and streams) at once
+    POOL_QUEUE_LIMIT = int(os.getenv('POOL_QUEUE_LIMIT', 256))  # waiting tasks per pool
+
+    # Downscale uploads to the resolution the vision model uses and pick 'high'
+    # detail only for boards with at most VISION_HIGH_DETAIL_MAX_IMAGES images
+    VISION_IMAGE_PREP = os.getenv('VISION_IMAGE_PREP', 'true').lower() == 'true'
+    VISION_HIGH_DETAIL_MAX_IMAGES = int(os.getenv('VISION_HIGH_DETAIL_MAX_IMAGES', 2))
+    VISION_JPEG_QUALITY = int(os.getenv('VISION_JPEG_QUALITY', 85))
+
+    # Largest accepted request body, after gzip/deflate decompression. Five
+    # 5MB images fit as multipart parts or (33% larger) as base64 JSON
+    MAX_REQUEST_MB = float(os.getenv('MAX_REQUEST_MB', 36))
+
+    # Async moodcheck jobs (POST /api/moodcheck/jobs). Job state is shared
+    # between worker processes through JOB_DIR (empty: this process only)
+    JOB_DIR = os.getenv('JOB_DIR', os.path.join(CACHE_DIR, 'jobs') if CACHE_DIR else '')
+    JOB_TTL = int(os.getenv('JOB_TTL', 60 * 60))  # 1 hour
+
+    # Scored candidate pools kept per moodcheck so /api/more-products pages
+    # from them (session_id) instead of searching again
+    PRODUCT_SESSION_TTL = int(os.getenv('PRODUCT_SESSION_TTL', 60 * 60))  # 1 hour
+    PRODUCT_SESSION_CACHE_SIZE = int(os.getenv('PRODUCT_SESSION_CACHE_SIZE', 256))
+    # Unscored candidates (past the re-ranking cut) kept per session; later
+    # pages score these before searching again
+    PRODUCT_SESSION_RESERVE = int(os.getenv('PRODUCT_SESSION_RESERVE', 150))
+    # Shown-product set carried by sessions and clients ('seen' token): fixed
+    # size however far a user scrolls; ~0.2% false positives at 600 products
+    SEEN_FILTER_BITS = int(os.getenv('SEEN_FILTER_BITS', 8192))
+    SEEN_FILTER_HASHES = int(os.getenv('SEEN_FILTER_HASHES', 6))
+
+    # Stream the vision response and start searches as soon as their fields arrive
+    VISION_STREAMING = os.getenv('VISION_STREAMING', 'true').lower() == 'true'
 
     @classmethod
     def validate(cls):
@@ -0,0 +1,46 @@
+"""
+Gunicorn settings, loaded with `gunicorn -c gunicorn.conf.py app:app`.
+
+SERVER_MODE picks the worker type:
+    - 'sync' (default): one request per worker process, as before.
+    - 'gthread': a fixed pool of GUNICORN_THREADS OS threads per worker.
+    - 'gevent' (opt-in): cooperative workers. Each request is a greenlet
+      and the I/O-bound routes (moodcheck, more-products, trend) yield
+      while they wait on OpenAI, SerpApi and Google Trends, so one worker
+      holds WORKER_CONNECTIONS requests instead of one. /health stays
+      responsive while moodchecks are in flight. gevent monkey-patches
+      threading, so the worker pools (utils/executors.py), the trend table
+      refresher and its file locks run on greenlets; try it on staging first.
+
+See docs/DEPLOYMENT.md for sizing notes and benchmarks/load_benchmark.py
+for a capacity comparison between the modes.
+"""
+import os
+
+SERVER_MODE = os.getenv('SERVER_MODE', 'sync')
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+workers = int(os.getenv('WEB_CONCURRENCY', 2))
+# A moodcheck can legitimately take most of a minute
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 120))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = 5
+
+if SERVER_MODE == 'gevent':
+    worker_class = 'gevent'
+    worker_connections = int(os.getenv('WORKER_CONNECTIONS', 200))
+elif SERVER_MODE == 'gthread':
+    worker_class = 'gthread'
+    threads = int(os.getenv('GUNICORN_THREADS', 8))
+elif SERVER_MODE == 'sync':
+    worker_class = 'sync'
+else:
+    raise ValueError(f"Unknown SERVER_MODE '{SERVER_MODE}' (expected gevent, gthread or sync)")
+
+
+def post_worker_init(worker):
+    """Start the trend table refresher in each worker (one of them refreshes)."""
+    from config import Config
+    if Config.TREND_TABLE:
+        from services.trends import start_trend_table
+        start_trend_table()
@@ -0,0 +1,64 @@
+"""
+Load trend history into the offline trend store (services/trend_store.py).
+
+Ingests Google Trends "Interest over time" CSV exports (Explore -> download),
+and/or brings stored keywords up to date from Google Trends: keywords that
+are already stored fetch only the last month, new ones the last 3 months.
+Run it daily (cron) to keep trend lookups off the request path.
+
+Usage (from backend/):
+    python scripts/ingest_trends.py exports/*.csv
+    python scripts/ingest_trends.py --update              # the whole trend universe
+    python scripts/ingest_trends.py --update "quiet luxury" boho
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from services import trend_store
+from services.trend_cache import TrendUnavailable
+from services.trends import refresh_stored_trend, trend_universe
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('csv_files', nargs='*', help='Google Trends CSV exports')
+    parser.add_argument('--update', nargs='*', metavar='KEYWORD',
+                        help='Fetch recent points for these keywords (default: the trend universe)')
+    parser.add_argument('--pace', type=float, default=Config.TREND_TABLE_PACE,
+                        help='Seconds between Google Trends requests')
+    args = parser.parse_args()
+
+    if not args.csv_files and args.update is None:
+        parser.error('give CSV files and/or --update')
+
+    for path in args.csv_files:
+        with open(path, encoding='utf-8-sig') as f:
+            counts = trend_store.ingest_csv(f.read())
+        for keyword, count in counts.items():
+            print(f"  {path}: {keyword} ({count} points)")
+
+    if args.update is not None:
+        keywords = args.update or trend_universe()
+        failed = 0
+        for i, keyword in enumerate(keywords):
+            if i:
+                time.sleep(args.pace)
+            try:
+                trend_data = refresh_stored_trend(keyword)
+            except TrendUnavailable:
+                trend_data = {'error': 'unavailable'}
+            status = trend_data.get('error') or f"{len(trend_data['data'])} days"
+            failed += trend_data.get('error') == 'unavailable'
+            print(f"  {keyword}: {status}")
+        print(f"Updated {len(keywords) - failed}/{len(keywords)} keywords")
+
+    print(f"Store: {trend_store.store_stats()}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+"""
+Precompute related queries for the known aesthetics.
+
+Fetches related queries for every TRENDABLE_TERMS keyword (or the given
+keywords), TREND_BATCH_SIZE per Google Trends request, into the shared
+trend_related cache that /api/trend/<keyword>/related reads. Run it
+weekly (cron) so the endpoint never waits on Google for these terms.
+
+Usage (from backend/):
+    python scripts/precompute_related.py
+    python scripts/precompute_related.py "quiet luxury" boho --pace 5
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from services.trends import TRENDABLE_TERMS, get_related_batch
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('keywords', nargs='*', help='Keywords (default: TRENDABLE_TERMS)')
+    parser.add_argument('--pace', type=float, default=Config.TREND_TABLE_PACE,
+                        help='Seconds between Google Trends requests')
+    args = parser.parse_args()
+
+    keywords = args.keywords or sorted(TRENDABLE_TERMS)
+    size = Config.TREND_BATCH_SIZE
+    empty = 0
+    for i in range(0, len(keywords), size):
+        if i:
+            time.sleep(args.pace)
+        for keyword, related in get_related_batch(keywords[i:i + size], use_cache=False).items():
+            empty += not related
+            print(f"  {keyword}: {', '.join(related) or '-'}")
+    print(f"Cached related queries for {len(keywords) - empty}/{len(keywords)} keywords")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,247 @@
+import hashlib
+import logging
+import os
+import tempfile
+from concurrent.futures import Future, wait
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import Config
+from utils.cache import TieredCache
+from utils.executors import PoolSaturated, get_pool
+
+logger = logging.getLogger(__name__)
+
+# One keep-alive session for every thumbnail request (validation and
+# downloads); nearly all product images come from the same few CDNs
+_session = requests.Session()
+_adapter = HTTPAdapter(pool_connections=8, pool_maxsize=Config.IMAGES_POOL_SIZE)
+_session.mount('https://', _adapter)
+_session.mount('http://', _adapter)
+
+# URL -> bool. Dead links are remembered for less time than good ones,
+# since a CDN hiccup shouldn't hide a product for a week
+_validity_cache = TieredCache(
+    'image_validity',
+    ttl=Config.IMAGE_VALID_TTL,
+    max_entries=Config.IMAGE_VALIDITY_CACHE_SIZE
+)
+
+# URL -> sha256 of the stored bytes (see fetch_image_bytes)
+_thumbnail_index = TieredCache(
+    'thumbnail_index',
+    ttl=Config.IMAGE_VALID_TTL,
+    max_entries=Config.IMAGE_VALIDITY_CACHE_SIZE
+)
+
+
+def _url_key(url: str) -> str:
+    return TieredCache.make_key(url)
+
+
+def _remember_validity(url: str, valid: bool) -> None:
+    ttl = Config.IMAGE_VALID_TTL if valid else Config.IMAGE_INVALID_TTL
+    _validity_cache.set(_url_key(url), valid, ttl=ttl)
+
+
+def _looks_valid(response: requests.Response, min_size_kb: float) -> bool:
+    if response.status_code != 200:
+        return False
+
+    content_type = response.headers.get('Content-Type', '')
+    if not content_type.startswith('image/'):
+        return False
+
+    # Check Content-Length to filter tiny placeholder images
+    content_length = response.headers.get('Content-Length')
+    if content_length and content_length.isdigit() and int(content_length) < min_size_kb * 1024:
+        return False
+
+    return True
+
+
+def validate_image_url(url, min_size_kb=None, timeout=3):
+    """
+    Validate that an image URL:
+    - Returns HTTP 200
+    - Has image content-type
+    - Meets minimum file size (filters tiny placeholders)
+
+    Results are cached (positive and negative) so each URL is checked at
+    most once per TTL across requests and workers.
+
+    Args:
+        url: Image URL to validate
+        min_size_kb: Minimum file size in KB (default Config.IMAGE_MIN_KB)
+        timeout: Request timeout in seconds
+
+    Returns:
+        bool: True if image is valid
+    """
+    return _check_url(url, min_size_kb, timeout) is True
+
+
+def _check_url(url, min_size_kb=None, timeout=3) -> Optional[bool]:
+    """validate_image_url, but None when the check itself failed (network error)."""
+    if not url or not url.startswith('http'):
+        return False
+
+    cached = _validity_cache.get(_url_key(url))
+    if cached is not None:
+        return cached
+
+    if min_size_kb is None:
+        min_size_kb = Config.IMAGE_MIN_KB
+
+    try:
+        response = _session.head(url, timeout=timeout, allow_redirects=True)
+        if response.status_code in (403, 405):
+            # Some CDNs refuse HEAD; read just the headers of a GET instead
+            with _session.get(url, timeout=timeout, stream=True) as response:
+                valid = _looks_valid(response, min_size_kb)
+        else:
+            valid = _looks_valid(response, min_size_kb)
+    except Exception as e:
+        # Network errors aren't the image's fault; don't cache them
+        logger.debug(f"Image validation failed for {url}: {e}")
+        return None
+
+    _remember_validity(url, valid)
+    return valid
+
+
+def fetch_image_bytes(url: str, timeout: float = 3) -> Optional[bytes]:
+    """
+    Download an image over the shared session.
+
+    With THUMBNAIL_STORE enabled, bytes are kept on disk under THUMBNAIL_DIR,
+    addressed by their sha256, so repeat fetches (and identical images
+    behind different URLs) are read locally. Fetch results also feed the
+    validity cache.
+
+    Returns:
+        Image bytes, or None if the URL is dead or not an image
+    """
+    if not url or not url.startswith('http'):
+        return None
+
+    if Config.THUMBNAIL_STORE:
+        digest = _thumbnail_index.get(_url_key(url))
+        if digest:
+            data = _read_stored(digest)
+            if data is not None:
+                return data
+
+    try:
+        response = _session.get(url, timeout=timeout)
+    except Exception as e:
+        logger.debug(f"Image fetch failed for {url}: {e}")
+        return None
+
+    valid = _looks_valid(response, min_size_kb=0)
+    _remember_validity(url, valid)
+    if not valid:
+        return None
+
+    data = response.content
+    if Config.THUMBNAIL_STORE:
+        digest = hashlib.sha256(data).hexdigest()
+        _write_stored(digest, data)
+        _thumbnail_index.set(_url_key(url), digest)
+    return data
+
+
+def _stored_path(digest: str) -> Path:
+    return Path(Config.THUMBNAIL_DIR) / digest[:2] / digest
+
+
+def _read_stored(digest: str) -> Optional[bytes]:
+    try:
+        return _stored_path(digest).read_bytes()
+    except OSError:
+        return None
+
+
+def _write_stored(digest: str, data: bytes) -> None:
+    path = _stored_path(digest)
+    if path.exists():
+        return
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix='.tmp-')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logger.warning(f"Thumbnail store write failed: {e}")
+
+
+class ValidationBatch:
+    """
+    Validate product image URLs in the background while more results arrive.
+
+    Usage:
+        batch = ValidationBatch()
+        for products in incoming:
+            batch.add(products)
+        valid = batch.filter(all_products, timeout=2)
+    """
+
+    def __init__(self):
+        self._futures: Dict[str, Future] = {}
+
+    def add(self, products: List[Dict]) -> None:
+        """Start validating the image URLs of these products (each URL once)."""
+        pool = get_pool('images')
+        for product in products:
+            url = product.get('image_url', '')
+            if url in self._futures:
+                continue
+            try:
+                self._futures[url] = pool.submit(_check_url, url)
+            except PoolSaturated:
+                # Unchecked URLs are kept, so just stop adding work
+                return
+
+    def filter(self, products: List[Dict], timeout: Optional[float] = None) -> List[Dict]:
+        """
+        Drop products whose image is known to be dead or a placeholder.
+
+        Products whose check hasn't finished within timeout seconds, or
+        failed on a network error, are kept.
+        """
+        if self._futures:
+            wait(self._futures.values(), timeout=timeout)
+
+        valid = []
+        for product in products:
+            future = self._futures.get(product.get('image_url', ''))
+            # Keep anything we couldn't check in time (or at all)
+            if future is None or not future.done() or future.cancelled() or future.result() is not False:
+                valid.append(product)
+        for future in self._futures.values():
+            future.cancel()
+        return valid
+
+
+def filter_valid_products(products, timeout=None):
+    """
+    Filter products to only those with valid images.
+    Checks run concurrently on the shared 'images' pool.
+
+    Args:
+        products: List of product dicts with 'image_url' field
+        timeout: Seconds to wait for checks; unchecked products are kept
+
+    Returns:
+        List of products with valid images, in their original order
+    """
+    if not products:
+        return []
+
+    batch = ValidationBatch()
+    batch.add(products)
+    return batch.filter(products, timeout=timeout)
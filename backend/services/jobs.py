@@ -0,0 +1,350 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+
+from config import Config
+from services.pipeline import MoodcheckError
+from utils.executors import PoolSaturated, get_pool
+
+logger = logging.getLogger(__name__)
+
+# Pipeline events a moodcheck job reports, in the order they normally arrive
+JOB_STAGES = ('vibe', 'trend', 'products', 'coherence')
+
+# Events whose payload is kept on the job so pollers can render early results
+PARTIAL_EVENTS = ('vibe', 'trend', 'products')
+
+# Jobs started by this process (other workers' jobs are read from disk)
+_jobs: Dict[str, dict] = {}
+# Idempotency key -> (job id, request fingerprint), for keys claimed by this process
+_keys: Dict[str, Tuple[str, str]] = {}
+_lock = threading.Lock()
+_created = 0
+
+# How often (in created jobs) expired jobs are swept
+PRUNE_EVERY = 100
+
+# work(report) runs the job; report(event, payload) records progress
+JobWork = Callable[[Callable[[str, Dict], None]], Dict]
+
+
+class IdempotencyKeyReused(Exception):
+    """An idempotency key was sent again with a different request."""
+
+
+def submit_job(
+    work: JobWork,
+    idempotency_key: Optional[str] = None,
+    fingerprint: str = ''
+) -> Tuple[dict, bool]:
+    """
+    Queue work on the 'jobs' pool and return its job record right away.
+
+    A retry with the same idempotency key (from any worker process sharing
+    JOB_DIR) gets the existing job back instead of starting another one,
+    for as long as that job is kept (JOB_TTL).
+
+    Args:
+        work: Called as work(report) on a pool thread; returns the result
+        idempotency_key: Optional client-chosen key for safe retries
+        fingerprint: Hash of the request the work was built from; a retry
+            must send the same request to get the existing job
+
+    Returns:
+        tuple: (job, created) where created is False if an existing job
+        was returned for the idempotency key
+
+    Raises:
+        PoolSaturated: If the jobs pool can't take more work
+        IdempotencyKeyReused: If the key's live job was started by a
+            different request
+    """
+    global _created
+
+    with _lock:
+        if idempotency_key:
+            existing, claimed_fingerprint = _job_for_key(idempotency_key)
+            if existing is not None:
+                _check_fingerprint(claimed_fingerprint, fingerprint)
+                return existing, False
+
+        now = time.time()
+        job = {
+            'id': uuid.uuid4().hex,
+            'status': 'queued',
+            'stages': [],
+            'partial': {},
+            'result': None,
+            'error': None,
+            'created_at': now,
+            'updated_at': now,
+        }
+        if idempotency_key:
+            claimed, claimed_fingerprint = _claim_key(idempotency_key, job['id'], fingerprint)
+            if claimed != job['id']:
+                # Another worker claimed the key between our lookup and claim
+                existing = _snapshot(claimed)
+                if existing is not None:
+                    _check_fingerprint(claimed_fingerprint, fingerprint)
+                    return existing, False
+        _jobs[job['id']] = job
+        _save(job)
+
+        _created += 1
+        if _created % PRUNE_EVERY == 0:
+            _prune()
+
+    try:
+        get_pool('jobs').submit(_run, job['id'], work)
+    except PoolSaturated:
+        with _lock:
+            _jobs.pop(job['id'], None)
+            if idempotency_key:
+                _release_key(idempotency_key)
+        _delete(job['id'])
+        raise
+
+    return get_job(job['id']), True
+
+
+def get_job(job_id: str) -> Optional[dict]:
+    """
+    Current state of a job, or None if unknown or expired.
+
+    Returns:
+        A copy of the job record: id, status ('queued' | 'running' | 'done'
+        | 'failed'), stages, progress, partial, result, error, timestamps
+    """
+    with _lock:
+        return _snapshot(job_id)
+
+
+def _snapshot(job_id: str) -> Optional[dict]:
+    """get_job for callers already holding _lock."""
+    job = _jobs.get(job_id)
+    if job is not None:
+        job = json.loads(json.dumps(job))
+    else:
+        job = _load(job_id)
+    if job is None or _expired(job):
+        return None
+    job['progress'] = 1.0 if job['status'] == 'done' else len(job['stages']) / len(JOB_STAGES)
+    return job
+
+
+def _run(job_id: str, work: JobWork) -> None:
+    _update(job_id, status='running')
+
+    def report(event: str, payload: Dict):
+        with _lock:
+            job = _jobs[job_id]
+            if event in JOB_STAGES and event not in job['stages']:
+                job['stages'].append(event)
+            if event in PARTIAL_EVENTS:
+                job['partial'][event] = payload
+            job['updated_at'] = time.time()
+            _save(job)
+
+    try:
+        result = work(report)
+    except MoodcheckError as e:
+        _update(job_id, status='failed', error=str(e))
+        return
+    except Exception as e:
+        logger.error(f"Moodcheck job {job_id} failed: {e}")
+        _update(job_id, status='failed', error='Internal server error')
+        return
+
+    # The result supersedes the partial payloads
+    _update(job_id, status='done', result=result, partial={})
+
+
+def _update(job_id: str, **fields) -> None:
+    with _lock:
+        job = _jobs[job_id]
+        job.update(fields)
+        job['updated_at'] = time.time()
+        _save(job)
+
+
+def _expired(job: dict) -> bool:
+    return time.time() - job['created_at'] > Config.JOB_TTL
+
+
+def _check_fingerprint(claimed: str, fingerprint: str) -> None:
+    if claimed != fingerprint:
+        raise IdempotencyKeyReused('Idempotency-Key was already used for a different request')
+
+
+def _job_for_key(key: str) -> Tuple[Optional[dict], str]:
+    """
+    The live job an idempotency key points at, if any. Caller holds _lock.
+
+    Returns:
+        tuple: (job or None, fingerprint of the request that claimed the key)
+    """
+    claim = _keys.get(key)
+    if claim is None:
+        path = _key_path(key)
+        if path is None:
+            return None, ''
+        try:
+            claim = _parse_claim(path.read_text())
+        except OSError:
+            return None, ''
+    job_id, fingerprint = claim
+    return _snapshot(job_id), fingerprint
+
+
+def _claim_key(key: str, job_id: str, fingerprint: str) -> Tuple[str, str]:
+    """
+    Point key at job_id unless another live job already holds it.
+    Caller holds _lock.
+
+    Returns:
+        tuple: (job id, request fingerprint) the key now points at
+    """
+    claim = (job_id, fingerprint)
+    _keys[key] = claim
+    path = _key_path(key)
+    if path is None:
+        return claim
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL)
+    except FileExistsError:
+        try:
+            holder = _parse_claim(path.read_text())
+        except OSError:
+            holder = ('', '')
+        if holder[0] and _snapshot(holder[0]) is not None:
+            _keys[key] = holder
+            return holder
+        # The previous job has expired; take the key over
+        _atomic_write(path, _format_claim(claim))
+        return claim
+    except OSError as e:
+        logger.warning(f"Job key claim failed: {e}")
+        return claim
+
+    with os.fdopen(fd, 'w') as f:
+        f.write(_format_claim(claim))
+    return claim
+
+
+def _format_claim(claim: Tuple[str, str]) -> str:
+    return '\n'.join(claim)
+
+
+def _parse_claim(text: str) -> Tuple[str, str]:
+    """Key file contents: the job id, then the request fingerprint."""
+    job_id, _, fingerprint = text.strip().partition('\n')
+    return job_id.strip(), fingerprint.strip()
+
+
+def _release_key(key: str) -> None:
+    """Caller holds _lock."""
+    _keys.pop(key, None)
+    path = _key_path(key)
+    if path is not None:
+        try:
+            path.unlink()
+        except OSError:
+            pass
+
+
+def _job_dir() -> Optional[Path]:
+    return Path(Config.JOB_DIR) if Config.JOB_DIR else None
+
+
+def _job_path(job_id: str) -> Optional[Path]:
+    base = _job_dir()
+    # Ids are uuid hex; anything else can't name a file of ours
+    if base is None or not job_id.isalnum():
+        return None
+    return base / f'{job_id}.json'
+
+
+def _key_path(key: str) -> Optional[Path]:
+    base = _job_dir()
+    if base is None:
+        return None
+    return base / 'keys' / hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+
+def _save(job: dict) -> None:
+    path = _job_path(job['id'])
+    if path is None:
+        return
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        _atomic_write(path, json.dumps(job))
+    except (OSError, TypeError, ValueError) as e:
+        logger.warning(f"Job store write failed for {job['id']}: {e}")
+
+
+def _load(job_id: str) -> Optional[dict]:
+    path = _job_path(job_id)
+    if path is None:
+        return None
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def _delete(job_id: str) -> None:
+    path = _job_path(job_id)
+    if path is not None:
+        try:
+            path.unlink()
+        except OSError:
+            pass
+
+
+def _atomic_write(path: Path, text: str) -> None:
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix='.tmp-')
+    with os.fdopen(fd, 'w') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def _prune() -> None:
+    """Drop expired jobs from memory and disk. Caller holds _lock."""
+    for job_id in [job_id for job_id, job in _jobs.items() if _expired(job) and job['status'] in ('done', 'failed')]:
+        del _jobs[job_id]
+    for key in [key for key, (job_id, _) in _keys.items() if job_id not in _jobs]:
+        del _keys[key]
+
+    base = _job_dir()
+    if base is None or not base.exists():
+        return
+    cutoff = time.time() - Config.JOB_TTL
+    for path in list(base.glob('*.json')) + list(base.glob('keys/*')):
+        try:
+            if path.stat().st_mtime < cutoff:
+                path.unlink()
+        except OSError:
+            pass
+
+
+def clear_jobs() -> None:
+    """Forget every job and idempotency key (tests)."""
+    with _lock:
+        _jobs.clear()
+        _keys.clear()
+        base = _job_dir()
+        if base is not None and base.exists():
+            for path in list(base.glob('*.json')) + list(base.glob('keys/*')):
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
@@ -0,0 +1,219 @@
+import io
+import logging
+import time
+from concurrent.futures import wait
+from typing import Dict, List, Optional
+
+import numpy as np
+from PIL import Image
+
+from config import Config
+from services.image_validator import fetch_image_bytes
+from utils.cache import TieredCache
+from utils.executors import PoolSaturated, get_pool
+
+logger = logging.getLogger(__name__)
+
+# Thumbnails are shrunk to THUMB_SIZE x THUMB_SIZE before clustering;
+# that's plenty to find an item's few dominant colors
+THUMB_SIZE = 32
+N_COLORS = 3
+KMEANS_ITERATIONS = 6
+
+# Pixels this light and unsaturated are treated as studio background
+BACKGROUND_L = 92
+BACKGROUND_CHROMA = 6
+
+# Sorted dominant colors per image URL: [[L, a, b, weight], ...]
+_color_cache = TieredCache(
+    'thumb_colors',
+    ttl=Config.THUMB_COLOR_TTL,
+    max_entries=Config.THUMB_COLOR_CACHE_SIZE
+)
+
+# sRGB -> XYZ (D65), and the D65 reference white
+_RGB_TO_XYZ = np.array([
+    [0.4124564, 0.3575761, 0.1804375],
+    [0.2126729, 0.7151522, 0.0721750],
+    [0.0193339, 0.1191920, 0.9503041],
+])
+_WHITE = np.array([0.95047, 1.0, 1.08883])
+
+
+def rgb_to_lab(rgb: np.ndarray) -> np.ndarray:
+    """Convert sRGB values (0-255, shape (..., 3)) to CIELAB."""
+    c = np.asarray(rgb, dtype=np.float64) / 255.0
+    linear = np.where(c <= 0.04045, c / 12.92, ((c + 0.055) / 1.055) ** 2.4)
+    xyz = linear @ _RGB_TO_XYZ.T / _WHITE
+    f = np.where(xyz > 0.008856, np.cbrt(xyz), 7.787 * xyz + 16 / 116)
+    return np.stack([
+        116 * f[..., 1] - 16,
+        500 * (f[..., 0] - f[..., 1]),
+        200 * (f[..., 1] - f[..., 2]),
+    ], axis=-1)
+
+
+def palette_lab(color_palette: List[Dict]) -> np.ndarray:
+    """Lab coordinates for a vibe's color_palette entries with valid hex codes."""
+    rgb = []
+    for color in color_palette or []:
+        hex_code = str(color.get('hex', '')).lstrip('#') if isinstance(color, dict) else ''
+        if len(hex_code) == 6:
+            try:
+                rgb.append([int(hex_code[i:i + 2], 16) for i in (0, 2, 4)])
+            except ValueError:
+                continue
+    return rgb_to_lab(np.array(rgb)) if rgb else np.empty((0, 3))
+
+
+def dominant_colors(pixels: np.ndarray, k: int = N_COLORS) -> tuple:
+    """
+    Batched k-means over many thumbnails at once.
+
+    Args:
+        pixels: uint8 array (N images, P pixels, 3)
+        k: Colors per image
+
+    Returns:
+        tuple: (centers, weights) with centers (N, k, 3) in Lab and weights
+        (N, k) the foreground share of each color
+    """
+    lab = rgb_to_lab(pixels)
+    chroma = np.hypot(lab[..., 1], lab[..., 2])
+    foreground = ~((lab[..., 0] > BACKGROUND_L) & (chroma < BACKGROUND_CHROMA))
+    # A product that really is white keeps all its pixels
+    foreground[~foreground.any(axis=1)] = True
+    mask = foreground.astype(np.float32)
+
+    # Seed centers at evenly spaced lightness quantiles of the foreground
+    lightness = np.where(foreground, lab[..., 0], np.inf)
+    order = np.argsort(lightness, axis=1)
+    counts = foreground.sum(axis=1)
+    ranks = (counts[:, None] * (2 * np.arange(k) + 1) // (2 * k)).astype(int)
+    seeds = np.take_along_axis(order, ranks, axis=1)
+    centers = np.take_along_axis(lab, seeds[..., None], axis=1)
+
+    # Squared distances expanded as |x|^2 - 2x.c + |c|^2 so the heavy part
+    # is one batched matmul per iteration
+    lab = lab.astype(np.float32)
+    centers = centers.astype(np.float32)
+    pixel_norms = (lab ** 2).sum(axis=-1)[..., None]
+    one_hot = np.eye(k, dtype=np.float32)
+    for _ in range(KMEANS_ITERATIONS):
+        distances = pixel_norms - 2 * lab @ centers.transpose(0, 2, 1) + (centers ** 2).sum(axis=-1)[:, None, :]
+        assignment = one_hot[distances.argmin(axis=-1)] * mask[..., None]
+        sizes = assignment.sum(axis=1)
+        sums = assignment.transpose(0, 2, 1) @ lab
+        centers = np.where(sizes[..., None] > 0, sums / np.maximum(sizes[..., None], 1), centers)
+
+    weights = sizes / np.maximum(sizes.sum(axis=1, keepdims=True), 1)
+    return centers, weights
+
+
+def palette_distance(centers: np.ndarray, weights: np.ndarray, palette: np.ndarray) -> np.ndarray:
+    """
+    Weighted CIE76 delta-E from each image's dominant colors to the nearest palette color.
+
+    Returns:
+        Array (N,) - around 10 is a close match, 40+ clearly off-palette
+    """
+    delta_e = np.linalg.norm(centers[:, :, None, :] - palette[None, None, :, :], axis=-1)
+    return (delta_e.min(axis=-1) * weights).sum(axis=-1)
+
+
+def fetch_thumbnail(url: str) -> Optional[np.ndarray]:
+    """Download and shrink a thumbnail to (THUMB_SIZE * THUMB_SIZE, 3) uint8 pixels, or None."""
+    data = fetch_image_bytes(url, timeout=Config.PALETTE_FETCH_BUDGET)
+    if data is None:
+        return None
+
+    try:
+        image = Image.open(io.BytesIO(data))
+        image.draft('RGB', (THUMB_SIZE * 2, THUMB_SIZE * 2))  # fast JPEG downscale on decode
+        image = image.convert('RGB').resize((THUMB_SIZE, THUMB_SIZE), Image.BILINEAR)
+        return np.asarray(image, dtype=np.uint8).reshape(-1, 3)
+    except Exception as e:
+        logger.debug(f"Thumbnail decode failed for {url[:60]}: {e}")
+        return None
+
+
+def product_colors(products: List[Dict]) -> List[Optional[list]]:
+    """
+    Dominant colors for each product's thumbnail, from cache or fetched.
+
+    Thumbnails are fetched concurrently on the 'images' pool; any not back
+    within PALETTE_FETCH_BUDGET seconds are left as None.
+    """
+    urls = [p.get('image_url', '') for p in products]
+    colors: Dict[str, Optional[list]] = {}
+    missing = []
+    for url in dict.fromkeys(u for u in urls if u):
+        cached = _color_cache.get(TieredCache.make_key(url))
+        if cached is not None:
+            colors[url] = cached
+        else:
+            missing.append(url)
+
+    if missing:
+        pool = get_pool('images')
+        futures = {}
+        for url in missing:
+            try:
+                futures[pool.submit(fetch_thumbnail, url)] = url
+            except PoolSaturated:
+                break
+        done, not_done = wait(futures, timeout=Config.PALETTE_FETCH_BUDGET)
+        for future in not_done:
+            future.cancel()
+
+        fetched = [(futures[f], f.result()) for f in done if f.result() is not None]
+        if fetched:
+            centers, weights = dominant_colors(np.stack([pixels for _, pixels in fetched]))
+            for (url, _), c, w in zip(fetched, centers, weights):
+                entry = [[*map(float, center), float(weight)] for center, weight in zip(c, w)]
+                entry.sort(key=lambda color: -color[3])
+                colors[url] = entry
+                _color_cache.set(TieredCache.make_key(url), entry)
+
+    return [colors.get(url) for url in urls]
+
+
+def prefilter_by_palette(products: List[Dict], color_palette: List[Dict]) -> List[Dict]:
+    """
+    Demote products whose thumbnail colors are far from the vibe's palette.
+
+    Products within PALETTE_MAX_DELTA_E keep their order at the front, so they
+    get the visual re-ranking slots; clear mismatches move to the end (most
+    distant last). Products without a usable thumbnail are left in place.
+    Sets 'palette_distance' on every product that was measured.
+
+    Returns:
+        Reordered products
+    """
+    if not Config.PALETTE_PREFILTER or not products:
+        return products
+
+    palette = palette_lab(color_palette)
+    if len(palette) == 0:
+        return products
+
+    start = time.time()
+    colors = product_colors(products)
+    measured = [i for i, c in enumerate(colors) if c]
+    if not measured:
+        return products
+
+    centers = np.array([[color[:3] for color in colors[i]] for i in measured])
+    weights = np.array([[color[3] for color in colors[i]] for i in measured])
+    distances = palette_distance(centers, weights, palette)
+    for i, distance in zip(measured, distances):
+        products[i]['palette_distance'] = round(float(distance), 1)
+
+    limit = Config.PALETTE_MAX_DELTA_E
+    kept = [p for p in products if p.get('palette_distance', 0) <= limit]
+    demoted = sorted((p for p in products if p.get('palette_distance', 0) > limit),
+                     key=lambda p: p['palette_distance'])
+
+    logger.info(f"Palette pre-filter: {len(measured)}/{len(products)} thumbnails measured, "
+                f"{len(demoted)} demoted in {time.time() - start:.2f}s")
+    return kept + demoted
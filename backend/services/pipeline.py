@@ -0,0 +1,315 @@
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from config import Config
+from services.vision import extract_mood
+from services.shopping import (
+    ITEM_TYPE_KEYWORDS,
+    detect_budget_from_prompt,
+    detect_item_type_from_prompt,
+    fetch_candidates,
+    filter_by_item_type,
+    product_key,
+    score_candidates,
+    score_outfit_coherence,
+    select_candidates,
+)
+from services.product_sessions import create_session, seen_filter
+from services.trends import get_trend_summary
+from utils.executors import PoolSaturated, get_pool
+
+logger = logging.getLogger(__name__)
+
+# Called as emit(event_name, payload) when a pipeline stage completes
+EmitFn = Callable[[str, Dict], None]
+
+# Mood profile fields each downstream stage needs before it can start
+TREND_FIELDS = ('name', 'style_archetype')
+SEARCH_FIELDS = ('name', 'mood', 'search_queries', 'target_brands', 'key_pieces', 'color_palette')
+
+
+class MoodcheckError(Exception):
+    """The pipeline could not produce a vibe (the vision step failed)."""
+
+
+def build_search_queries(mood_profile: Dict, prompt: str, item_type: Optional[str]) -> List[str]:
+    """
+    Pick the search queries for a mood profile.
+    When the prompt asks for a specific item type, queries focus on that item.
+    """
+    search_queries = mood_profile.get('search_queries', [])
+    vibe_name = mood_profile.get('name', '')
+
+    if not item_type:
+        return search_queries
+
+    logger.info(f"Detected item type: {item_type} - modifying search queries")
+    # Extract the specific item word from prompt (e.g., "boots" from "boho boots")
+    item_word = None
+    prompt_lower = prompt.lower()
+    for keyword in ITEM_TYPE_KEYWORDS.get(item_type, []):
+        if keyword in prompt_lower:
+            item_word = keyword
+            break
+
+    # Create item-specific queries using the vibe name
+    if item_word and vibe_name:
+        search_queries = [
+            f"{vibe_name} {item_word} women",
+            f"{item_word} {vibe_name} style",
+            f"womens {item_word} {mood_profile.get('mood', '')}",
+            f"{item_word} {' '.join(mood_profile.get('textures', [])[:2])}",
+            f"trendy {item_word} {vibe_name}",
+            f"{item_word} outfit {vibe_name}",
+        ]
+        logger.info(f"Modified queries: {search_queries}")
+
+    return search_queries
+
+
+def build_vibe(mood_profile: Dict) -> Dict:
+    """The subset of the mood profile returned to clients."""
+    return {
+        'name': mood_profile.get('name', 'Your Mood'),
+        'mood': mood_profile.get('mood', ''),
+        'color_palette': mood_profile.get('color_palette', []),
+        'textures': mood_profile.get('textures', []),
+        'key_pieces': mood_profile.get('key_pieces', []),
+        'avoid': mood_profile.get('avoid', []),
+        # Echoed back to /api/more-products, where it keys stored vibe scores
+        'style_archetype': mood_profile.get('style_archetype', {})
+    }
+
+
+def coherence_swaps(provisional: List[Dict], final: List[Dict]) -> List[Dict]:
+    """
+    Describe coherence swaps as a patch against the provisional list.
+
+    Returns:
+        List of {'replace_id': <product key>, 'product': <replacement>}
+    """
+    swaps = []
+    for before, after in zip(provisional, final):
+        if product_key(before) != product_key(after):
+            swaps.append({'replace_id': product_key(before), 'product': after})
+    return swaps
+
+
+def run_moodcheck(
+    images: list,
+    prompt: str,
+    max_products: int = 20,
+    emit: Optional[EmitFn] = None,
+    decoded: Optional[list] = None
+) -> Dict:
+    """
+    Run the full moodcheck: vision, then product search and trends in parallel.
+
+    decoded, if given, holds the DecodedImages produced while validating the
+    request (aligned with images) so the uploads are decoded only once.
+
+    When emit is given it is called as each stage completes, and every
+    event precedes the returned response:
+        - 'vibe': vibe profile, as soon as extract_mood returns
+        - 'trend': trend summary, as soon as the lookup finishes (from the
+          'trends' pool, but never before 'vibe'); None if it hasn't
+          within Config.TREND_TIMEOUT once products are ranked
+        - 'products': provisional ranked products (before coherence)
+        - 'coherence': swaps patch from score_outfit_coherence, against
+          the 'products' list
+    emit may be called from a pool thread, so it must be thread-safe.
+
+    Returns:
+        The full moodcheck response body
+
+    Raises:
+        MoodcheckError: If the vision step fails
+    """
+    start_time = time.time()
+    budget = detect_budget_from_prompt(prompt)
+    item_type = detect_item_type_from_prompt(prompt)
+
+    def notify(event: str, payload: Dict):
+        if emit:
+            emit(event, payload)
+
+    def fetch_trend(profile: Dict):
+        vibe_name = profile.get('name', '')
+        if not vibe_name:
+            return None
+        try:
+            logger.info(f"Fetching trend data for '{vibe_name}'...")
+            start = time.time()
+            # Pass style_archetype for smarter keyword extraction
+            result = get_trend_summary(vibe_name, style_archetype=profile.get('style_archetype'))
+            logger.info(f"Trend data fetched in {time.time() - start:.2f}s")
+            return result
+        except Exception as e:
+            logger.error(f"Trend API error: {e}")
+            return None
+
+    def fetch_product_candidates(profile: Dict):
+        try:
+            logger.info("Searching Google Shopping...")
+            start = time.time()
+            queries = build_search_queries(profile, prompt, item_type)
+            result = fetch_candidates(queries, budget=budget, vibe_profile=profile)
+            logger.info(f"Search completed in {time.time() - start:.2f}s - {len(result)} candidates")
+            return result
+        except Exception as e:
+            logger.error(f"Shopping API error: {e}")
+            return []
+
+    # 'trend' is sent exactly once: when the lookup finishes, or with the
+    # timeout result, whichever comes first; held back until 'vibe' is out
+    trend_lock = threading.Lock()
+    trend_state = {'vibe_sent': False, 'ready': False, 'sent': False, 'trend': None}
+
+    def send_trend(trend: Optional[Dict] = None, ready: bool = True):
+        with trend_lock:
+            if ready and not trend_state['ready']:
+                trend_state.update(ready=True, trend=trend)
+            if trend_state['ready'] and trend_state['vibe_sent'] and not trend_state['sent']:
+                trend_state['sent'] = True
+                notify('trend', {'trend': trend_state['trend']})
+
+    def on_trend_done(future):
+        if not future.cancelled() and future.exception() is None:
+            send_trend(future.result())
+
+    # Searches and trends start as soon as the fields they need have streamed
+    # in from the vision model, overlapping with the rest of the generation.
+    # Both run on shared pools so thread count stays flat under load.
+    futures = {}
+    fields = {}
+    fields_lock = threading.Lock()
+    # Item-focused queries are built from textures too (see build_search_queries)
+    search_fields = SEARCH_FIELDS + (('textures',) if item_type else ())
+
+    def start(name: str, pool: str, fn, profile: Dict):
+        try:
+            futures[name] = get_pool(pool).submit(fn, profile)
+        except PoolSaturated as e:
+            # Left unset; the stage runs inline once vision has finished
+            logger.warning(f"{e} - {name} will run after vision")
+            futures[name] = None
+
+    def on_field(name: str, value):
+        with fields_lock:
+            fields[name] = value
+            if 'trend' not in futures and all(f in fields for f in TREND_FIELDS):
+                start('trend', 'trends', fetch_trend, dict(fields))
+                if futures['trend'] is not None:
+                    futures['trend'].add_done_callback(on_trend_done)
+            if 'candidates' not in futures and all(f in fields for f in search_fields):
+                logger.info(f"Starting product search {time.time() - start_time:.2f}s into vision call")
+                # Runs on 'pipeline' because it waits on the 'serpapi' pool
+                start('candidates', 'pipeline', fetch_product_candidates, dict(fields))
+
+    # Step 1: Extract mood from images
+    try:
+        logger.info("Calling Vision API...")
+        vision_start = time.time()
+        if Config.VISION_STREAMING:
+            mood_profile = extract_mood(images, prompt, on_field=on_field, decoded=decoded)
+        else:
+            mood_profile = extract_mood(images, prompt, decoded=decoded)
+            for name, value in mood_profile.items():
+                on_field(name, value)
+        vision_time = time.time() - vision_start
+        logger.info(f"Vision API completed in {vision_time:.2f}s - Mood: {mood_profile.get('name')}")
+    except Exception as e:
+        for future in futures.values():
+            if future is not None:
+                future.cancel()
+        logger.error(f"Vision API error: {e}")
+        raise MoodcheckError('Unable to analyze images. Please try again.') from e
+
+    search_queries = build_search_queries(mood_profile, prompt, item_type)
+
+    notify('vibe', {
+        'vibe': build_vibe(mood_profile),
+        'search_queries_used': search_queries[:8],
+        'detected_item_type': item_type
+    })
+    with trend_lock:
+        trend_state['vibe_sent'] = True
+    send_trend(ready=False)
+
+    # Step 2 & 3: rank products while the trend lookup finishes. The whole
+    # scored pool, and the candidates past the re-ranking cut, are kept for
+    # /api/more-products pages
+    scored_pool: List[Dict] = []
+    reserve: List[Dict] = []
+
+    def rank_products(candidates: List[Dict]) -> List[Dict]:
+        try:
+            scored_pool.extend(score_candidates(candidates, vibe_profile=mood_profile, reserve=reserve))
+            selected, bench = select_candidates(scored_pool, max_products=max_products)
+            if item_type:
+                # Filter before coherence so its swaps patch the list the client has
+                selected = filter_by_item_type(selected, item_type)
+                bench = filter_by_item_type(bench, item_type)
+                logger.info(f"Filtered to {len(selected)} {item_type} items")
+
+            notify('products', {'products': selected, 'provisional': True})
+
+            final = selected
+            if len(selected) >= 5:
+                final = score_outfit_coherence(
+                    selected_products=list(selected),
+                    bench_products=bench,
+                    vibe_profile=mood_profile,
+                    max_swaps=3
+                )
+            notify('coherence', {'swaps': coherence_swaps(selected, final)})
+            return final
+        except Exception as e:
+            logger.error(f"Product ranking error: {e}")
+            return []
+
+    def collect_trend(timeout: Optional[float]) -> Optional[Dict]:
+        trend_future = futures.get('trend')
+        if trend_future is None:
+            return fetch_trend(mood_profile)
+        try:
+            return trend_future.result(timeout=timeout)
+        except Exception as e:
+            trend_future.cancel()
+            logger.error(f"Trend lookup failed or timed out: {e}")
+            return None
+
+    parallel_start = time.time()
+    candidates_future = futures.get('candidates')
+    candidates = candidates_future.result() if candidates_future is not None else fetch_product_candidates(mood_profile)
+
+    products = rank_products(candidates)
+    # Usually already sent from the trends pool; this covers a lookup that
+    # ran inline or timed out
+    send_trend(collect_trend(Config.TREND_TIMEOUT))
+    trend = trend_state['trend']
+    logger.info(f"Products and trend completed {time.time() - parallel_start:.2f}s after vision")
+
+    seen = seen_filter(product_key(p) for p in products)
+    try:
+        session_id = create_session(mood_profile, pool=scored_pool, seen=seen, budget=budget, reserve=reserve)
+    except Exception as e:
+        # Paging falls back to posting the vibe profile (and seen token) back
+        logger.error(f"Product session error: {e}")
+        session_id = None
+
+    response = {
+        'success': True,
+        'vibe': build_vibe(mood_profile),
+        'trend': trend,
+        'products': products,
+        'search_queries_used': search_queries[:8],
+        'detected_item_type': item_type,  # Frontend can use this to pre-select filter
+        'session_id': session_id,  # Pass to /api/more-products for the next page
+        'seen': seen.to_token()  # Shown products, in case the session expires
+    }
+
+    logger.info(f"Moodcheck completed in {time.time() - start_time:.2f}s")
+    return response
@@ -0,0 +1,234 @@
+import logging
+import math
+import threading
+import time
+import uuid
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from config import Config
+from services.shopping import (
+    RERANK_MAX,
+    build_more_queries,
+    fetch_candidates,
+    product_key,
+    score_candidates,
+    select_candidates,
+)
+from utils.bloom import BloomFilter
+from utils.cache import TieredCache
+
+logger = logging.getLogger(__name__)
+
+# A moodcheck's scored candidate pool, kept so /api/more-products can page
+# through it instead of searching and re-ranking again. Shared between
+# workers through the cache's disk tier:
+#   {'vibe_profile', 'budget', 'pool': [products not shown yet, best first],
+#    'reserve': [unscored candidates past the re-ranking cut, best first],
+#    'seen': BloomFilter token of product keys already shown,
+#    'next_query': rotation offset into build_more_queries,
+#    'version': bumped on every write, 'created_at'}
+_sessions = TieredCache(
+    'product_sessions',
+    ttl=Config.PRODUCT_SESSION_TTL,
+    max_entries=Config.PRODUCT_SESSION_CACHE_SIZE
+)
+# Serialize read-modify-write of a session within this process. Held only
+# while reading and writing the record; refills (seconds of scoring and
+# searching) run outside it and are merged back by version
+_locks = [threading.Lock() for _ in range(64)]
+
+# A refill searches one alternative query per REFILL_YIELD products the page
+# is short (new products a query typically adds after dedupe and the vibe
+# gate), at most REFILL_MAX_QUERIES (fetch_candidates searches no more base
+# queries). Later refills rotate to the next queries.
+REFILL_YIELD = 5
+REFILL_MAX_QUERIES = 4
+
+
+def seen_filter(keys: Iterable[str] = (), token: Optional[str] = None) -> BloomFilter:
+    """
+    Build the compact set of product keys a client has been shown.
+
+    Args:
+        keys: Product keys to add
+        token: A 'seen' token from an earlier response to start from; an
+            invalid token is ignored
+
+    Returns:
+        BloomFilter sized by Config.SEEN_FILTER_BITS
+    """
+    seen = None
+    if token:
+        try:
+            seen = BloomFilter.from_token(token)
+        except ValueError as e:
+            logger.warning(f"Ignoring seen token: {e}")
+    if seen is None:
+        seen = BloomFilter(Config.SEEN_FILTER_BITS, Config.SEEN_FILTER_HASHES)
+    seen.update(keys)
+    return seen
+
+
+def create_session(
+    vibe_profile: Dict,
+    pool: List[Dict],
+    seen: Optional[BloomFilter] = None,
+    budget: Optional[str] = None,
+    reserve: Optional[List[Dict]] = None
+) -> str:
+    """
+    Store a candidate pool for later pages.
+
+    Args:
+        vibe_profile: The full mood profile (used if the pool needs a refill)
+        pool: Scored products (score_candidates output), best first
+        seen: Products the client has already been shown (seen_filter)
+        budget: Price filter for refill searches
+        reserve: Unscored candidates (score_candidates reserve), scored
+            before any refill search; at most Config.PRODUCT_SESSION_RESERVE
+            are kept
+
+    Returns:
+        The session id
+    """
+    session_id = uuid.uuid4().hex
+    if seen is None:
+        seen = seen_filter()
+    _sessions.set(session_id, {
+        'vibe_profile': vibe_profile,
+        'budget': budget,
+        'pool': [p for p in pool if product_key(p) not in seen],
+        'reserve': [p for p in (reserve or []) if product_key(p) not in seen][:Config.PRODUCT_SESSION_RESERVE],
+        'seen': seen.to_token(),
+        'next_query': 0,
+        'version': 0,
+        'created_at': time.time(),
+    })
+    return session_id
+
+
+def get_session(session_id: str) -> Optional[dict]:
+    """A session's record, or None if unknown or expired."""
+    if not session_id or not session_id.isalnum():
+        return None
+    return _sessions.get(session_id)
+
+
+def next_page(session_id: str, max_products: int = 20, exclude_ids: Iterable[str] = ()) -> Optional[Tuple[List[Dict], dict]]:
+    """
+    Serve the next page of products from a session's pool.
+
+    The page is diversified across categories like the first one. Only when
+    the pool can't fill it are more products scored (from the session's
+    reserve first, then from new searches) and added to the pool. The
+    refill runs without holding the session's lock; its products are merged
+    into whatever the session holds by then.
+
+    Args:
+        session_id: From create_session
+        max_products: Page size
+        exclude_ids: Extra product keys to skip (from older clients that
+            still post every shown id; the session already tracks them)
+
+    Returns:
+        tuple: (products, info) with info holding 'source' ('pool',
+        'reserve' or 'search'), 'remaining' (products left in the pool) and 'seen' (token
+        of every product shown so far, for seen_filter if the session
+        expires), or None if the session is unknown or expired
+    """
+    exclude_ids = list(exclude_ids)
+    lock = _locks[hash(session_id) % len(_locks)]
+    with lock:
+        session = get_session(session_id)
+        if session is None:
+            return None
+
+        seen = seen_filter(exclude_ids, token=session['seen'])
+        pool = [p for p in session['pool'] if product_key(p) not in seen]
+        if len(pool) >= max_products:
+            return _serve(session_id, session, pool, seen, max_products, 'pool')
+
+        # Take the reserve and queries this refill uses, so a concurrent
+        # page refills from the ones after them
+        claim = _claim_refill(session, max_products - len(pool), seen)
+        _save(session_id, session)
+
+    fresh = _refill(session, claim, max_products - len(pool), seen, {product_key(p) for p in pool})
+
+    with lock:
+        current = get_session(session_id)
+        if current is not None and current.get('version') != session['version']:
+            # Another page was served meanwhile; merge into its state
+            session = current
+            seen = seen_filter(exclude_ids, token=session['seen'])
+            pool = [p for p in session['pool'] if product_key(p) not in seen]
+        if not claim['searched'] and session['next_query'] == claim['next_query']:
+            # The reserve covered the page; the claimed queries come next time
+            session['next_query'] = claim['start']
+        pooled = {product_key(p) for p in pool}
+        for p in fresh:
+            key = product_key(p)
+            if key not in seen and key not in pooled:
+                pooled.add(key)
+                pool.append(p)
+        return _serve(session_id, session, pool, seen, max_products, 'search' if claim['searched'] else 'reserve')
+
+
+def _serve(session_id: str, session: dict, pool: List[Dict], seen: BloomFilter, max_products: int, source: str) -> Tuple[List[Dict], dict]:
+    """Select a page from the pool, mark it seen and save the session (under its lock)."""
+    page, _ = select_candidates(pool, max_products=max_products)
+    shown = {product_key(p) for p in page}
+    seen.update(shown)
+    session['pool'] = [p for p in pool if product_key(p) not in shown]
+    session['seen'] = seen.to_token()
+    _save(session_id, session)
+
+    logger.info(f"Session page: {len(page)} products from {source}, {len(session['pool'])} left in pool")
+    return page, {'source': source, 'remaining': len(session['pool']), 'seen': session['seen']}
+
+
+def _save(session_id: str, session: dict) -> None:
+    session['version'] = session.get('version', 0) + 1
+    _sessions.set(session_id, session)
+
+
+def _claim_refill(session: dict, needed: int, seen: BloomFilter) -> dict:
+    """
+    Take the next reserve products and alternative queries (enough for
+    `needed` products) off the session. Called under the session's lock.
+    """
+    reserve = [p for p in session.get('reserve', []) if product_key(p) not in seen]
+    session['reserve'] = reserve[RERANK_MAX:]
+
+    queries = build_more_queries(session['vibe_profile'])
+    start = session.get('next_query', 0)
+    batch = []
+    if queries:
+        count = min(REFILL_MAX_QUERIES, len(queries), math.ceil(needed / REFILL_YIELD))
+        start %= len(queries)
+        batch = (queries[start:] + queries[:start])[:count]
+        session['next_query'] = start + count
+    return {'reserve': reserve[:RERANK_MAX], 'queries': batch, 'start': start,
+            'next_query': session.get('next_query', 0), 'searched': False}
+
+
+def _refill(session: dict, claim: dict, needed: int, seen: BloomFilter, pooled: Set[str]) -> List[Dict]:
+    """Score the claimed reserve, then search the claimed queries if the page is still short."""
+    vibe_profile = session['vibe_profile']
+    scored = []
+    if claim['reserve']:
+        logger.info(f"Refilling session pool from {len(claim['reserve'])} reserve products")
+        scored = score_candidates(claim['reserve'], vibe_profile)
+    if len(scored) >= needed or not claim['queries']:
+        return scored
+
+    logger.info(f"Refilling session pool with queries: {claim['queries'][:4]}")
+    claim['searched'] = True
+    candidates = fetch_candidates(claim['queries'], budget=session.get('budget'), vibe_profile=vibe_profile)
+    fresh = [p for p in candidates if product_key(p) not in seen and product_key(p) not in pooled]
+    return scored + score_candidates(fresh, vibe_profile)
+
+
+def clear_sessions() -> int:
+    """Forget every session (tests)."""
+    return _sessions.clear()
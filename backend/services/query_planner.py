@@ -0,0 +1,129 @@
+import logging
+import threading
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from config import Config
+from utils.lexicon import tokenize
+
+logger = logging.getLogger(__name__)
+
+# Words the query builders add to every kind of query. They barely change
+# what Google Shopping returns, so they are ignored when comparing queries:
+# "trending oversized blazer women" and "oversized blazer" are the same search.
+NOISE_TOKENS = frozenset({
+    'trending', 'women', 'womens', 's', 'style', 'fashion', 'clothing', 'for',
+})
+
+_stats_lock = threading.Lock()
+_stats = {
+    'plans': 0,
+    'queries_in': 0,
+    'collapsed': 0,
+}
+
+
+def canonical_tokens(query: str) -> FrozenSet[str]:
+    """
+    Order-free canonical form of a query for duplicate detection.
+
+    Lowercased lexicon tokens (so "J.Crew" and "j crew" match) without
+    NOISE_TOKENS. A query made only of noise words keeps all of its tokens.
+    """
+    tokens = frozenset(tokenize(query))
+    return (tokens - NOISE_TOKENS) or tokens
+
+
+def similarity(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    """Jaccard similarity of two token sets."""
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+class QueryPlan:
+    """
+    Searches to run for one request, and the SerpApi calls that saves.
+
+    Attributes:
+        queries: Queries to search, in their original priority order
+        collapsed: Dropped query -> the kept query that covers it
+        requested: Number of queries before planning (repeats included)
+    """
+
+    def __init__(self, queries: List[str], collapsed: Dict[str, str], requested: int):
+        self.queries = queries
+        self.collapsed = collapsed
+        self.requested = requested
+
+    @property
+    def saved(self) -> int:
+        """SerpApi calls this request didn't make by planning."""
+        return self.requested - len(self.queries)
+
+
+def plan_queries(
+    queries: List[str],
+    threshold: Optional[float] = None,
+    keep: Iterable[str] = ()
+) -> QueryPlan:
+    """
+    Drop exact and near-duplicate queries before searching.
+
+    Queries are compared by canonical_tokens. A query whose similarity to an
+    earlier kept query reaches the threshold is dropped, so the query
+    builders' order (base, then brand, then color queries) decides which
+    phrasing is searched. Only this request's queries are collapsed; across
+    requests, identical (normalized) queries share the search cache.
+
+    Args:
+        queries: Candidate queries, highest priority first
+        threshold: Jaccard similarity at which two queries count as the same
+            search (default Config.QUERY_SIMILARITY)
+        keep: Queries never dropped as near-duplicates, only as exact
+            repeats (e.g. brand queries, whose results get a brand boost)
+
+    Returns:
+        QueryPlan with the queries to search
+    """
+    if threshold is None:
+        threshold = Config.QUERY_SIMILARITY
+
+    keep = set(keep)
+    kept: List[Tuple[str, FrozenSet[str]]] = []
+    collapsed: Dict[str, str] = {}
+    for query in queries:
+        tokens = canonical_tokens(query)
+        if not tokens:
+            continue
+        if query in keep:
+            match = next((q for q, _ in kept if q == query), None)
+        else:
+            match = next((q for q, t in kept if similarity(tokens, t) >= threshold), None)
+        if match is None:
+            kept.append((query, tokens))
+        elif query != match:
+            collapsed.setdefault(query, match)
+
+    plan = QueryPlan([q for q, _ in kept], collapsed, len(queries))
+    with _stats_lock:
+        _stats['plans'] += 1
+        _stats['queries_in'] += len(queries)
+        _stats['collapsed'] += len(queries) - len(plan.queries)
+    if collapsed:
+        logger.info(f"Collapsed {len(collapsed)} near-duplicate queries: {collapsed}")
+    return plan
+
+
+def planner_stats() -> Dict:
+    """
+    Cumulative SerpApi calls saved since the process started: queries
+    dropped by planning, plus searches that joined an identical one already
+    in flight (the search cache's coalesced count).
+    """
+    from services.shopping import search_cache
+
+    with _stats_lock:
+        stats = dict(_stats)
+    stats['shared'] = search_cache.stats()['coalesced']
+    stats['saved'] = stats['collapsed'] + stats['shared']
+    return stats
@@ -2,16 +2,33 @@ import re
 import json
 import logging
 import openai
-from typing import List, Dict, Optional
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Iterator, List, Dict, Optional, Tuple
+from concurrent.futures import Future, as_completed
 from serpapi import GoogleSearch
 from config import Config
+from utils.executors import PoolSaturated, get_pool
+from utils.cache import TieredCache
+from utils.lexicon import Lexicon
+from services.image_validator import ValidationBatch
+from services.palette import prefilter_by_palette
+from services.query_planner import plan_queries
+from services.vibe_scores import lookup_scores, store_scores, vibe_fingerprint
 
 logger = logging.getLogger(__name__)
 
 # Initialize OpenAI client for re-ranking
 client = openai.OpenAI(api_key=Config.OPENAI_API_KEY)
 
+# Raw SerpApi results keyed by normalized query + price filters.
+# Shared across workers via the disk tier; hot queries refresh before expiring.
+search_cache = TieredCache(
+    'serpapi',
+    ttl=Config.SEARCH_CACHE_TTL,
+    max_entries=Config.SEARCH_CACHE_SIZE,
+    refresh_ahead=0.8,
+    refresh_pool='serpapi'
+)
+
 # Trusted retailers for quality filtering
 TRUSTED_RETAILERS = {
     # Fast fashion
@@ -84,19 +101,31 @@ BLOCKED_BRANDS = {
     "amazon essentials", "amazon basics", "generic", "unbranded"
 }
 
+# Compiled once: brand and retailer lookups are whole-word phrase matches
+BRAND_LEXICON = Lexicon({
+    'trusted': TRUSTED_RETAILERS,
+    'curated': CURATED_BRANDS,
+    'editorial': EDITORIAL_BRANDS,
+    'trending': TRENDING_BRANDS,
+    'blocked': BLOCKED_BRANDS,
+})
 
-def search_products(
+
+def normalize_query(query: str) -> str:
+    """Lowercase and collapse whitespace so equivalent queries share a cache key."""
+    return " ".join(query.lower().split())
+
+
+def build_search_params(
     query: str,
     num_results: int = 10,
     min_price: Optional[int] = None,
     max_price: Optional[int] = None
-) -> List[Dict]:
-    """
-    Search Google Shopping via SerpApi for products.
-    """
+) -> Dict:
+    """Build SerpApi Google Shopping params for a query and price range."""
     params = {
         "engine": "google_shopping",
-        "q": query,
+        "q": normalize_query(query),
         "api_key": Config.SERPAPI_KEY,
         "num": min(num_results, 40),
         "gl": "us",
@@ -110,15 +139,45 @@ def search_products(
         existing_tbs = params.get("tbs", "mr:1,price:1")
         params["tbs"] = f"{existing_tbs},ppr_max:{max_price}"
 
+    return params
+
+
+def search_cache_key(params: Dict) -> str:
+    """Cache key for a SerpApi request (the API key is deliberately excluded)."""
+    return search_cache.make_key(params["q"], params["num"], params.get("tbs", ""))
+
+
+def _fetch_shopping_results(params: Dict) -> List[Dict]:
+    """Call SerpApi and return raw shopping results. Raises on API errors so they aren't cached."""
+    results = GoogleSearch(params).get_dict()
+    if "error" in results and "shopping_results" not in results:
+        raise Exception(results["error"])
+    return results.get("shopping_results", [])
+
+
+def search_products(
+    query: str,
+    num_results: int = 10,
+    min_price: Optional[int] = None,
+    max_price: Optional[int] = None
+) -> List[Dict]:
+    """
+    Search Google Shopping via SerpApi for products.
+    Results are cached; concurrent identical searches share one upstream call.
+    """
+    params = build_search_params(query, num_results, min_price, max_price)
+
     try:
-        search = GoogleSearch(params)
-        results = search.get_dict()
+        items = search_cache.get_or_load(
+            search_cache_key(params),
+            lambda: _fetch_shopping_results(params)
+        )
     except Exception as e:
         logger.error(f"SerpApi error: {e}")
         return []
 
     products = []
-    for item in results.get("shopping_results", []):
+    for item in items:
         product = format_product(item, query)
         if product:
             products.append(product)
@@ -184,11 +243,7 @@ def extract_brand(title: str) -> str:
 
 def is_trusted_retailer(retailer: str) -> bool:
     """Check if retailer is in our trusted list."""
-    retailer_lower = retailer.lower().strip()
-    for trusted in TRUSTED_RETAILERS:
-        if trusted in retailer_lower or retailer_lower in trusted:
-            return True
-    return False
+    return 'trusted' in BRAND_LEXICON.labels(retailer or "")
 
 
 def is_blocked_brand(brand: str, product_name: str = "") -> bool:
@@ -196,13 +251,8 @@ def is_blocked_brand(brand: str, product_name: str = "") -> bool:
     Check if a brand should be excluded from results.
     Checks both brand field and product name for blocked terms.
     """
-    brand_lower = brand.lower().strip() if brand else ""
-    name_lower = product_name.lower() if product_name else ""
-
-    for blocked in BLOCKED_BRANDS:
-        if blocked in brand_lower or blocked in name_lower:
-            return True
-    return False
+    return ('blocked' in BRAND_LEXICON.labels(brand or "")
+            or 'blocked' in BRAND_LEXICON.labels(product_name or ""))
 
 
 def get_brand_score(brand: str) -> int:
@@ -212,10 +262,10 @@ def get_brand_score(brand: str) -> int:
     """
     if not brand:
         return 0
-    brand_lower = brand.lower().strip()
-    in_curated = any(c in brand_lower or brand_lower in c for c in CURATED_BRANDS)
-    in_editorial = any(e in brand_lower or brand_lower in e for e in EDITORIAL_BRANDS)
-    in_trending = any(t in brand_lower or brand_lower in t for t in TRENDING_BRANDS)
+    labels = BRAND_LEXICON.labels(brand)
+    in_curated = 'curated' in labels
+    in_editorial = 'editorial' in labels
+    in_trending = 'trending' in labels
 
     # Score hierarchy: editorial+trending > editorial > trending > curated > unknown
     if in_editorial and in_trending:
@@ -354,6 +404,94 @@ def create_color_queries(
     return color_queries
 
 
+# Aesthetic-specific signature accessories
+AESTHETIC_ACCESSORIES = {
+    "western": ["cowboy boots women", "western belt women", "turquoise jewelry", "fringe bag", "cowgirl hat"],
+    "coastal": ["swimsuit women", "bikini set", "beach cover up", "straw tote bag", "espadrilles women"],
+    "tropical": ["swimsuit women", "bikini set", "sarong wrap", "raffia bag", "platform sandals"],
+    "beach": ["swimsuit women", "bikini set", "beach dress", "woven tote", "slide sandals"],
+    "boho": ["fringe boots women", "layered necklaces", "wide brim hat", "embroidered bag", "ankle boots suede"],
+    "bohemian": ["fringe boots women", "statement earrings", "floppy hat", "crossbody bag leather", "gladiator sandals"],
+    "minimalist": ["structured tote bag", "simple gold jewelry", "white sneakers women", "leather belt slim", "watch women minimal"],
+    "quiet luxury": ["cashmere scarf", "leather loafers women", "gold hoops small", "structured handbag", "ballet flats leather"],
+    "parisian": ["ballet flats women", "silk scarf", "structured handbag", "gold jewelry classic", "kitten heels"],
+    "athleisure": ["running sneakers women", "gym bag", "sports bra", "leggings high waist", "baseball cap"],
+    "glamorous": ["statement earrings", "clutch bag evening", "strappy heels", "sparkle jewelry", "evening bag"],
+    "mob wife": ["fur coat women", "gold chunky jewelry", "designer sunglasses", "leopard print heels", "statement handbag"],
+    "cottagecore": ["mary jane shoes", "wicker basket bag", "pearl jewelry", "floral headband", "lace socks"],
+    "scandinavian": ["minimalist watch", "leather backpack", "wool scarf", "white sneakers clean", "structured bag"],
+    "corporate": ["structured tote leather", "pointed toe heels", "pearl earrings", "silk blouse", "watch classic women"],
+    "old money": ["loafers leather women", "pearl necklace", "silk scarf", "tennis bracelet", "ballet flats"],
+    "coquette": ["ballet flats bow", "ribbon hair accessories", "pearl jewelry", "mini bag", "mary janes"],
+    "dark academia": ["oxford shoes women", "leather satchel", "vintage watch", "gold rimmed glasses", "wool beret"],
+    "grunge": ["combat boots women", "choker necklace", "crossbody bag chain", "silver rings", "platform boots"],
+    "vintage": ["cat eye sunglasses", "pearl earrings", "structured handbag", "heels kitten", "silk scarf vintage"],
+    "streetwear": ["chunky sneakers", "bucket hat", "crossbody bag", "baseball cap", "platform sneakers"],
+}
+
+
+def build_more_queries(vibe_profile: Dict) -> List[str]:
+    """
+    Alternative search queries for more products in a vibe: signature
+    accessories, key pieces, textures, colors and general style queries.
+    """
+    vibe_name = vibe_profile.get('name', '')
+    key_pieces = vibe_profile.get('key_pieces', [])
+    textures = vibe_profile.get('textures', [])
+    color_palette = vibe_profile.get('color_palette', [])
+
+    # Create varied queries using different combinations
+    alt_queries = []
+
+    # Add aesthetic-specific accessories first (signature items for the vibe)
+    vibe_lower = vibe_name.lower()
+    for aesthetic_key, accessories in AESTHETIC_ACCESSORIES.items():
+        if aesthetic_key in vibe_lower:
+            for accessory in accessories[:3]:  # Top 3 signature accessories
+                alt_queries.append(f"{accessory} {vibe_name}")
+            logger.info(f"Added {aesthetic_key} accessories: {accessories[:3]}")
+            break
+
+    # Use key pieces with vibe name
+    for piece in key_pieces[:4]:
+        alt_queries.append(f"{piece} {vibe_name} style women")
+
+    # Use textures
+    for texture in textures[:2]:
+        alt_queries.append(f"{texture} {vibe_name} clothing women")
+
+    # Use colors
+    for color in color_palette[:2]:
+        color_name = color.get('name', '') if isinstance(color, dict) else color
+        if color_name:
+            alt_queries.append(f"{color_name} {vibe_name} fashion women")
+
+    # Add some general style queries
+    alt_queries.extend([
+        f"{vibe_name} outfit ideas women",
+        f"{vibe_name} wardrobe essentials",
+        f"trending {vibe_name} fashion"
+    ])
+
+    # Texture/color variants often restate a key-piece query
+    return plan_queries(alt_queries).queries
+
+
+# Products scoring below this don't genuinely match the vibe
+MIN_VIBE_SCORE = 6
+
+# Quality alternatives kept for coherence swaps
+BENCH_SIZE = 15
+
+# Products AI re-ranked per score_candidates call; the rest go unscored
+RERANK_MAX = 50
+
+
+def product_key(product: Dict) -> str:
+    """Identity of a product across searches (id + URL)."""
+    return product.get("id", "") + product.get("product_url", "")
+
+
 def search_all_queries(
     search_queries: List[str],
     max_products: int = 20,
@@ -363,6 +501,78 @@ def search_all_queries(
     """
     Search multiple queries, filter, re-rank with AI, and return best matches.
     Now includes brand-specific queries from the vibe profile.
+
+    Runs the three stages in order: fetch_candidates, rank_candidates and
+    score_outfit_coherence. Callers that want to show intermediate results
+    (e.g. the streaming moodcheck) can run the stages themselves.
+    """
+    candidates = fetch_candidates(search_queries, budget=budget, vibe_profile=vibe_profile)
+    diversified, bench_products = rank_candidates(candidates, max_products=max_products, vibe_profile=vibe_profile)
+
+    # Apply outfit coherence scoring if we have a vibe profile
+    if vibe_profile and len(diversified) >= 5:
+        diversified = score_outfit_coherence(
+            selected_products=diversified,
+            bench_products=bench_products,
+            vibe_profile=vibe_profile,
+            max_swaps=3  # Allow up to 3 items to be swapped for better coherence
+        )
+        logger.info(f"After coherence scoring: {len(diversified)} products")
+
+    return diversified
+
+
+def iter_search_results(
+    queries: List[str],
+    num_results: int,
+    min_price: Optional[int] = None,
+    max_price: Optional[int] = None
+) -> Iterator[Tuple[str, List[Dict]]]:
+    """
+    Run searches in parallel and yield (query, products) as results arrive.
+
+    Config.SEARCH_BACKEND selects the implementation: 'threads' (GoogleSearch
+    calls on the shared 'serpapi' pool) or 'async' (pooled keep-alive HTTP client on a shared
+    event loop, see services/shopping_async.py).
+    """
+    if Config.SEARCH_BACKEND == 'async':
+        from services.shopping_async import iter_search_queries_async
+        yield from iter_search_queries_async(queries, num_results, min_price, max_price)
+        return
+
+    def fetch_query(query):
+        try:
+            return search_products(
+                query=query,
+                num_results=num_results,
+                min_price=min_price,
+                max_price=max_price
+            )
+        except Exception as e:
+            logger.error(f"Error searching '{query}': {e}")
+            return []
+
+    pool = get_pool('serpapi')
+    futures = {}
+    for query in queries:
+        try:
+            futures[pool.submit(fetch_query, query)] = query
+        except PoolSaturated:
+            # Backpressure: run on the caller's thread rather than queue more
+            yield query, fetch_query(query)
+
+    for future in as_completed(futures):
+        yield futures[future], future.result()
+
+
+def fetch_candidates(
+    search_queries: List[str],
+    budget: Optional[str] = None,
+    vibe_profile: Optional[Dict] = None
+) -> List[Dict]:
+    """
+    Run all searches for a vibe in parallel and return deduplicated candidates.
+    Blocked brands are dropped and each product gets a brand_score.
     """
     all_products = []
     seen_ids = set()  # Track by product_key (id + url)
@@ -398,60 +608,100 @@ def search_all_queries(
             color_queries = create_color_queries(color_palette, key_pieces, search_queries)
             logger.info(f"Color queries: {color_queries}")
 
-    # Combine: 4 base + 4 brand + 4 color = 12 parallel searches
-    queries_to_use = base_queries + brand_queries[:4] + color_queries[:4]
+    # Combine: 4 base + 4 brand + 4 color = up to 12 parallel searches, minus
+    # near-duplicates (color queries often restate a base query)
+    plan = plan_queries(base_queries + brand_queries[:4] + color_queries[:4], keep=brand_queries)
+    queries_to_use = plan.queries
     logger.info(f"Total queries ({len(queries_to_use)}): {queries_to_use}")
     products_per_query = 20  # Get 20 products per query = ~200 total
 
+    if not queries_to_use:
+        return []
+
+    # Image URLs are checked on the 'images' pool as each query's results
+    # arrive, so validation overlaps the rest of the search fan-out
+    validation = ValidationBatch() if Config.IMAGE_VALIDATION else None
+
     # Run all queries in parallel for speed
-    def fetch_query(query):
-        try:
-            return search_products(
-                query=query,
-                num_results=products_per_query,
-                min_price=min_price,
-                max_price=max_price
-            )
-        except Exception as e:
-            logger.error(f"Error searching '{query}': {e}")
-            return []
+    for query, products in iter_search_results(queries_to_use, products_per_query, min_price, max_price):
+        if validation is not None:
+            validation.add(products)
+        is_brand_query = query in brand_queries
+        for product in products:
+            # QUALITY FILTER: Skip blocked brands (fast fashion, low quality)
+            if is_blocked_brand(product.get("brand", ""), product.get("name", "")):
+                continue
+
+            key = product_key(product)
 
-    with ThreadPoolExecutor(max_workers=10) as executor:
-        futures = {executor.submit(fetch_query, q): q for q in queries_to_use}
-        for future in as_completed(futures):
-            query = futures[future]
-            products = future.result()
-            is_brand_query = query in brand_queries
-            for product in products:
-                # QUALITY FILTER: Skip blocked brands (fast fashion, low quality)
-                if is_blocked_brand(product.get("brand", ""), product.get("name", "")):
-                    continue
-
-                product_key = product["id"] + product.get("product_url", "")
-
-                # Create a normalized key to catch duplicates with different IDs/URLs
-                # Normalize: lowercase name (first 50 chars) + brand + price
-                name_normalized = product.get("name", "").lower()[:50].strip()
-                brand_normalized = product.get("brand", "").lower().strip()
-                price_key = f"{product.get('price', 0):.2f}"
-                duplicate_key = f"{name_normalized}|{brand_normalized}|{price_key}"
-
-                # Skip if we've seen this exact product OR a near-duplicate
-                if product_key in seen_ids or duplicate_key in seen_products:
-                    continue
-
-                seen_ids.add(product_key)
-                seen_products.add(duplicate_key)
-
-                # Add brand score for curated/editorial/trending brand boosting
-                product["brand_score"] = get_brand_score(product.get("brand", ""))
-                # Mark products from brand queries for potential boost
-                if is_brand_query:
-                    product["from_brand_query"] = True
-                all_products.append(product)
+            # Create a normalized key to catch duplicates with different IDs/URLs
+            # Normalize: lowercase name (first 50 chars) + brand + price
+            name_normalized = product.get("name", "").lower()[:50].strip()
+            brand_normalized = product.get("brand", "").lower().strip()
+            price_key = f"{product.get('price', 0):.2f}"
+            duplicate_key = f"{name_normalized}|{brand_normalized}|{price_key}"
+
+            # Skip if we've seen this exact product OR a near-duplicate
+            if key in seen_ids or duplicate_key in seen_products:
+                continue
+
+            seen_ids.add(key)
+            seen_products.add(duplicate_key)
+
+            # Add brand score for curated/editorial/trending brand boosting
+            product["brand_score"] = get_brand_score(product.get("brand", ""))
+            # Mark products from brand queries for potential boost
+            if is_brand_query:
+                product["from_brand_query"] = True
+            all_products.append(product)
 
     logger.info(f"Fetched {len(all_products)} total products from {len(queries_to_use)} parallel queries")
+    logger.info(f"Query plan saved {plan.saved} of {plan.requested} SerpApi calls")
+
+    if validation is not None:
+        fetched = len(all_products)
+        all_products = validation.filter(all_products, timeout=Config.IMAGE_VALIDATION_BUDGET)
+        logger.info(f"Image validation dropped {fetched - len(all_products)} products")
+
+    return all_products
+
 
+def rank_candidates(
+    all_products: List[Dict],
+    max_products: int = 20,
+    vibe_profile: Optional[Dict] = None
+) -> Tuple[List[Dict], List[Dict]]:
+    """
+    Filter, AI re-rank and diversify fetched candidates.
+
+    Returns:
+        tuple: (selected, bench) where selected is the diversified list of up to
+        max_products and bench holds up to 15 quality alternatives for
+        coherence swaps
+    """
+    return select_candidates(score_candidates(all_products, vibe_profile), max_products=max_products)
+
+
+def score_candidates(
+    all_products: List[Dict],
+    vibe_profile: Optional[Dict] = None,
+    reserve: Optional[List[Dict]] = None
+) -> List[Dict]:
+    """
+    Filter and AI re-rank fetched candidates into the scored pool.
+
+    Args:
+        all_products: Fetched candidates
+        vibe_profile: Mood profile to re-rank against (no re-ranking without it)
+        reserve: Optional list to receive the trusted products past
+            RERANK_MAX that weren't re-ranked, best first, so later pages
+            can score them instead of searching again
+
+    Returns:
+        Products that pass the vibe-score quality gate, best first. The
+        first page comes from select_candidates; the rest can be kept for
+        later pages (see services/product_sessions.py).
+    """
     # Filter to trusted retailers
     trusted_products = [p for p in all_products if is_trusted_retailer(p.get("retailer", ""))]
     logger.info(f"After retailer filter: {len(trusted_products)} products")
@@ -461,14 +711,19 @@ def search_all_queries(
         untrusted = [p for p in all_products if p not in trusted_products]
         trusted_products.extend(untrusted[:10 - len(trusted_products)])
 
+    # Move clearly off-palette products out of the visual re-ranking slots
+    if vibe_profile and len(trusted_products) > 0:
+        trusted_products = prefilter_by_palette(trusted_products, vibe_profile.get('color_palette', []))
+
     # AI re-ranking if we have a vibe profile
     if vibe_profile and len(trusted_products) > 0:
+        if reserve is not None:
+            reserve.extend(trusted_products[RERANK_MAX:])
         trusted_products = rerank_products_with_ai(trusted_products, vibe_profile)
         logger.info(f"After AI re-ranking: {len(trusted_products)} products")
 
     # QUALITY GATE: Only keep products that actually match the vibe (score >= 6)
     # This prevents low-quality products from being included just to fill categories
-    MIN_VIBE_SCORE = 6
     quality_products = [p for p in trusted_products if p.get("vibe_score", 0) >= MIN_VIBE_SCORE]
     logger.info(f"After quality filter (score >= {MIN_VIBE_SCORE}): {len(quality_products)} products")
 
@@ -485,7 +740,16 @@ def search_all_queries(
         not x.get("on_sale", False),      # Sale items fourth
         x.get("price", 0)                 # Lower prices last
     ))
+    return quality_products
+
 
+def select_candidates(quality_products: List[Dict], max_products: int = 20) -> Tuple[List[Dict], List[Dict]]:
+    """
+    Pick a diversified page from a scored pool (see score_candidates).
+
+    Returns:
+        tuple: (selected, bench) as for rank_candidates
+    """
     # Apply category diversity to ensure mix of tops, bottoms, shoes, accessories, etc.
     # Now only working with products that actually match the vibe
     diversified = ensure_category_diversity(
@@ -498,40 +762,124 @@ def search_all_queries(
 
     # Build bench of alternative products for coherence swaps
     # Use quality_products (already filtered) not trusted_products
-    diversified_ids = {p.get('id', '') + p.get('product_url', '') for p in diversified}
+    diversified_ids = {product_key(p) for p in diversified}
     bench_products = [
         p for p in quality_products
-        if (p.get('id', '') + p.get('product_url', '')) not in diversified_ids
+        if product_key(p) not in diversified_ids
         and p.get('vibe_score', 0) >= MIN_VIBE_SCORE  # Same quality threshold
-    ][:15]  # Keep top 15 alternatives
+    ][:BENCH_SIZE]  # Keep top 15 alternatives
 
-    # Apply outfit coherence scoring if we have a vibe profile
-    if vibe_profile and len(diversified) >= 5:
-        diversified = score_outfit_coherence(
-            selected_products=diversified,
-            bench_products=bench_products,
-            vibe_profile=vibe_profile,
-            max_swaps=3  # Allow up to 3 items to be swapped for better coherence
-        )
-        logger.info(f"After coherence scoring: {len(diversified)} products")
-
-    return diversified
+    return diversified, bench_products
 
 
 def rerank_products_with_ai(products: List[Dict], vibe_profile: Dict) -> List[Dict]:
     """
     Use GPT-4o with vision to score products based on how well they VISUALLY match the vibe.
     Analyzes actual product images, not just names/brands.
+
+    The first RERANK_VISUAL_LIMIT products are scored from their images in
+    chunks of RERANK_CHUNK_SIZE, concurrently with the text-only tier for the
+    rest (up to RERANK_MAX). A chunk that fails is re-scored by the text tier.
+    Products already scored for this vibe (see services/vibe_scores.py) reuse
+    their stored score instead of being sent to the model again.
     Returns products with score >= 6, sorted by score descending.
     """
     if not products:
         return []
 
-    # Limit to 20 products for visual analysis (GPT-4o handles 20 images well)
-    # Score next batch with text-only as fallback
-    products_for_visual = products[:20]
-    products_text_only = products[20:50] if len(products) > 20 else []
+    visual_limit = Config.RERANK_VISUAL_LIMIT
+    products_for_visual = products[:visual_limit]
+    products_text_only = products[visual_limit:RERANK_MAX]
+
+    fingerprint = vibe_fingerprint(vibe_profile)
+    stored, products_for_visual = lookup_scores(products_for_visual, fingerprint, visual_only=True)
+    scored_products = _apply_stored_scores(stored)
+    if stored:
+        logger.info(f"Visual re-ranking: reused {len(stored)} stored scores, {len(products_for_visual)} to score")
+
+    chunk_size = max(1, Config.RERANK_CHUNK_SIZE)
+    chunks = [products_for_visual[i:i + chunk_size] for i in range(0, len(products_for_visual), chunk_size)]
+
+    # Launch every model call up front: visual chunks and the text tier
+    text_future = _submit_openai(_rerank_text_only, products_text_only, vibe_profile) if products_text_only else None
+    chunk_futures = [_submit_openai(_request_visual_scores, chunk, vibe_profile) for chunk in chunks]
+
+    # Merge in chunk order so results don't depend on which call finished first
+    failed = []
+    visual_scored = 0
+    for chunk, future in zip(chunks, chunk_futures):
+        try:
+            score_map = future.result()
+        except Exception as e:
+            logger.error(f"Visual re-ranking chunk failed ({len(chunk)} products): {e}")
+            failed.extend(chunk)
+            continue
+
+        store_scores(chunk, score_map, fingerprint, visual=True)
+        # Be stricter: only keep products that genuinely match (6+)
+        for i, product in enumerate(chunk):
+            score = score_map.get(i, 0)  # Default to 0, not 5
+            if score >= 6:
+                product["vibe_score"] = score
+                product["visual_scored"] = True
+                scored_products.append(product)
+                visual_scored += 1
+            else:
+                logger.debug(f"Rejected product (score {score}): {product.get('name', '')[:40]}")
+
+    if chunks:
+        logger.info(f"Visual re-ranking: {visual_scored}/{len(products_for_visual)} products scored 6+ in {len(chunks)} chunks")
+
+    if text_future is not None:
+        scored_products.extend(text_future.result())
+
+    # Failed chunks degrade to the text tier rather than dropping the products
+    if failed:
+        scored_products.extend(_rerank_text_only(failed, vibe_profile))
+
+    # Sort by score descending, ties in original order
+    position = {id(p): i for i, p in enumerate(products)}
+    scored_products.sort(key=lambda x: (-x.get("vibe_score", 0), position.get(id(x), 0)))
+
+    # Don't include unscored products (past RERANK_MAX) - they haven't been
+    # validated. score_candidates can hand them back as a reserve
+    if len(products) > RERANK_MAX:
+        logger.info(f"Skipping {len(products) - RERANK_MAX} unanalyzed products")
+
+    return scored_products
+
 
+def _submit_openai(fn, *args) -> Future:
+    """Run fn on the shared 'openai' pool, or inline (as a completed future) when it is saturated."""
+    try:
+        return get_pool('openai').submit(fn, *args)
+    except PoolSaturated:
+        future = Future()
+        try:
+            future.set_result(fn(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+
+def _apply_stored_scores(stored: List[Tuple[Dict, Dict]]) -> List[Dict]:
+    """Set vibe_score from stored entries, keeping only products scored 6+."""
+    scored = []
+    for product, entry in stored:
+        if entry['score'] >= 6:
+            product["vibe_score"] = entry['score']
+            product["visual_scored"] = entry.get('visual', False)
+            scored.append(product)
+    return scored
+
+
+def _request_visual_scores(products_for_visual: List[Dict], vibe_profile: Dict) -> Dict[int, int]:
+    """
+    Ask GPT-4o to score product images against the vibe.
+
+    Returns:
+        Dict mapping index into products_for_visual -> score (1-10)
+    """
     # Build brand guidance
     curated_sample = ", ".join(list(CURATED_BRANDS)[:8])
     editorial_sample = ", ".join(list(EDITORIAL_BRANDS)[:8])
@@ -599,79 +947,54 @@ Product details for context:
                 }
             })
 
-    try:
-        # Use GPT-4o for vision capability
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[{"role": "user", "content": content}],
-            max_tokens=1000,
-            temperature=0.3
-        )
-
-        response_text = response.choices[0].message.content.strip()
-
-        # Clean up response
-        if response_text.startswith("```"):
-            response_text = response_text.split("```")[1]
-            if response_text.startswith("json"):
-                response_text = response_text[4:]
-        response_text = response_text.strip()
-
-        scores = json.loads(response_text)
-
-        # Build score map (GPT returns 1-indexed, convert to 0-indexed)
-        score_map = {}
-        for item in scores:
-            idx = item.get("index", 0)
-            # Handle both 0-indexed and 1-indexed responses
-            if idx > 0 and idx <= len(products_for_visual):
-                score_map[idx - 1] = item["score"]
-            elif idx >= 0 and idx < len(products_for_visual):
-                score_map[idx] = item["score"]
-
-        # Apply scores to visually analyzed products
-        # Be stricter: only keep products that genuinely match (7+)
-        scored_products = []
-        for i, product in enumerate(products_for_visual):
-            score = score_map.get(i, 0)  # Default to 0, not 5
-            if score >= 6:
-                product["vibe_score"] = score
-                product["visual_scored"] = True
-                scored_products.append(product)
-            else:
-                logger.debug(f"Rejected product (score {score}): {product.get('name', '')[:40]}")
+    # Use GPT-4o for vision capability
+    response = client.chat.completions.create(
+        model="gpt-4o",
+        messages=[{"role": "user", "content": content}],
+        max_tokens=1000,
+        temperature=0.3
+    )
 
-        logger.info(f"Visual re-ranking: {len(scored_products)}/{len(products_for_visual)} products scored 6+")
+    response_text = response.choices[0].message.content.strip()
 
-        # Score remaining products with text-only (fallback for products 16-30)
-        if products_text_only:
-            text_scored = _rerank_text_only(products_text_only, vibe_profile)
-            scored_products.extend(text_scored)
+    # Clean up response
+    if response_text.startswith("```"):
+        response_text = response_text.split("```")[1]
+        if response_text.startswith("json"):
+            response_text = response_text[4:]
+    response_text = response_text.strip()
 
-        # Sort by score descending
-        scored_products.sort(key=lambda x: x.get("vibe_score", 0), reverse=True)
+    scores = json.loads(response_text)
 
-        # Don't include unscored products (51+) - they haven't been validated
-        # If we need more products, the caller should request more queries
-        if len(products) > 50:
-            logger.info(f"Skipping {len(products) - 50} unanalyzed products")
+    # Build score map (GPT returns 1-indexed, convert to 0-indexed)
+    score_map = {}
+    for item in scores:
+        idx = item.get("index", 0)
+        # Handle both 0-indexed and 1-indexed responses
+        if idx > 0 and idx <= len(products_for_visual):
+            score_map[idx - 1] = item["score"]
+        elif idx >= 0 and idx < len(products_for_visual):
+            score_map[idx] = item["score"]
 
-        return scored_products
-
-    except Exception as e:
-        logger.error(f"Visual re-ranking failed: {e}")
-        # Fall back to text-only ranking
-        return _rerank_text_only(products[:50], vibe_profile)
+    return score_map
 
 
 def _rerank_text_only(products: List[Dict], vibe_profile: Dict) -> List[Dict]:
     """
     Fallback text-only re-ranking when visual analysis isn't possible.
-    Uses product names and brands only.
+    Uses product names and brands only. Stored scores (visual or text) are
+    reused; only unscored products are sent to the model.
     """
     if not products:
         return []
 
+    fingerprint = vibe_fingerprint(vibe_profile)
+    stored, products = lookup_scores(products, fingerprint)
+    scored = _apply_stored_scores(stored)
+    if not products:
+        logger.info(f"Text-only re-ranking: all {len(stored)} products had stored scores")
+        return scored
+
     product_list = []
     for i, p in enumerate(products):
         product_list.append({
@@ -706,8 +1029,8 @@ Score 1-10. Return ONLY JSON: [{{"index": 0, "score": 7}}]"""
 
         scores = json.loads(response_text.strip())
         score_map = {item["index"]: item["score"] for item in scores}
+        store_scores(products, score_map, fingerprint, visual=False)
 
-        scored = []
         for i, product in enumerate(products):
             score = score_map.get(i, 0)  # Default to 0, not 5
             if score >= 6:
@@ -715,13 +1038,13 @@ Score 1-10. Return ONLY JSON: [{{"index": 0, "score": 7}}]"""
                 product["visual_scored"] = False
                 scored.append(product)
 
-        logger.info(f"Text-only re-ranking: {len(scored)}/{len(products)} products scored 6+")
+        logger.info(f"Text-only re-ranking: {len(scored)}/{len(products) + len(stored)} products scored 6+")
         return scored
 
     except Exception as e:
         logger.error(f"Text-only re-ranking failed: {e}")
         # Don't return unscored products - they haven't been validated
-        return []
+        return scored
 
 
 def score_outfit_coherence(
@@ -900,33 +1223,27 @@ ITEM_TYPE_KEYWORDS = {
     'Accessories': ['scarf', 'scarves', 'hat', 'hats', 'belt', 'belts', 'sunglasses', 'watch', 'watches', 'headband']
 }
 
+CATEGORY_LEXICON = Lexicon(ITEM_TYPE_KEYWORDS)
+# Earlier categories win when a name matches several (e.g. "shirt dress" -> Tops)
+CATEGORY_PRIORITY = {category: rank for rank, category in enumerate(ITEM_TYPE_KEYWORDS)}
 
-def detect_item_type_from_prompt(prompt: str) -> Optional[str]:
-    """Detect if user is asking for a specific item type."""
-    prompt_lower = prompt.lower()
 
-    for item_type, keywords in ITEM_TYPE_KEYWORDS.items():
-        for keyword in keywords:
-            # Check for whole word match (not partial)
-            if f' {keyword} ' in f' {prompt_lower} ' or prompt_lower.startswith(keyword + ' ') or prompt_lower.endswith(' ' + keyword):
-                return item_type
+def _first_category(labels) -> Optional[str]:
+    return min(labels, key=CATEGORY_PRIORITY.__getitem__) if labels else None
 
-    return None
+
+def detect_item_type_from_prompt(prompt: str) -> Optional[str]:
+    """Detect if user is asking for a specific item type."""
+    return _first_category(CATEGORY_LEXICON.labels(prompt))
 
 
 def detect_product_category(product_name: str) -> str:
     """
     Detect the category of a product based on its name.
     Returns category name or 'Other' if no match found.
+    Keywords match whole words, so "spring dress" is a dress, not a ring.
     """
-    name_lower = product_name.lower()
-
-    for category, keywords in ITEM_TYPE_KEYWORDS.items():
-        for keyword in keywords:
-            if keyword in name_lower:
-                return category
-
-    return 'Other'
+    return _first_category(CATEGORY_LEXICON.labels(product_name)) or 'Other'
 
 
 def ensure_category_diversity(
@@ -1042,12 +1359,7 @@ def filter_by_item_type(products: List[Dict], item_type: str) -> List[Dict]:
     if not item_type or item_type not in ITEM_TYPE_KEYWORDS:
         return products
 
-    keywords = ITEM_TYPE_KEYWORDS[item_type]
-    filtered = []
-
-    for product in products:
-        name_lower = product.get('name', '').lower()
-        if any(kw in name_lower for kw in keywords):
-            filtered.append(product)
+    names = CATEGORY_LEXICON.classify(p.get('name', '') for p in products)
+    filtered = [p for p, labels in zip(products, names) if item_type in labels]
 
     return filtered if filtered else products  # Return original if nothing matches
@@ -0,0 +1,151 @@
+import asyncio
+import logging
+from concurrent.futures import as_completed
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import httpx
+
+from config import Config
+from services.shopping import build_search_params, format_product, search_cache, search_cache_key
+from utils.aio import get_loop
+
+logger = logging.getLogger(__name__)
+
+SERPAPI_URL = "https://serpapi.com/search.json"
+
+# Created lazily on the shared event loop; reused for every search so
+# connections stay alive between queries and requests
+_client: Optional[httpx.AsyncClient] = None
+_semaphore: Optional[asyncio.Semaphore] = None
+
+# Searches currently running on the loop, keyed by cache key
+_inflight: Dict[str, asyncio.Future] = {}
+
+
+def _get_client() -> httpx.AsyncClient:
+    """Pooled keep-alive client (must be called on the shared loop)."""
+    global _client, _semaphore
+    limit = Config.SEARCH_ASYNC_CONCURRENCY
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(limit)
+    if _client is None:
+        _client = httpx.AsyncClient(
+            timeout=httpx.Timeout(Config.SEARCH_TIMEOUT),
+            limits=httpx.Limits(max_connections=limit, max_keepalive_connections=limit)
+        )
+    return _client
+
+
+async def _fetch_shopping_results(params: Dict) -> List[Dict]:
+    """Call SerpApi over the pooled client. Raises on API errors so they aren't cached."""
+    client = _get_client()
+    async with _semaphore:
+        response = await client.get(SERPAPI_URL, params={**params, "output": "json"})
+    results = response.json()
+    if "error" in results and "shopping_results" not in results:
+        raise Exception(results["error"])
+    return results.get("shopping_results", [])
+
+
+async def _load(params: Dict, cache_key: str) -> List[Dict]:
+    items = await _fetch_shopping_results(params)
+    await _run_blocking(search_cache.set, cache_key, items)
+    return items
+
+
+async def _run_blocking(fn, *args):
+    """Run a blocking call (e.g. the cache's disk tier) off the loop so other searches keep going."""
+    return await asyncio.get_running_loop().run_in_executor(None, fn, *args)
+
+
+async def search_products_async(
+    query: str,
+    num_results: int = 10,
+    min_price: Optional[int] = None,
+    max_price: Optional[int] = None
+) -> List[Dict]:
+    """
+    Async equivalent of shopping.search_products.
+    Shares the same result cache; identical searches in flight on the loop
+    share one upstream call.
+    """
+    params = build_search_params(query, num_results, min_price, max_price)
+    cache_key = search_cache_key(params)
+
+    items = await _run_blocking(search_cache.get, cache_key)
+    if items is None:
+        future = _inflight.get(cache_key)
+        if future is None:
+            future = asyncio.ensure_future(_load(params, cache_key))
+            _inflight[cache_key] = future
+            future.add_done_callback(lambda _: _inflight.pop(cache_key, None))
+        try:
+            items = await asyncio.shield(future)
+        except Exception as e:
+            logger.error(f"SerpApi error: {e}")
+            return []
+
+    products = []
+    for item in items:
+        product = format_product(item, query)
+        if product:
+            products.append(product)
+
+    return products
+
+
+async def _search_one(
+    query: str,
+    num_results: int,
+    min_price: Optional[int],
+    max_price: Optional[int]
+) -> Tuple[str, List[Dict]]:
+    """One search with its own deadline; a slow query returns no products instead of failing the rest."""
+    try:
+        products = await asyncio.wait_for(
+            search_products_async(query, num_results, min_price, max_price),
+            timeout=Config.SEARCH_TIMEOUT * 2
+        )
+    except asyncio.TimeoutError:
+        logger.error(f"SerpApi search timed out: '{query}'")
+        products = []
+    return query, products
+
+
+def iter_search_queries_async(
+    queries: List[str],
+    num_results: int = 10,
+    min_price: Optional[int] = None,
+    max_price: Optional[int] = None
+) -> Iterator[Tuple[str, List[Dict]]]:
+    """
+    Run many searches concurrently on the shared event loop and yield
+    (query, products) as each one finishes (empty on error or timeout).
+    """
+    loop = get_loop()
+    futures = [
+        asyncio.run_coroutine_threadsafe(_search_one(q, num_results, min_price, max_price), loop)
+        for q in queries
+    ]
+    try:
+        for future in as_completed(futures):
+            yield future.result()
+    finally:
+        # The caller stopped early; don't leave searches running for nobody
+        for future in futures:
+            future.cancel()
+
+
+def search_queries_async(
+    queries: List[str],
+    num_results: int = 10,
+    min_price: Optional[int] = None,
+    max_price: Optional[int] = None
+) -> Dict[str, List[Dict]]:
+    """
+    Run many searches concurrently on the shared event loop.
+
+    Returns:
+        Dict mapping each query to its products (empty on error or timeout)
+    """
+    return dict(iter_search_queries_async(queries, num_results, min_price, max_price))
@@ -0,0 +1,156 @@
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+# Sparkline length, and the EWMA span (in samples; Google's 3-month series are daily)
+SPARKLINE_POINTS = 10
+EWMA_SPAN = 7
+
+# Percent change beyond which a trend counts as rising or falling
+DIRECTION_THRESHOLD = 15
+
+
+def analyze_series(series: Sequence[Sequence[float]]) -> List[Dict]:
+    """
+    Trend metrics for many interest-over-time series at once.
+
+    Series of the same length are stacked into one matrix and every metric
+    is computed across the whole matrix. Rows never mix, so a series gets
+    exactly the same result alone as it does in a batch.
+
+    Args:
+        series: Interest values (0-100), oldest first, at least 2 per series
+
+    Returns:
+        One dict per series, in order, with:
+        - current: last value
+        - change_pct / change / direction: last vs first value
+        - slope: least-squares slope, in interest points per sample
+        - ewma: exponentially weighted moving average at the last sample
+        - peak_index: position of the (first) maximum
+        - sparkline: SPARKLINE_POINTS values picked by largest-triangle-three-buckets
+    """
+    results: List[Dict] = [{} for _ in series]
+    by_length: Dict[int, List[int]] = {}
+    for i, values in enumerate(series):
+        by_length.setdefault(len(values), []).append(i)
+
+    for length, rows in by_length.items():
+        if length < 2:
+            raise ValueError("Trend series need at least 2 values")
+        matrix = np.array([series[i] for i in rows], dtype=np.float64)
+        metrics = _analyze_matrix(matrix)
+        for r, i in enumerate(rows):
+            change_pct = float(metrics['change_pct'][r])
+            results[i] = {
+                'current': series[i][-1],
+                'change_pct': change_pct,
+                'change': f"+{int(change_pct)}%" if change_pct >= 0 else f"{int(change_pct)}%",
+                'direction': _direction(change_pct),
+                'slope': round(float(metrics['slope'][r]), 3),
+                'ewma': round(float(metrics['ewma'][r]), 1),
+                'peak_index': int(metrics['peak_index'][r]),
+                'sparkline': [series[i][j] for j in metrics['sparkline'][r]],
+            }
+    return results
+
+
+def _analyze_matrix(x: np.ndarray) -> Dict[str, np.ndarray]:
+    """Column-wise metrics for an (N series, L samples) matrix."""
+    length = x.shape[1]
+    current = x[:, -1]
+    previous = x[:, 0]
+
+    # Same arithmetic as the scalar version: ((current - previous) / previous) * 100
+    safe_previous = np.where(previous > 0, previous, 1.0)
+    change_pct = np.where(
+        previous > 0,
+        ((current - previous) / safe_previous) * 100,
+        np.where(current > 0, 100.0, 0.0)
+    )
+
+    # Reductions along each row only, so results don't depend on batch size
+    t = np.arange(length, dtype=np.float64) - (length - 1) / 2
+    slope = (x * t).sum(axis=1) / (t * t).sum()
+
+    # y[0] = x[0], y[k] = a*x[k] + (1-a)*y[k-1], unrolled into one weight per sample
+    alpha = 2 / (EWMA_SPAN + 1)
+    weights = alpha * (1 - alpha) ** np.arange(length - 1, -1, -1, dtype=np.float64)
+    weights[0] = (1 - alpha) ** (length - 1)
+    ewma = (x * weights).sum(axis=1)
+
+    return {
+        'change_pct': change_pct,
+        'slope': slope,
+        'ewma': ewma,
+        'peak_index': np.argmax(x, axis=1),
+        'sparkline': _lttb_indices(x, SPARKLINE_POINTS),
+    }
+
+
+def _lttb_indices(x: np.ndarray, points: int) -> np.ndarray:
+    """
+    Largest-triangle-three-buckets downsampling for every row.
+
+    Keeps the first and last samples and, from each bucket in between, the
+    sample forming the largest triangle with the previously kept sample and
+    the next bucket's average, so peaks and dips survive downsampling.
+
+    Returns:
+        (N, points) sample indices, or every index if a row is that short
+    """
+    n, length = x.shape
+    if length <= points:
+        return np.tile(np.arange(length), (n, 1))
+
+    rows = np.arange(n)
+    indices = np.zeros((n, points), dtype=np.int64)
+    indices[:, -1] = length - 1
+    every = (length - 2) / (points - 2)
+    selected = np.zeros(n, dtype=np.int64)
+
+    for bucket in range(points - 2):
+        start = int(bucket * every) + 1
+        end = int((bucket + 1) * every) + 1
+        next_start = end
+        next_end = min(int((bucket + 2) * every) + 1, length)
+
+        next_x = (next_start + next_end - 1) / 2
+        next_y = x[:, next_start:next_end].mean(axis=1)
+        selected_x = selected.astype(np.float64)
+        selected_y = x[rows, selected]
+
+        candidates = np.arange(start, end, dtype=np.float64)
+        area = np.abs(
+            (selected_x - next_x)[:, None] * (x[:, start:end] - selected_y[:, None])
+            - (selected_x[:, None] - candidates) * (next_y - selected_y)[:, None]
+        )
+        selected = start + np.argmax(area, axis=1)
+        indices[:, bucket + 1] = selected
+
+    return indices
+
+
+def _direction(change_pct: float) -> str:
+    if change_pct > DIRECTION_THRESHOLD:
+        return 'rising'
+    if change_pct < -DIRECTION_THRESHOLD:
+        return 'falling'
+    return 'stable'
+
+
+def peak_label(peak_index: int, length: int) -> str:
+    """When a series peaked, e.g. 'now', '2 weeks ago', '1 month ago'."""
+    if peak_index == length - 1:
+        return 'now'
+    weeks_ago = (length - 1 - peak_index) // 7
+    if weeks_ago == 0:
+        return 'this week'
+    if weeks_ago == 1:
+        return '1 week ago'
+    if weeks_ago < 4:
+        return f'{weeks_ago} weeks ago'
+    months_ago = weeks_ago // 4
+    if months_ago == 1:
+        return '1 month ago'
+    return f'{months_ago} months ago'
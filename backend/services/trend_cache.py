@@ -0,0 +1,119 @@
+import logging
+from typing import Callable
+
+from config import Config
+from utils.cache import TieredCache
+
+logger = logging.getLogger(__name__)
+
+# Fresh for TREND_CACHE_TTL, then served stale (while refreshing in the
+# background) for up to TREND_STALE_TTL more. Google Trends data only moves
+# daily, so slightly stale numbers are fine for display.
+CACHE_TTL = Config.TREND_CACHE_TTL
+STALE_TTL = Config.TREND_STALE_TTL
+
+# Keyword variants that Google has no data for rarely gain data quickly,
+# so remember them to skip the upstream call next time
+NEGATIVE_TTL = Config.TREND_NEGATIVE_TTL
+
+_cache = TieredCache(
+    'trends',
+    ttl=CACHE_TTL,
+    max_entries=Config.TREND_CACHE_SIZE,
+    stale_ttl=STALE_TTL,
+    refresh_pool='trends'
+)
+
+
+# Related queries ("people also search for") change slowly and are
+# precomputed offline (scripts/precompute_related.py), so they keep long
+RELATED_TTL = Config.TREND_RELATED_TTL
+
+_related_cache = TieredCache(
+    'trend_related',
+    ttl=RELATED_TTL,
+    max_entries=Config.TREND_CACHE_SIZE,
+    stale_ttl=Config.TREND_STALE_TTL
+)
+
+
+class TrendUnavailable(Exception):
+    """Upstream failure; carries the fallback payload so it is returned but never cached."""
+
+    def __init__(self, data: dict):
+        super().__init__(data.get('error', 'unavailable'))
+        self.data = data
+
+
+def _get_cache_key(keyword: str) -> str:
+    """Generate a stable cache key from keyword."""
+    return TieredCache.make_key(keyword.lower().strip())
+
+
+def _ttl_for(data: dict) -> int:
+    """Negative results (no_data) get a shorter TTL than real series."""
+    if data.get('error') == 'no_data':
+        return NEGATIVE_TTL
+    return CACHE_TTL
+
+
+def get_cached(keyword: str, allow_stale: bool = False) -> dict | None:
+    """
+    Get fresh cached trend data for a keyword.
+    Checks memory cache first, then file cache.
+    Returns None if no valid cache exists.
+
+    With allow_stale, entries past their TTL but inside the stale window
+    are returned too.
+    """
+    return _cache.get(_get_cache_key(keyword), allow_stale=allow_stale)
+
+
+def set_cached(keyword: str, data: dict) -> None:
+    """
+    Cache trend data for a keyword.
+    Stores in both memory and file cache.
+    """
+    _cache.set(_get_cache_key(keyword), data, ttl=_ttl_for(data))
+
+
+def get_or_fetch(keyword: str, fetch: Callable[[], dict]) -> dict:
+    """
+    Return trend data for a keyword, fetching on a miss.
+
+    Stale entries are returned immediately while fetch runs in the background.
+    Results with error 'no_data' are cached negatively; 'unavailable' results
+    (throttling, network errors) are returned but never cached.
+
+    Args:
+        keyword: The trend keyword
+        fetch: Zero-argument function returning the trend data dict
+
+    Returns:
+        Trend data dict
+    """
+    def load():
+        data = fetch()
+        if data.get('error') and data.get('error') != 'no_data':
+            raise TrendUnavailable(data)
+        return data
+
+    try:
+        return _cache.get_or_load(_get_cache_key(keyword), load, ttl=_ttl_for)
+    except TrendUnavailable as e:
+        return e.data
+
+
+def get_related_cached(keyword: str) -> list | None:
+    """Cached related queries for a keyword (stale ones included), or None."""
+    return _related_cache.get(_get_cache_key(keyword), allow_stale=True)
+
+
+def set_related_cached(keyword: str, related: list) -> None:
+    """Cache related queries; an empty list is cached for NEGATIVE_TTL."""
+    _related_cache.set(_get_cache_key(keyword), related, ttl=RELATED_TTL if related else NEGATIVE_TTL)
+
+
+def clear_cache() -> int:
+    """Clear all cached trend data. Returns number of entries cleared."""
+    return _cache.clear() + _related_cache.clear()
@@ -0,0 +1,370 @@
+import csv
+import fcntl
+import io
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+from contextlib import contextmanager
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Local interest-over-time history, one row per keyword and one float32
+# column per day (NaN where there is no point), in a memory-mapped file:
+#
+#   TREND_STORE_DIR/series-<gen>.f32  rows x days, row-major
+#   TREND_STORE_DIR/index.json        {'start': first day, 'days': columns,
+#                                      'data': current series file name,
+#                                      'keywords': {keyword: {'row', 'last'}}}
+#
+# New rows are appended to the current file in place. Changing the number
+# of days (a regrow) writes the next generation's file, and the index
+# pointing at it is swapped in last, so a reader never maps a file with the
+# wrong shape for its index.
+# A read is a slice of one row. Rows keep Google's relative scale from the
+# first ingest; later ingests are stitched on by the ratio over the days
+# they overlap, so a daily refresh only needs the last few weeks.
+DTYPE = np.float32
+
+# Days of history a summary covers (like Google's 3-month window)
+WINDOW_DAYS = 90
+
+# Spare columns allocated whenever the day range has to grow
+GROW_DAYS = 365
+
+_lock = threading.Lock()
+_view: Optional[Tuple[dict, np.ndarray]] = None
+_view_mtime: Optional[tuple] = None
+
+
+def read_series(keyword: str, days: int = WINDOW_DAYS) -> Optional[dict]:
+    """
+    The last `days` days of a keyword's history, in get_trend_data's format.
+
+    Values are rescaled to peak at 100 over the window, like a Google
+    Trends request for the same period.
+
+    Returns:
+        Trend data dict ('source': 'store'), or None if the keyword has no
+        history or its newest point is older than TREND_STORE_MAX_AGE days
+    """
+    view = _current_view()
+    if view is None:
+        return None
+    index, matrix = view
+    entry = index['keywords'].get(keyword.lower().strip())
+    if entry is None or entry['last'] is None:
+        return None
+
+    start = date.fromisoformat(index['start'])
+    last_day = start + timedelta(days=entry['last'])
+    if (date.today() - last_day).days > Config.TREND_STORE_MAX_AGE:
+        return None
+
+    first = max(0, entry['last'] - days + 1)
+    window = np.asarray(matrix[entry['row'], first:entry['last'] + 1], dtype=np.float64)
+    present = ~np.isnan(window)
+    values = window[present]
+    peak = values.max() if values.size else 0
+    if peak <= 0:
+        return None
+
+    offsets = np.nonzero(present)[0] + first
+    return {
+        'keyword': keyword.lower().strip(),
+        'data': [int(v) for v in np.rint(values * 100 / peak)],
+        'dates': [(start + timedelta(days=int(o))).isoformat() for o in offsets],
+        'timeframe': f'{days}d',
+        'source': 'store'
+    }
+
+
+def last_date(keyword: str) -> Optional[date]:
+    """Day of a keyword's newest stored point, or None."""
+    view = _current_view()
+    if view is None:
+        return None
+    index, _ = view
+    entry = index['keywords'].get(keyword.lower().strip())
+    if entry is None or entry['last'] is None:
+        return None
+    return date.fromisoformat(index['start']) + timedelta(days=entry['last'])
+
+
+def ingest(keyword: str, dates: Sequence[str], values: Sequence[float]) -> int:
+    """
+    Add a keyword's points (from pytrends or a CSV export) to the store.
+
+    When the new points overlap stored ones, they are rescaled by the ratio
+    of the two over the overlap and written over that range, so a short
+    recent window extends the history on its existing scale. Without a
+    usable overlap the keyword's history is replaced by the new points.
+
+    Args:
+        keyword: The search term
+        dates: ISO dates, one per value
+        values: Interest values on any consistent scale
+
+    Returns:
+        Number of points written
+    """
+    if not dates or _store_dir() is None:
+        return 0
+    keyword = keyword.lower().strip()
+    days = [date.fromisoformat(d[:10]) for d in dates]
+    new = np.asarray(values, dtype=np.float64)
+
+    with _writer() as (index, matrix_for):
+        start = date.fromisoformat(index['start']) if index['start'] else min(days)
+        offsets = np.array([(d - start).days for d in days])
+        if offsets.min() < 0 or offsets.max() >= index['days']:
+            start, offsets = _regrow(index, start, min(days), max(days), offsets)
+
+        entry = index['keywords'].get(keyword)
+        if entry is None:
+            entry = {'row': len(index['keywords']), 'last': None}
+            index['keywords'][keyword] = entry
+        matrix = matrix_for(index)
+        row = matrix[entry['row']]
+
+        existing = np.asarray(row[offsets], dtype=np.float64)
+        overlap = ~np.isnan(existing)
+        scale = None
+        if overlap.any():
+            old_sum = existing[overlap].sum()
+            new_sum = new[overlap].sum()
+            if old_sum > 0 and new_sum > 0:
+                scale = old_sum / new_sum
+        if scale is None:
+            # Nothing to stitch against: start this keyword's history over
+            row[:] = np.nan
+            scale = 1.0
+
+        row[offsets] = (new * scale).astype(DTYPE)
+        valid = np.nonzero(~np.isnan(row))[0]
+        entry['last'] = int(valid[-1]) if valid.size else None
+        matrix.flush()
+
+    return len(days)
+
+
+def ingest_csv(text: str) -> Dict[str, int]:
+    """
+    Ingest a Google Trends "Interest over time" CSV export.
+
+    Handles the preamble lines Google adds, one or more keyword columns
+    ("boho: (United States)") and "<1" values. Weekly and monthly exports
+    are stored as points on their own dates.
+
+    Returns:
+        Dict mapping each keyword to the number of points ingested
+    """
+    rows = list(csv.reader(io.StringIO(text)))
+    header_at = next(
+        (i for i, row in enumerate(rows) if row and row[0].strip() in ('Day', 'Week', 'Month', 'Time')),
+        None
+    )
+    if header_at is None:
+        raise ValueError("Not a Google Trends interest-over-time export")
+
+    keywords = [re.sub(r':\s*\(.*\)$', '', name).strip() for name in rows[header_at][1:]]
+    dates: List[str] = []
+    columns: List[List[float]] = [[] for _ in keywords]
+    for row in rows[header_at + 1:]:
+        if len(row) < len(keywords) + 1:
+            continue
+        dates.append(row[0][:10])
+        for column, value in zip(columns, row[1:]):
+            value = value.strip()
+            column.append(0.5 if value == '<1' else float(value or 0))
+
+    return {kw: ingest(kw, dates, column) for kw, column in zip(keywords, columns) if kw}
+
+
+def store_stats() -> Dict:
+    """Keyword count and date range of the store, for /api/metrics."""
+    view = _current_view()
+    if view is None:
+        return {'keywords': 0}
+    index, _ = view
+    lasts = [entry['last'] for entry in index['keywords'].values() if entry['last'] is not None]
+    start = date.fromisoformat(index['start'])
+    return {
+        'keywords': len(index['keywords']),
+        'start': index['start'],
+        'newest': (start + timedelta(days=max(lasts))).isoformat() if lasts else None,
+        'bytes': len(index['keywords']) * index['days'] * np.dtype(DTYPE).itemsize,
+    }
+
+
+def _store_dir() -> Optional[Path]:
+    return Path(Config.TREND_STORE_DIR) if Config.TREND_STORE_DIR else None
+
+
+def _read_index(base: Path) -> dict:
+    try:
+        index = json.loads((base / 'index.json').read_text())
+    except (OSError, ValueError):
+        return {'start': None, 'days': 0, 'data': 'series-0.f32', 'keywords': {}}
+    index.setdefault('data', 'series.f32')
+    return index
+
+
+def _open_matrix(base: Path, index: dict, mode: str) -> Optional[np.ndarray]:
+    """
+    Map the index's series file.
+
+    Raises:
+        ValueError: If the file's size doesn't fit the index's shape
+    """
+    rows = len(index['keywords'])
+    if rows == 0 or index['days'] == 0:
+        return None
+    path = base / index['data']
+    row_bytes = index['days'] * np.dtype(DTYPE).itemsize
+    size = path.stat().st_size
+    if size % row_bytes or size // row_bytes < rows:
+        raise ValueError(f"{path.name} is {size} bytes, expected {rows} rows of {row_bytes}")
+    return np.memmap(path, dtype=DTYPE, mode=mode, shape=(rows, index['days']))
+
+
+def _current_view() -> Optional[Tuple[dict, np.ndarray]]:
+    """The index and a read-only map of the matrix, reopened when the index changes."""
+    global _view, _view_mtime
+
+    base = _store_dir()
+    if base is None:
+        return None
+    try:
+        stat = (base / 'index.json').stat()
+    except OSError:
+        return None
+    # Every write replaces the index file, so its inode changes too
+    mtime = (stat.st_ino, stat.st_mtime_ns)
+    with _lock:
+        if _view is None or mtime != _view_mtime:
+            index = _read_index(base)
+            try:
+                matrix = _open_matrix(base, index, 'r')
+            except (OSError, ValueError) as e:
+                logger.warning(f"Trend store unreadable: {e}")
+                return None
+            _view = (index, matrix) if matrix is not None else None
+            _view_mtime = mtime
+        return _view
+
+
+@contextmanager
+def _writer() -> Iterator[tuple]:
+    """
+    Exclusive write access across threads and worker processes.
+
+    Yields (index, matrix_for): the index as on disk, and a function that
+    maps the matrix for a given index, adding zeroed rows for new keywords.
+    The index is written back when the block exits.
+    """
+    base = _store_dir()
+    base.mkdir(parents=True, exist_ok=True)
+    with _lock, open(base / 'store.lock', 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        index = _read_index(base)
+        maps = []
+
+        def matrix_for(index: dict) -> np.ndarray:
+            path = base / index['data']
+            size = len(index['keywords']) * index['days'] * np.dtype(DTYPE).itemsize
+            current = path.stat().st_size if path.exists() else 0
+            if current < size:
+                # New rows go at the end of the file, as missing values
+                with open(path, 'ab') as f:
+                    f.write(np.full((size - current) // np.dtype(DTYPE).itemsize, np.nan, dtype=DTYPE).tobytes())
+            maps.append(_open_matrix(base, index, 'r+'))
+            return maps[-1]
+
+        yield index, matrix_for
+
+        for matrix in maps:
+            matrix.flush()
+        _atomic_write(base / 'index.json', json.dumps(index))
+
+        # Superseded generations (readers that still map one keep their copy)
+        for path in base.glob('series*.f32'):
+            if path.name != index['data']:
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+
+
+def _regrow(index: dict, start: date, first: date, last: date, offsets: np.ndarray):
+    """
+    Write the matrix into the next generation's file so its columns cover
+    first..last (plus GROW_DAYS spare days at the end). The index is
+    pointed at the new file here and written by _writer afterwards.
+    Caller holds the writer lock.
+
+    Returns:
+        tuple: (new start, offsets re-based on it)
+    """
+    base = _store_dir()
+    old_start = start
+    if index['start']:
+        old_end = old_start + timedelta(days=index['days'] - 1)
+        first, last = min(first, old_start), max(last, old_end)
+    new_start = first
+    new_days = (last - new_start).days + 1 + GROW_DAYS
+
+    rows = len(index['keywords'])
+    grown = np.full((rows, new_days), np.nan, dtype=DTYPE)
+    old = _open_matrix(base, index, 'r') if index['start'] else None
+    shift = (old_start - new_start).days
+    if old is not None:
+        grown[:, shift:shift + index['days']] = old
+    del old
+
+    generation = int(re.sub(r'\D', '', index['data']) or 0) + 1
+    data = f'series-{generation}.f32'
+    fd, tmp_path = tempfile.mkstemp(dir=base, prefix='.tmp-')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(grown.tobytes())
+    os.replace(tmp_path, base / data)
+    index['data'] = data
+
+    for entry in index['keywords'].values():
+        if entry['last'] is not None:
+            entry['last'] += shift
+    index['start'] = new_start.isoformat()
+    index['days'] = new_days
+    return new_start, offsets + (old_start - new_start).days
+
+
+def _atomic_write(path: Path, text: str) -> None:
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix='.tmp-')
+    with os.fdopen(fd, 'w') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def clear() -> None:
+    """Delete the store (tests)."""
+    global _view, _view_mtime
+
+    with _lock:
+        _view = None
+        _view_mtime = None
+    base = _store_dir()
+    if base is not None and base.exists():
+        for path in list(base.glob('series*.f32')) + [base / 'index.json']:
+            try:
+                path.unlink()
+            except OSError:
+                pass
@@ -0,0 +1,290 @@
+import fcntl
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Precomputed trend series for the known keyword universe (see
+# trends.trend_universe), refreshed in the background on a schedule.
+# One worker process per machine (whoever holds the lock file) refreshes
+# and writes the table to disk; the others reload it when it changes.
+_entries: Dict[str, dict] = {}
+_refreshed_at: Optional[float] = None
+_loaded_mtime: Optional[float] = None
+_lock = threading.Lock()
+
+_thread: Optional[threading.Thread] = None
+_stop = threading.Event()
+_lock_file = None
+
+_stats = {
+    'refreshes': 0,
+    'failed_refreshes': 0,
+    'fetch_failures': 0,
+    'last_refresh_seconds': None,
+    'last_error': None,
+    'reloads': 0,
+    'leader': False,
+}
+
+# Give up on a refresh after this many upstream failures in a row (throttled)
+MAX_CONSECUTIVE_FAILURES = 5
+
+
+def lookup(keyword: str) -> Optional[dict]:
+    """Trend data for a keyword from the table, or None if it isn't in it."""
+    with _lock:
+        data = _entries.get(keyword.lower().strip())
+    return json.loads(json.dumps(data)) if data is not None else None
+
+
+def is_ready() -> bool:
+    """True once a complete table has been built or loaded from disk."""
+    return _refreshed_at is not None
+
+
+def find(keywords: List[str]) -> tuple:
+    """
+    First keyword (in preference order) with data in the table.
+
+    Returns:
+        tuple: (keyword, trend_data), or (None, None) if none has data
+    """
+    for kw in keywords:
+        data = lookup(kw)
+        if data and data.get('data') and 'error' not in data:
+            return kw.lower().strip(), data
+    return None, None
+
+
+def refresh(keywords: Iterable[str], fetch: Callable[[str], dict]) -> bool:
+    """
+    Fetch every keyword and publish the new table (memory and disk).
+
+    Keywords whose fetch fails keep their previous entry. After
+    MAX_CONSECUTIVE_FAILURES failures in a row (Google is throttling us)
+    the refresh stops; what was fetched so far is still published, but the
+    table only counts as refreshed (and ready) once a refresh completes.
+
+    Args:
+        keywords: The keyword universe
+        fetch: Returns trend data for one keyword; raises or returns
+            'error': 'unavailable' on failure
+
+    Returns:
+        True if the refresh ran to completion
+    """
+    global _entries, _refreshed_at
+
+    keywords = list(dict.fromkeys(kw.lower().strip() for kw in keywords))
+    start = time.time()
+    with _lock:
+        previous = dict(_entries)
+    entries = {kw: previous[kw] for kw in keywords if kw in previous}
+
+    failures = 0
+    consecutive = 0
+    complete = True
+    for i, kw in enumerate(keywords):
+        if _stop.is_set():
+            complete = False
+            break
+        if i:
+            # Pace requests so a refresh doesn't trip Google's rate limits
+            _stop.wait(Config.TREND_TABLE_PACE)
+        try:
+            data = fetch(kw)
+        except Exception as e:
+            logger.warning(f"Trend table fetch failed for '{kw}': {e}")
+            data = {'error': 'unavailable'}
+        if data.get('error') == 'unavailable':
+            failures += 1
+            consecutive += 1
+            if consecutive >= MAX_CONSECUTIVE_FAILURES:
+                complete = False
+                break
+            continue
+        consecutive = 0
+        entries[kw] = data
+
+    with _lock:
+        _entries = entries
+        if complete:
+            _refreshed_at = time.time()
+        _stats['fetch_failures'] += failures
+        _stats['last_refresh_seconds'] = round(time.time() - start, 2)
+        if complete:
+            _stats['refreshes'] += 1
+            _stats['last_error'] = None
+        else:
+            _stats['failed_refreshes'] += 1
+            _stats['last_error'] = f"stopped after {failures} failed fetches"
+        refreshed_at = _refreshed_at
+    _save(entries, refreshed_at)
+
+    logger.info(
+        f"Trend table refresh {'complete' if complete else 'incomplete'}: "
+        f"{len(entries)}/{len(keywords)} keywords, {failures} failures in {time.time() - start:.1f}s"
+    )
+    return complete
+
+
+def load() -> bool:
+    """Load the table from disk if it changed since the last load. Returns True if loaded."""
+    global _entries, _refreshed_at, _loaded_mtime
+
+    path = _table_path()
+    if path is None:
+        return False
+    try:
+        mtime = path.stat().st_mtime
+        if mtime == _loaded_mtime:
+            return False
+        table = json.loads(path.read_text())
+    except (OSError, ValueError):
+        return False
+
+    with _lock:
+        _entries = table.get('entries', {})
+        _refreshed_at = table.get('refreshed_at')
+        _loaded_mtime = mtime
+        _stats['reloads'] += 1
+    return True
+
+
+def start(universe: Callable[[], List[str]], fetch: Callable[[str], dict]) -> None:
+    """
+    Start the background refresher for this process (once).
+
+    Every process loads the table from disk straight away. The process that
+    holds the lock file refreshes it whenever it is older than
+    TREND_TABLE_INTERVAL; the rest reload it every TREND_TABLE_POLL seconds
+    and take over the lock if its holder exits.
+
+    Args:
+        universe: Returns the keywords to precompute
+        fetch: Returns trend data for one keyword, bypassing caches
+    """
+    global _thread
+
+    if _thread is not None and _thread.is_alive():
+        return
+    _stop.clear()
+    load()
+
+    def run():
+        while not _stop.is_set():
+            try:
+                if _try_lead():
+                    if _age() >= Config.TREND_TABLE_INTERVAL:
+                        if not refresh(universe(), fetch):
+                            # Throttled; try again sooner than the full interval
+                            _stop.wait(Config.TREND_TABLE_RETRY)
+                            continue
+                else:
+                    load()
+            except Exception as e:
+                logger.error(f"Trend table refresher error: {e}")
+                with _lock:
+                    _stats['last_error'] = str(e)
+            _stop.wait(Config.TREND_TABLE_POLL)
+
+    _thread = threading.Thread(target=run, name='trend-table', daemon=True)
+    _thread.start()
+    logger.info("Trend table refresher started")
+
+
+def stop() -> None:
+    """Stop the refresher and give up leadership."""
+    global _thread, _lock_file
+
+    _stop.set()
+    if _thread is not None:
+        _thread.join(timeout=5)
+        _thread = None
+    _stop.clear()
+    if _lock_file is not None:
+        _lock_file.close()
+        _lock_file = None
+        _stats['leader'] = False
+
+
+def table_stats() -> Dict:
+    """Refresher metrics for /api/metrics."""
+    with _lock:
+        stats = dict(_stats)
+        stats['keywords'] = len(_entries)
+        stats['with_data'] = sum(1 for data in _entries.values() if data.get('data'))
+        stats['last_refresh_at'] = _refreshed_at
+    stats['age_seconds'] = round(_age()) if _refreshed_at is not None else None
+    stats['running'] = _thread is not None and _thread.is_alive()
+    return stats
+
+
+def clear() -> None:
+    """Forget the in-memory table (tests)."""
+    global _entries, _refreshed_at, _loaded_mtime
+    with _lock:
+        _entries = {}
+        _refreshed_at = None
+        _loaded_mtime = None
+
+
+def _age() -> float:
+    if _refreshed_at is None:
+        return float('inf')
+    return time.time() - _refreshed_at
+
+
+def _try_lead() -> bool:
+    """Take (or keep) the refresher lock. Without a disk table every process leads."""
+    global _lock_file
+
+    if _lock_file is not None:
+        return True
+    path = _table_path()
+    if path is None:
+        _stats['leader'] = True
+        return True
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    lock_file = open(path.with_suffix('.lock'), 'a')
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        return False
+    # Held for the life of the process; the OS releases it if we die
+    _lock_file = lock_file
+    _stats['leader'] = True
+    logger.info(f"Trend table refresher is leader (pid {os.getpid()})")
+    return True
+
+
+def _table_path() -> Optional[Path]:
+    return Path(Config.TREND_TABLE_PATH) if Config.TREND_TABLE_PATH else None
+
+
+def _save(entries: Dict[str, dict], refreshed_at: Optional[float]) -> None:
+    global _loaded_mtime
+
+    path = _table_path()
+    if path is None:
+        return
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix='.tmp-')
+        with os.fdopen(fd, 'w') as f:
+            json.dump({'refreshed_at': refreshed_at, 'entries': entries}, f)
+        os.replace(tmp_path, path)
+        _loaded_mtime = path.stat().st_mtime
+    except OSError as e:
+        logger.warning(f"Trend table write failed: {e}")
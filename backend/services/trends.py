@@ -1,8 +1,18 @@
 import logging
+import queue
 import requests
 import json
 import re
+from datetime import date
+from typing import Dict, List
 from urllib.parse import quote
+from config import Config
+from services import trend_cache, trend_store, trend_table
+from services.trend_analytics import analyze_series, peak_label
+from services.vision import STYLE_ARCHETYPES
+from utils.cache import SingleFlight, TieredCache
+from utils.executors import PoolSaturated, get_pool
+from utils.lexicon import Lexicon
 
 logger = logging.getLogger(__name__)
 
@@ -34,51 +44,279 @@ STRIP_WORDS = {
     "meets", "new", "modern", "classic", "effortless"
 }
 
+# Location/season words worth trying as "<word> style"
+DESCRIPTOR_WORDS = {
+    "coastal", "french", "italian", "scandinavian", "european", "american",
+    "british", "japanese", "korean", "summer", "winter", "fall", "spring",
+    "resort", "beach", "city", "country",
+}
+
+# Tried last for every vibe
+GENERIC_TREND_TERMS = ["fashion trends", "style trends"]
+
+TRENDABLE_LEXICON = Lexicon({'trendable': TRENDABLE_TERMS})
+
+TIMEFRAME_3M = 'today 3-m'
+TIMEFRAME_1M = 'today 1-m'
+
+# Stored keywords last updated within this many days only fetch the last month
+STORE_INCREMENTAL_DAYS = 25
+
+# Reused pytrends sessions. Building a TrendReq costs a cookie bootstrap
+# round-trip, and a session holds per-payload state, so each one is checked
+# out by a single caller at a time and put back afterwards
+_sessions: 'queue.LifoQueue' = queue.LifoQueue()
+
+# Identical keyword batches requested concurrently share one upstream call
+_batch_flight = SingleFlight()
+_related_flight = SingleFlight()
+
+# Related queries returned per keyword
+RELATED_LIMIT = 5
+
 
 def get_trend_data(keyword: str, use_cache: bool = True) -> dict | None:
     """
     Fetch trend data for a keyword from Google Trends.
-    Uses direct HTTP requests to avoid pytrends dependency issues.
 
-    NOTE: This function is currently unused. Cache functionality disabled.
+    Served from the trend cache when possible: stale entries are returned
+    immediately while a background refresh runs, and keywords with no data
+    are cached negatively.
 
     Args:
         keyword: The search term (e.g., "quiet luxury", "coquette aesthetic")
-        use_cache: Whether to use cached data if available (currently ignored)
+        use_cache: Whether to use cached data if available
 
     Returns:
         Dict with trend data or None if request fails
     """
     keyword = keyword.lower().strip()
 
-    # Cache functionality removed - trend_cache.py moved to _archive
+    if use_cache:
+        return trend_cache.get_or_fetch(keyword, lambda: _fetch_trend_data(keyword))
+
+    return _fetch_trend_data(keyword)
+
+
+def _fetch_trend_data(keyword: str) -> dict:
+    """Fetch a keyword's interest over time from pytrends (no caching)."""
     logger.info(f"Fetching trend data for '{keyword}'")
+    return _fetch_trend_batch([keyword])[keyword]
+
 
+def _checkout_session():
+    """A pytrends session from the pool, or a new one if none is idle."""
     try:
-        # Try using pytrends if it works
+        return _sessions.get_nowait()
+    except queue.Empty:
         from pytrends.request import TrendReq
-        pytrends = TrendReq(hl='en-US', tz=360)
-        pytrends.build_payload([keyword], timeframe='today 3-m')
-        interest_df = pytrends.interest_over_time()
+        return TrendReq(hl='en-US', tz=360)
 
-        if interest_df.empty:
-            logger.warning(f"No trend data found for '{keyword}'")
-            return {'keyword': keyword, 'data': [], 'error': 'no_data'}
 
-        data_points = interest_df[keyword].tolist()
-        dates = [d.strftime('%Y-%m-%d') for d in interest_df.index]
+def _return_session(session) -> None:
+    if _sessions.qsize() < Config.TRENDS_POOL_SIZE:
+        _sessions.put(session)
 
-        return {
-            'keyword': keyword,
-            'data': data_points,
-            'dates': dates,
-            'timeframe': 'today 3-m'
-        }
 
+def _fetch_trend_batch(keywords: List[str], timeframe: str = TIMEFRAME_3M) -> Dict[str, dict]:
+    """
+    Fetch up to 5 keywords in one Google Trends request (no caching).
+
+    Google scales every keyword in a comparison against the highest one, so
+    each series is rescaled to peak at 100 like a single-keyword request.
+    'batch_peak' keeps each keyword's peak on the shared scale: a keyword
+    that is all zeros while others have data is only dwarfed, not missing,
+    and gets error 'dominated' rather than 'no_data'.
+
+    Returns:
+        Dict mapping each keyword to its trend data dict
+    """
+    try:
+        session = _checkout_session()
+        session.build_payload(keywords, timeframe=timeframe)
+        interest_df = session.interest_over_time()
     except Exception as e:
-        logger.warning(f"Pytrends failed for '{keyword}': {str(e)}, using fallback")
+        # The session isn't returned: a throttled cookie shouldn't be reused
+        logger.warning(f"Pytrends failed for {keywords}: {str(e)}, using fallback")
         # Return graceful fallback - trend feature degrades but doesn't break app
-        return {'keyword': keyword, 'data': [], 'error': 'unavailable'}
+        return {kw: {'keyword': kw, 'data': [], 'error': 'unavailable'} for kw in keywords}
+    _return_session(session)
+
+    if interest_df.empty:
+        logger.warning(f"No trend data found for {keywords}")
+        return {kw: {'keyword': kw, 'data': [], 'error': 'no_data'} for kw in keywords}
+
+    dates = [d.strftime('%Y-%m-%d') for d in interest_df.index]
+    peaks = {kw: max(interest_df[kw].tolist(), default=0) if kw in interest_df else 0 for kw in keywords}
+    any_data = any(peak > 0 for peak in peaks.values())
+
+    results = {}
+    for kw in keywords:
+        peak = peaks[kw]
+        if peak <= 0:
+            results[kw] = {'keyword': kw, 'data': [], 'error': 'dominated' if any_data else 'no_data'}
+            continue
+        results[kw] = {
+            'keyword': kw,
+            'data': [round(value * 100 / peak) for value in interest_df[kw].tolist()],
+            'dates': dates,
+            'timeframe': timeframe,
+            'batch_peak': int(peak)
+        }
+    return results
+
+
+def _has_data(trend_data: dict | None) -> bool:
+    return bool(trend_data and trend_data.get('data') and 'error' not in trend_data)
+
+
+def _store_trend_data(keyword: str, trend_data: dict) -> None:
+    """Add a fetched series to the offline trend store."""
+    if not _has_data(trend_data) or not trend_data.get('dates'):
+        return
+    try:
+        trend_store.ingest(keyword, trend_data['dates'], trend_data['data'])
+    except (OSError, ValueError) as e:
+        logger.warning(f"Trend store ingest failed for '{keyword}': {e}")
+
+
+def refresh_stored_trend(keyword: str) -> dict:
+    """
+    Bring a keyword's stored history up to date and return its last 3 months.
+
+    Keywords already in the store only fetch the last month (the shortest
+    daily-resolution window) and have it stitched on; others fetch the
+    full 3 months. Used by the trend table refresher and scripts/ingest_trends.py.
+
+    Returns:
+        Trend data dict, from the store when it has the keyword
+
+    Raises:
+        TrendUnavailable: The fetch failed; the stored history is left as is
+            and not returned, so callers can count the failure
+    """
+    keyword = keyword.lower().strip()
+    last = trend_store.last_date(keyword)
+    recent = last is not None and (date.today() - last).days < STORE_INCREMENTAL_DAYS
+    trend_data = _fetch_trend_batch([keyword], TIMEFRAME_1M if recent else TIMEFRAME_3M)[keyword]
+    if trend_data.get('error') == 'unavailable':
+        raise trend_cache.TrendUnavailable(trend_data)
+    _store_trend_data(keyword, trend_data)
+    return trend_store.read_series(keyword) or trend_data
+
+
+def find_stored_trend(keywords: List[str]) -> tuple:
+    """
+    First keyword (in preference order) with history in the offline store.
+
+    Returns:
+        tuple: (keyword, trend_data), or (None, None)
+    """
+    for kw in keywords:
+        trend_data = trend_store.read_series(kw)
+        if _has_data(trend_data):
+            return kw.lower().strip(), trend_data
+    return None, None
+
+
+def find_trend_data(keywords: List[str]) -> tuple:
+    """
+    Return the first keyword (in preference order) that has trend data.
+
+    Cached variants are used as they are (stale ones are refreshed in the
+    background). The uncached variants ahead of the first cached hit are
+    fetched together in a single Google Trends request over a pooled
+    session, instead of one session and request per variant.
+
+    Args:
+        keywords: Variants to try, most preferred first (at most
+            TREND_BATCH_SIZE are used)
+
+    Returns:
+        tuple: (keyword, trend_data), or (None, None) if no variant has data
+    """
+    keywords = keywords[:Config.TREND_BATCH_SIZE]
+    results = {}
+    missing = []
+    for kw in keywords:
+        kw = kw.lower().strip()
+        if trend_cache.get_cached(kw, allow_stale=True) is None:
+            if kw not in missing:
+                missing.append(kw)
+            continue
+        # A cache hit; get_trend_data revalidates it in the background if stale
+        results[kw] = get_trend_data(kw)
+        if _has_data(results[kw]):
+            # Nothing after a hit can win, so there's nothing more to fetch
+            break
+
+    if missing:
+        fetched, _ = _batch_flight.do(
+            TieredCache.make_key(missing),
+            lambda: _resolve_batch(missing, _fetch_trend_batch(missing))
+        )
+        results.update(fetched)
+
+    for kw in keywords:
+        kw = kw.lower().strip()
+        if _has_data(results.get(kw)):
+            return kw, results[kw]
+    return None, None
+
+
+def _resolve_batch(keywords: List[str], fetched: Dict[str, dict]) -> Dict[str, dict]:
+    """
+    Cache a batch's results. Dominated variants ahead of the first one with
+    data are re-fetched together without it, in one more request (they may
+    have data of their own, and the preference order decides the winner).
+    The winning series is re-fetched alone if it was too small on the
+    shared scale to have useful resolution, so a batch costs at most three
+    requests. Other low-resolution and dominated series aren't cached, so
+    they are fetched properly if they are ever the best variant left.
+    """
+    batch_sizes = dict.fromkeys(keywords, len(keywords))
+    first = next((i for i, kw in enumerate(keywords) if _has_data(fetched[kw])), len(keywords))
+    dominated = [kw for kw in keywords[:first] if fetched[kw].get('error') == 'dominated']
+    if dominated:
+        fetched.update(_fetch_trend_batch(dominated))
+        batch_sizes.update(dict.fromkeys(dominated, len(dominated)))
+
+    winner = next((kw for kw in keywords if _has_data(fetched[kw])), None)
+    if winner is not None and fetched[winner]['batch_peak'] < Config.TREND_MIN_BATCH_PEAK and batch_sizes[winner] > 1:
+        solo = _fetch_trend_batch([winner])[winner]
+        if _has_data(solo):
+            fetched[winner] = solo
+
+    for kw in keywords:
+        data = fetched[kw]
+        error = data.get('error')
+        if error in ('unavailable', 'dominated'):
+            continue
+        if error is None and kw != winner and data['batch_peak'] < Config.TREND_MIN_BATCH_PEAK:
+            continue
+        trend_cache.set_cached(kw, data)
+        _store_trend_data(kw, data)
+    return fetched
+
+
+def trend_universe() -> List[str]:
+    """
+    Every keyword the trend table precomputes: the known trendable terms,
+    each style archetype as extract_trendable_keywords tries it, the
+    descriptor styles and the generic fallbacks.
+    """
+    keywords = sorted(TRENDABLE_TERMS)
+    for archetype in STYLE_ARCHETYPES:
+        archetype = archetype.lower()
+        keywords.extend([f"{archetype} style", f"{archetype} aesthetic", archetype])
+    keywords.extend(f"{word} style" for word in sorted(DESCRIPTOR_WORDS))
+    keywords.extend(GENERIC_TREND_TERMS)
+    return list(dict.fromkeys(keywords))
+
+
+def start_trend_table() -> None:
+    """Start the background refresher that keeps the trend table current."""
+    trend_table.start(trend_universe, refresh_stored_trend)
 
 
 def extract_trendable_keywords(vibe_name: str, style_archetype: dict = None) -> list:
@@ -96,9 +334,7 @@ def extract_trendable_keywords(vibe_name: str, style_archetype: dict = None) ->
     vibe_lower = vibe_name.lower()
 
     # 1. Check if vibe name matches any known trendable term directly
-    for term in TRENDABLE_TERMS:
-        if term in vibe_lower:
-            keywords.append(term)
+    keywords.extend(TRENDABLE_LEXICON.terms(vibe_lower, 'trendable'))
 
     # 2. Use style archetype if provided (most reliable)
     if style_archetype:
@@ -127,13 +363,11 @@ def extract_trendable_keywords(vibe_name: str, style_archetype: dict = None) ->
 
         # If there are location/descriptor words, try them
         for word in meaningful_words:
-            if word in {"coastal", "french", "italian", "scandinavian", "european",
-                       "american", "british", "japanese", "korean", "summer", "winter",
-                       "fall", "spring", "resort", "beach", "city", "country"}:
+            if word in DESCRIPTOR_WORDS:
                 keywords.append(f"{word} style")
 
     # 4. Generic fallbacks
-    keywords.extend(["fashion trends", "style trends"])
+    keywords.extend(GENERIC_TREND_TERMS)
 
     # Remove duplicates while preserving order
     seen = set()
@@ -158,111 +392,116 @@ def get_trend_summary(keyword: str, style_archetype: dict = None) -> dict:
         Dict with:
         - direction: "rising" | "falling" | "stable" | "unknown"
         - change: percentage string like "+34%" or "-12%"
-        - sparkline: list of ~10 normalized values for mini chart
+        - slope: least-squares slope of the series (interest points per day)
+        - ewma: smoothed current interest (7-day EWMA)
+        - sparkline: list of ~10 values for mini chart (shape-preserving)
         - peak: when the trend peaked (e.g., "2 weeks ago", "now")
         - current: current interest value (0-100)
         - searched_term: the actual term that returned data
     """
-    # Extract multiple keywords to try
-    keywords_to_try = extract_trendable_keywords(keyword, style_archetype)
-    logger.info(f"Trend keywords to try: {keywords_to_try[:5]}")
+    searched_term, trend_data = _resolve_trend(keyword, style_archetype)
+    return _summarize([(keyword, searched_term, trend_data)])[0]
 
-    # Try each keyword until we get data
-    trend_data = None
-    searched_term = keyword
 
-    for kw in keywords_to_try[:5]:  # Try up to 5 keywords
-        trend_data = get_trend_data(kw)
-        if trend_data and trend_data.get('data') and 'error' not in trend_data:
-            searched_term = kw
-            logger.info(f"Found trend data using: '{kw}'")
-            break
+def get_trend_summaries(keywords: List[str]) -> List[dict]:
+    """
+    Trend summaries for many keywords, analyzed together in one pass.
 
-    if not trend_data or not trend_data.get('data') or 'error' in trend_data:
-        logger.warning(f"No trend data found for any keyword variant of '{keyword}'")
-        return {
-            'keyword': keyword,
-            'searched_term': None,
-            'direction': 'unknown',
-            'change': None,
-            'sparkline': [],
-            'peak': None,
-            'current': None
-        }
+    Each summary matches get_trend_summary for the same keyword. Keywords
+    resolve concurrently on the 'trends' pool: from the store or the trend
+    table when they have the keyword, otherwise with a live lookup.
 
-    data = trend_data['data']
-    dates = trend_data.get('dates', [])
+    Args:
+        keywords: Vibe names or aesthetics, duplicates allowed
 
-    if len(data) < 2:
-        return {
-            'keyword': keyword,
-            'direction': 'unknown',
-            'change': None,
-            'sparkline': data,
-            'peak': None,
-            'current': data[0] if data else None
-        }
+    Returns:
+        One summary per keyword, in order
+    """
+    unique = list(dict.fromkeys(keywords))
+    futures = {}
+    for kw in unique:
+        try:
+            futures[kw] = get_pool('trends').submit(_resolve_trend, kw)
+        except PoolSaturated:
+            futures[kw] = None
+    resolved = {
+        kw: future.result() if future is not None else _resolve_trend(kw)
+        for kw, future in futures.items()
+    }
+
+    summaries = dict(zip(unique, _summarize([(kw, *resolved[kw]) for kw in unique])))
+    return [summaries[kw] for kw in keywords]
 
-    # Calculate metrics
-    current = data[-1]
-    previous = data[0]
-    max_value = max(data)
-    max_index = data.index(max_value)
-
-    # Calculate percentage change
-    if previous > 0:
-        change_pct = ((current - previous) / previous) * 100
-    else:
-        change_pct = 100 if current > 0 else 0
-
-    # Determine direction
-    if change_pct > 15:
-        direction = 'rising'
-    elif change_pct < -15:
-        direction = 'falling'
-    else:
-        direction = 'stable'
-
-    # Format change string
-    if change_pct >= 0:
-        change_str = f"+{int(change_pct)}%"
-    else:
-        change_str = f"{int(change_pct)}%"
-
-    # Create sparkline (normalize to ~10 points)
-    if len(data) > 10:
-        step = len(data) // 10
-        sparkline = [data[i] for i in range(0, len(data), step)][:10]
-    else:
-        sparkline = data
-
-    # Determine peak timing
-    if max_index == len(data) - 1:
-        peak = 'now'
-    else:
-        weeks_ago = (len(data) - 1 - max_index) // 7
-        if weeks_ago == 0:
-            peak = 'this week'
-        elif weeks_ago == 1:
-            peak = '1 week ago'
-        elif weeks_ago < 4:
-            peak = f'{weeks_ago} weeks ago'
+
+def _resolve_trend(keyword: str, style_archetype: dict = None) -> tuple:
+    """The (searched_term, trend_data) behind a vibe's summary."""
+    # Extract multiple keywords to try
+    keywords_to_try = extract_trendable_keywords(keyword, style_archetype)
+    logger.info(f"Trend keywords to try: {keywords_to_try[:Config.TREND_BATCH_SIZE]}")
+
+    # Local history first: a slice of the memory-mapped store, even when
+    # Google is throttling us
+    searched_term, trend_data = find_stored_trend(keywords_to_try)
+    if trend_data is None and trend_table.is_ready():
+        # Precomputed in the background; no Google Trends call on this path
+        searched_term, trend_data = trend_table.find(keywords_to_try)
+    if trend_data is None:
+        # Not stored or in the table (e.g. outside the trend universe).
+        # Variants are compared in one request; the first with data wins
+        searched_term, trend_data = find_trend_data(keywords_to_try)
+    if trend_data is not None:
+        logger.info(f"Found trend data using: '{searched_term}'")
+    return searched_term, trend_data
+
+
+def _summarize(resolved: List[tuple]) -> List[dict]:
+    """
+    Build summaries for (keyword, searched_term, trend_data) triples. Every
+    series long enough to analyze goes through trend_analytics in one call.
+    """
+    summaries: List[dict] = [None] * len(resolved)
+    to_analyze = []
+
+    for i, (keyword, searched_term, trend_data) in enumerate(resolved):
+        if not trend_data or not trend_data.get('data') or 'error' in trend_data:
+            logger.warning(f"No trend data found for any keyword variant of '{keyword}'")
+            summaries[i] = {
+                'keyword': keyword,
+                'searched_term': None,
+                'direction': 'unknown',
+                'change': None,
+                'sparkline': [],
+                'peak': None,
+                'current': None
+            }
+        elif len(trend_data['data']) < 2:
+            data = trend_data['data']
+            summaries[i] = {
+                'keyword': keyword,
+                'direction': 'unknown',
+                'change': None,
+                'sparkline': data,
+                'peak': None,
+                'current': data[0] if data else None
+            }
         else:
-            months_ago = weeks_ago // 4
-            if months_ago == 1:
-                peak = '1 month ago'
-            else:
-                peak = f'{months_ago} months ago'
-
-    return {
-        'keyword': keyword,
-        'searched_term': searched_term,
-        'direction': direction,
-        'change': change_str,
-        'sparkline': sparkline,
-        'peak': peak,
-        'current': current
-    }
+            to_analyze.append(i)
+
+    metrics = analyze_series([resolved[i][2]['data'] for i in to_analyze])
+    for i, m in zip(to_analyze, metrics):
+        keyword, searched_term, trend_data = resolved[i]
+        summaries[i] = {
+            'keyword': keyword,
+            'searched_term': searched_term,
+            'direction': m['direction'],
+            'change': m['change'],
+            'slope': m['slope'],
+            'ewma': m['ewma'],
+            'sparkline': m['sparkline'],
+            'peak': peak_label(m['peak_index'], len(trend_data['data'])),
+            'current': m['current']
+        }
+    return summaries
 
 
 def get_related_queries(keyword: str) -> list:
@@ -270,15 +509,80 @@ def get_related_queries(keyword: str) -> list:
     Get related rising queries for a keyword.
     Useful for suggesting related aesthetics.
     """
-    try:
-        pytrends = TrendReq(hl='en-US', tz=360)
-        pytrends.build_payload([keyword], timeframe=TIMEFRAME_3M)
-        related = pytrends.related_queries()
+    return get_related_batch([keyword])[keyword.lower().strip()]
+
 
-        if keyword in related and related[keyword]['rising'] is not None:
-            rising = related[keyword]['rising']
-            return rising['query'].tolist()[:5]
+def get_related_batch(keywords: List[str], use_cache: bool = True) -> Dict[str, list]:
+    """
+    Related queries for several keywords.
+
+    Cached results (precomputed offline, kept for TREND_RELATED_TTL) are
+    returned as they are. The rest are fetched TREND_BATCH_SIZE keywords per
+    Google Trends request; identical concurrent batches share one request.
+
+    Args:
+        keywords: Search terms
+        use_cache: False to refetch everything (offline precompute)
+
+    Returns:
+        Dict mapping each normalized keyword to up to RELATED_LIMIT queries
+        (empty if Google has none or the request failed)
+    """
+    keywords = list(dict.fromkeys(kw.lower().strip() for kw in keywords))
+    results: Dict[str, list] = {}
+    missing = []
+    for kw in keywords:
+        cached = trend_cache.get_related_cached(kw) if use_cache else None
+        if cached is None:
+            missing.append(kw)
+        else:
+            results[kw] = cached
+
+    for i in range(0, len(missing), Config.TREND_BATCH_SIZE):
+        chunk = missing[i:i + Config.TREND_BATCH_SIZE]
+        fetched, _ = _related_flight.do(
+            TieredCache.make_key('related', chunk),
+            lambda: _fetch_related_batch(chunk)
+        )
+        for kw in chunk:
+            related = fetched[kw]
+            if related is None:
+                # Upstream failure: degrade to no suggestions, don't cache
+                results[kw] = []
+                continue
+            trend_cache.set_related_cached(kw, related)
+            results[kw] = related
+
+    return results
+
+
+def _fetch_related_batch(keywords: List[str]) -> Dict[str, list | None]:
+    """
+    Fetch related queries for up to 5 keywords in one request (no caching).
+
+    Rising queries come first, then top queries. None marks a failed
+    request.
+    """
+    logger.info(f"Fetching related queries for {keywords}")
+    try:
+        session = _checkout_session()
+        session.build_payload(keywords, timeframe=TIMEFRAME_3M)
+        related = session.related_queries()
     except Exception as e:
         logger.error(f"Error fetching related queries: {str(e)}")
+        return {kw: None for kw in keywords}
+    _return_session(session)
 
-    return []
+    results = {}
+    for kw in keywords:
+        queries = []
+        for kind in ('rising', 'top'):
+            frame = (related.get(kw) or {}).get(kind)
+            if frame is None or frame.empty:
+                continue
+            for query in frame['query'].tolist():
+                query = str(query).lower().strip()
+                if query and query != kw and query not in queries:
+                    queries.append(query)
+        results[kw] = queries[:RELATED_LIMIT]
+    return results
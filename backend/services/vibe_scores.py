@@ -0,0 +1,97 @@
+import logging
+from typing import Dict, List, Tuple
+
+from config import Config
+from utils.cache import TieredCache
+
+logger = logging.getLogger(__name__)
+
+# A product's score for a vibe rarely changes, and the same products keep
+# turning up for similar vibes and on /api/more-products. Remember every score
+# the model gives (rejections too) so re-rankers only send unseen products.
+_cache = TieredCache(
+    'vibe_scores',
+    ttl=Config.VIBE_SCORE_TTL,
+    max_entries=Config.VIBE_SCORE_CACHE_SIZE
+)
+
+
+def vibe_fingerprint(vibe_profile: Dict) -> str:
+    """
+    Identify a vibe by the fields that drive scoring: name, archetype, palette.
+    Works for both the full mood profile and the 'vibe' object clients echo back.
+    """
+    archetype = vibe_profile.get('style_archetype') or {}
+    if not isinstance(archetype, dict):
+        archetype = {'primary': str(archetype)}
+    palette = sorted(
+        (c.get('hex') or c.get('name') or '').lower()
+        for c in vibe_profile.get('color_palette', [])
+        if isinstance(c, dict)
+    )
+    return TieredCache.make_key(
+        ' '.join(vibe_profile.get('name', '').lower().split()),
+        (archetype.get('primary') or '').lower(),
+        (archetype.get('secondary') or '').lower(),
+        palette
+    )
+
+
+def product_identity(product: Dict) -> str:
+    """Stable product identity: id + URL, or the image URL when both are missing."""
+    identity = product.get('id', '') + product.get('product_url', '')
+    return identity or product.get('image_url', '')
+
+
+def _key(product: Dict, fingerprint: str) -> str:
+    return TieredCache.make_key(product_identity(product), fingerprint)
+
+
+def lookup_scores(
+    products: List[Dict],
+    fingerprint: str,
+    visual_only: bool = False
+) -> Tuple[List[Tuple[Dict, Dict]], List[Dict]]:
+    """
+    Split products into already-scored and unscored for a vibe.
+
+    Args:
+        products: Candidate products
+        fingerprint: vibe_fingerprint() of the vibe being ranked
+        visual_only: Treat text-only scores as unscored (the visual re-ranker
+            wants image-based scores)
+
+    Returns:
+        tuple: (scored, unscored) where scored holds (product, entry) pairs
+        and entry is {'score': int, 'visual': bool}
+    """
+    scored = []
+    unscored = []
+    for product in products:
+        entry = _cache.get(_key(product, fingerprint)) if product_identity(product) else None
+        if entry is None or (visual_only and not entry.get('visual')):
+            unscored.append(product)
+        else:
+            scored.append((product, entry))
+    return scored, unscored
+
+
+def store_scores(products: List[Dict], scores: Dict[int, int], fingerprint: str, visual: bool) -> None:
+    """
+    Remember model scores for a vibe.
+
+    Args:
+        products: The products that were sent to the model
+        scores: Index into products -> score, as returned by the model
+        fingerprint: vibe_fingerprint() of the vibe
+        visual: Whether the scores came from the image-based re-ranker
+    """
+    for index, score in scores.items():
+        if not 0 <= index < len(products) or not product_identity(products[index]):
+            continue
+        _cache.set(_key(products[index], fingerprint), {'score': score, 'visual': visual})
+
+
+def clear_scores() -> int:
+    """Clear all stored scores. Returns number of entries cleared."""
+    return _cache.clear()
@@ -1,11 +1,31 @@
+import base64
+import hashlib
 import json
+import logging
 from datetime import datetime
+from typing import Any, Callable, List, Optional, Tuple
 import openai
 from config import Config
+from utils.cache import TieredCache
+from utils.images import prepare_images
+from utils.json_stream import IncrementalObjectParser
+
+logger = logging.getLogger(__name__)
+
+# Called as on_field(name, value) for each mood profile field while streaming
+FieldCallback = Callable[[str, Any], None]
 
 # Initialize OpenAI client
 client = openai.OpenAI(api_key=Config.OPENAI_API_KEY)
 
+# Mood profiles keyed by image content hashes + normalized prompt + season.
+# Resubmitted boards (and retries after a timeout) skip the vision call.
+mood_cache = TieredCache(
+    'mood_profiles',
+    ttl=Config.MOOD_CACHE_TTL,
+    max_entries=Config.MOOD_CACHE_SIZE
+)
+
 
 def get_current_season() -> str:
     """Get the current season based on date (Northern Hemisphere)."""
@@ -146,7 +166,10 @@ TREND_MODIFIERS = [
     "editor pick", "street style", "runway inspired"
 ]
 
-# JSON schema for mood profile (shared between prompts)
+# JSON schema for mood profile (shared between prompts).
+# Field order matters: the fields product search needs (color_palette,
+# key_pieces, target_brands, search_queries) come early so streamed responses
+# can start searching before the model finishes the rest.
 MOOD_JSON_SCHEMA = """
 Return a JSON object with EXACTLY these fields (no additional text, just JSON):
 
@@ -165,24 +188,11 @@ Return a JSON object with EXACTLY these fields (no additional text, just JSON):
     ing how these archetypes manifest in this specific aesthetic"
   }},
 
-  "occasions": [
-    "Primary occasion this vibe suits (e.g., 'everyday casual', 'workwear', 'date night')",
-    "Secondary occasion if applicable"
-  ],
-
-  "season": {{
-    "best_for": ["season1", "season2"],
-    "adaptable": true,
-    "current_season_tips": "Brief tip for wearing this aesthetic in {current_season}"
-  }},
-
   "color_palette": [
     {{"name": "Color name", "hex": "#HEXCODE"}},
     {{"name": "Another color", "hex": "#HEXCODE"}}
   ],
 
-  "textures": ["texture1", "texture2", "texture3", "texture4"],
-
   "key_pieces": [
     "Specific item 1 (e.g., 'oversized linen blazer')",
     "Specific item 2",
@@ -191,12 +201,10 @@ Return a JSON object with EXACTLY these fields (no additional text, just JSON):
     "Specific item 5"
   ],
 
-  "avoid": ["thing1", "thing2", "thing3"],
-
   "target_brands": {{
     "aspirational": ["Luxury/designer brand featured in Vogue editorials", "Another fashion house that defines this aesthetic"],
     "contemporary": ["Fashion-forward mid-range brand seen on influencers", "Another editorial-approved contemporary brand"],
-    "trending": ["TikTok/Instagram viral brand that's having a moment", "Another emerging designer or cult favorite"],
+    "trending": ["TikTok/Instagram viral brand that's having a moment", "Another emerging designer or cult favorite"]
   }},
 
   "search_queries": [
@@ -212,6 +220,21 @@ Return a JSON object with EXACTLY these fields (no additional text, just JSON):
     "additional accessory query"
   ],
 
+  "textures": ["texture1", "texture2", "texture3", "texture4"],
+
+  "avoid": ["thing1", "thing2", "thing3"],
+
+  "occasions": [
+    "Primary occasion this vibe suits (e.g., 'everyday casual', 'workwear', 'date night')",
+    "Secondary occasion if applicable"
+  ],
+
+  "season": {{
+    "best_for": ["season1", "season2"],
+    "adaptable": true,
+    "current_season_tips": "Brief tip for wearing this aesthetic in {current_season}"
+  }},
+
   "confidence": {{
     "overall": 0.85,
     "aesthetic_clarity": 0.9,
@@ -287,13 +310,79 @@ Recommend ONLY editorial-quality, fashion-forward pieces and brands. No fast fas
 """ + MOOD_JSON_SCHEMA
 
 
-def extract_mood(images: list, prompt: str = "") -> dict:
+def image_digest(image: str) -> str:
+    """
+    Content hash of an image data URI.
+    Hashes the decoded bytes so the same image always maps to the same digest.
+    """
+    _, _, payload = image.partition(';base64,')
+    try:
+        raw = base64.b64decode(payload)
+    except Exception:
+        raw = image.encode('utf-8')
+    return hashlib.sha256(raw).hexdigest()
+
+
+def dedupe_images(images: list, decoded: Optional[list] = None) -> Tuple[list, List[str]]:
+    """
+    Drop duplicate images (by content) while preserving order.
+
+    Args:
+        images: Image data URIs
+        decoded: Optional DecodedImages aligned with images (from request
+            validation); their hashes are used instead of decoding again
+
+    Returns:
+        tuple: (unique_images, digests) with digests aligned to unique_images
+    """
+    if decoded is None or len(decoded) != len(images):
+        decoded = [None] * len(images)
+
+    unique_images = []
+    digests = []
+    for img, raw in zip(images, decoded):
+        digest = raw.sha256 if raw is not None else image_digest(img)
+        if digest not in digests:
+            unique_images.append(img)
+            digests.append(digest)
+    return unique_images, digests
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Lowercase and collapse whitespace so trivially different prompts share a cache entry."""
+    return " ".join((prompt or "").lower().split())
+
+
+def mood_cache_key(digests: List[str], prompt: str, season: str) -> str:
+    """Cache key for a mood profile. Image order on the board doesn't matter."""
+    return TieredCache.make_key(sorted(digests), normalize_prompt(prompt), season)
+
+
+def extract_mood(
+    images: list,
+    prompt: str = "",
+    on_field: Optional[FieldCallback] = None,
+    decoded: Optional[list] = None
+) -> dict:
     """
     Extract mood profile from images and/or text prompt.
 
+    Duplicate images are dropped before the call. Results are cached by image
+    content + prompt + season, and identical concurrent requests share a
+    single vision call.
+
+    With on_field, the model response is streamed and on_field(name, value)
+    is called for each top-level field as soon as it has been generated, so
+    callers can start work (e.g. product searches) before the full profile is
+    ready. Every field is reported exactly once, at the latest just before
+    extract_mood returns (cache hits report all fields at the end).
+
     Args:
         images: List of base64 encoded images with data URI prefix (can be empty)
         prompt: User's vibe description (can be empty if images provided)
+        on_field: Optional callback for incremental fields
+        decoded: Optional DecodedImages aligned with images, so the payloads
+            already decoded during validation aren't decoded again
 
     Returns:
         Parsed mood profile dict with fields:
@@ -304,20 +393,67 @@ def extract_mood(images: list, prompt: str = "") -> dict:
     Raises:
         Exception: If API call fails or response parsing fails
     """
-    has_images = images and len(images) > 0
+    images, digests = dedupe_images(images or [], decoded)
+    if decoded:
+        by_digest = {raw.sha256: raw for raw in decoded}
+        decoded = [by_digest.get(digest) for digest in digests]
     current_season = get_current_season()
 
+    cache_key = mood_cache_key(digests, prompt, current_season)
+
+    if on_field is None:
+        return mood_cache.get_or_load(
+            cache_key,
+            lambda: _extract_mood_uncached(images, prompt, current_season, decoded=decoded)
+        )
+
+    reported = set()
+
+    def report(name, value):
+        if name not in reported:
+            reported.add(name)
+            on_field(name, value)
+
+    mood_profile = mood_cache.get_or_load(
+        cache_key,
+        lambda: _extract_mood_uncached(images, prompt, current_season, on_field=report, decoded=decoded)
+    )
+    for name, value in mood_profile.items():
+        report(name, value)
+    return mood_profile
+
+
+def _extract_mood_uncached(
+    images: list,
+    prompt: str,
+    current_season: str,
+    on_field: Optional[FieldCallback] = None,
+    decoded: Optional[list] = None
+) -> dict:
+    """Call the vision model and parse/validate its mood profile."""
+    has_images = len(images) > 0
+    logger.info(f"Calling vision model with {len(images)} unique images")
+
     # Build message content
     content = []
 
-    # Add images if provided
+    # Add images if provided, downscaled to what the model will look at
     if has_images:
-        for img in images:
+        if Config.VISION_IMAGE_PREP:
+            prepared, report = prepare_images(images, decoded)
+            logger.info(
+                f"Image prep: {report['bytes_in'] // 1024}KB -> {report['bytes_out'] // 1024}KB, "
+                f"~{report['tokens_before']} -> {report['tokens_after']} image tokens "
+                f"(details: {[p['detail'] for p in prepared]})"
+            )
+        else:
+            prepared = [{'url': img, 'detail': 'high'} for img in images]
+        for image in prepared:
             content.append({
                 "type": "image_url",
                 "image_url": {
-                    "url": img,
-                    "detail": "high"
+                    "url": image['url'],
+                    "detail": image['detail']
                 }
             })
 
@@ -339,20 +475,24 @@ def extract_mood(images: list, prompt: str = "") -> dict:
     })
 
     # Call OpenAI - use gpt-4o for images, gpt-4o for text-only too (good at style)
-    response = client.chat.completions.create(
-        model="gpt-4o",
-        messages=[
-            {
-                "role": "user",
-                "content": content
-            }
-        ],
-        max_tokens=2000,
-        temperature=0.7
-    )
+    messages = [
+        {
+            "role": "user",
+            "content": content
+        }
+    ]
+    if on_field:
+        response_text = _stream_completion(messages, on_field)
+    else:
+        response = client.chat.completions.create(
+            model="gpt-4o",
+            messages=messages,
+            max_tokens=2000,
+            temperature=0.7
+        )
 
-    # Extract response text
-    response_text = response.choices[0].message.content
+        # Extract response text
+        response_text = response.choices[0].message.content
 
     # Clean up response (sometimes GPT adds markdown code blocks)
     response_text = clean_json_response(response_text)
@@ -417,6 +557,36 @@ def extract_mood(images: list, prompt: str = "") -> dict:
     return mood_profile
 
 
+def _stream_completion(messages: list, on_field: FieldCallback) -> str:
+    """
+    Stream the vision completion, reporting top-level fields as they complete.
+
+    Returns:
+        The full response text
+    """
+    stream = client.chat.completions.create(
+        model="gpt-4o",
+        messages=messages,
+        max_tokens=2000,
+        temperature=0.7,
+        stream=True
+    )
+
+    parser = IncrementalObjectParser()
+    parts = []
+    for chunk in stream:
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta.content
+        if not delta:
+            continue
+        parts.append(delta)
+        for name, value in parser.feed(delta):
+            on_field(name, value)
+
+    return "".join(parts)
+
+
 def clean_json_response(text: str) -> str:
     """
     Clean up GPT response to extract pure JSON.
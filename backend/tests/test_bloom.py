@@ -0,0 +1,40 @@
+import pytest
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.bloom import BloomFilter
+
+
+class TestBloomFilter:
+
+    def test_no_false_negatives(self):
+        bloom = BloomFilter()
+        keys = [f'product-{i}' for i in range(600)]
+        bloom.update(keys)
+        assert all(key in bloom for key in keys)
+
+    def test_false_positive_rate_is_small(self):
+        bloom = BloomFilter()
+        bloom.update(f'product-{i}' for i in range(600))
+        false_positives = sum(f'other-{i}' in bloom for i in range(10000))
+        assert false_positives < 100
+
+    def test_token_round_trip(self):
+        bloom = BloomFilter(1024, 4)
+        bloom.update(['a', 'b'])
+        restored = BloomFilter.from_token(bloom.to_token())
+        assert 'a' in restored and 'b' in restored
+        assert 'c' not in restored
+        assert (restored.num_bits, restored.num_hashes) == (1024, 4)
+
+    def test_token_size_does_not_grow_with_keys(self):
+        bloom = BloomFilter()
+        bloom.update(f'product-{i}' for i in range(2000))
+        assert len(bloom.to_token()) < 1500
+
+    @pytest.mark.parametrize('token', ['', 'not-a-token', 'AAAAAAA', BloomFilter(8).to_token()[:-4]])
+    def test_invalid_tokens_raise(self, token):
+        with pytest.raises(ValueError):
+            BloomFilter.from_token(token)
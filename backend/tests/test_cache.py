@@ -0,0 +1,167 @@
+import pytest
+import sys
+import os
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.cache import TieredCache, SingleFlight, cache_stats
+
+
+@pytest.fixture
+def cache_dir(tmp_path):
+    return str(tmp_path)
+
+
+class TestTieredCache:
+
+    def test_set_and_get(self, cache_dir):
+        cache = TieredCache('test_basic', ttl=60, directory=cache_dir)
+        cache.set('a', {'value': 1})
+        assert cache.get('a') == {'value': 1}
+        assert cache.get('missing') is None
+
+    def test_get_returns_copy(self, cache_dir):
+        cache = TieredCache('test_copy', ttl=60, directory=cache_dir)
+        cache.set('a', [{'name': 'blazer'}])
+        first = cache.get('a')
+        first[0]['vibe_score'] = 9
+        assert cache.get('a') == [{'name': 'blazer'}]
+
+    def test_expired_entry_is_a_miss(self, cache_dir):
+        cache = TieredCache('test_expiry', ttl=60, directory=cache_dir)
+        cache.set('a', 1, ttl=-1)
+        assert cache.get('a') is None
+
+    def test_lru_eviction(self, cache_dir):
+        cache = TieredCache('test_lru', ttl=60, max_entries=2, disk=False, directory=cache_dir)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')  # a is now most recently used
+        cache.set('c', 3)
+        assert cache.get('b') is None
+        assert cache.get('a') == 1
+        assert cache.stats()['evictions'] == 1
+
+    def test_disk_tier_shared_between_instances(self, cache_dir):
+        writer = TieredCache('test_shared', ttl=60, directory=cache_dir)
+        writer.set('a', {'q': 'quiet luxury'})
+
+        # A second instance stands in for another gunicorn worker
+        reader = TieredCache('test_shared', ttl=60, directory=cache_dir)
+        assert reader.get('a') == {'q': 'quiet luxury'}
+        assert reader.stats()['disk_hits'] == 1
+
+    def test_pruning_skips_in_progress_temp_files(self, cache_dir):
+        cache = TieredCache('test_prune_tmp', ttl=60, directory=cache_dir)
+        cache.set('a', 1)
+        # Another worker's write, between mkstemp and os.replace
+        pending = cache._dir / '.tmp-other.json'
+        pending.write_text('')
+
+        cache._prune_disk()
+        cache.clear()
+        assert pending.exists()
+        assert cache._entry_files() == []
+
+    def test_get_or_load_caches_result(self, cache_dir):
+        cache = TieredCache('test_load', ttl=60, directory=cache_dir)
+        calls = []
+
+        def loader():
+            calls.append(1)
+            return ['result']
+
+        assert cache.get_or_load('k', loader) == ['result']
+        assert cache.get_or_load('k', loader) == ['result']
+        assert len(calls) == 1
+
+    def test_loader_errors_are_not_cached(self, cache_dir):
+        cache = TieredCache('test_errors', ttl=60, directory=cache_dir)
+
+        def failing():
+            raise RuntimeError('upstream down')
+
+        with pytest.raises(RuntimeError):
+            cache.get_or_load('k', failing)
+        assert cache.get('k') is None
+        assert cache.stats()['load_errors'] == 1
+
+    def test_refresh_ahead_reloads_hot_entries(self, cache_dir):
+        cache = TieredCache('test_refresh', ttl=60, refresh_ahead=0.3, hot_hits=1, directory=cache_dir)
+        cache.set('k', 'old')
+        # Age the entry past the refresh point without expiring it
+        cache._memory['k']['stored_at'] -= 40
+        cache._memory['k']['hits'] = 1
+
+        assert cache.get_or_load('k', lambda: 'new') == 'old'
+        for _ in range(50):
+            if cache.get('k') == 'new':
+                break
+            time.sleep(0.01)
+        assert cache.get('k') == 'new'
+        assert cache.stats()['refreshes'] == 1
+
+    def test_stale_while_revalidate(self, cache_dir):
+        cache = TieredCache('test_swr', ttl=60, stale_ttl=60, directory=cache_dir)
+        cache.set('k', 'stale', ttl=-1)
+
+        # Plain gets only see fresh data, get_or_load serves stale and refreshes
+        assert cache.get('k') is None
+        assert cache.get_or_load('k', lambda: 'fresh') == 'stale'
+        for _ in range(50):
+            if cache.get('k') == 'fresh':
+                break
+            time.sleep(0.01)
+        assert cache.get('k') == 'fresh'
+        assert cache.stats()['stale_hits'] == 1
+
+    def test_entries_past_stale_window_are_misses(self, cache_dir):
+        cache = TieredCache('test_swr_expired', ttl=60, stale_ttl=10, directory=cache_dir)
+        cache.set('k', 'old', ttl=-20)
+        assert cache.get_or_load('k', lambda: 'new') == 'new'
+
+    def test_ttl_can_depend_on_value(self, cache_dir):
+        cache = TieredCache('test_ttl_fn', ttl=60, directory=cache_dir)
+        cache.get_or_load('empty', lambda: [], ttl=lambda v: 60 if v else -1)
+        cache.get_or_load('full', lambda: [1], ttl=lambda v: 60 if v else -1)
+        assert cache.get('empty') is None
+        assert cache.get('full') == [1]
+
+    def test_make_key_is_stable(self):
+        assert TieredCache.make_key('a', 1) == TieredCache.make_key('a', 1)
+        assert TieredCache.make_key('a', 1) != TieredCache.make_key('a', 2)
+
+    def test_stats_registered(self, cache_dir):
+        TieredCache('test_registry', ttl=60, directory=cache_dir)
+        assert 'test_registry' in cache_stats()
+
+
+class TestSingleFlight:
+
+    def test_concurrent_calls_share_one_execution(self):
+        flight = SingleFlight()
+        calls = []
+        release = threading.Event()
+        results = []
+
+        def slow():
+            calls.append(1)
+            release.wait(1)
+            return 'done'
+
+        def worker():
+            results.append(flight.do('key', slow))
+
+        threads = [threading.Thread(target=worker) for _ in range(5)]
+        for t in threads:
+            t.start()
+        time.sleep(0.05)
+        release.set()
+        for t in threads:
+            t.join()
+
+        assert len(calls) == 1
+        assert [r[0] for r in results] == ['done'] * 5
+        assert sum(1 for r in results if r[1]) == 4
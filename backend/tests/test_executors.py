@@ -0,0 +1,88 @@
+import pytest
+import sys
+import os
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.executors import BoundedExecutor, PoolSaturated, get_pool, pool_stats
+
+
+class TestBoundedExecutor:
+
+    def test_runs_tasks(self):
+        pool = BoundedExecutor('test_runs', max_workers=2, max_queue=4)
+        assert pool.submit(lambda x: x * 2, 21).result(1) == 42
+        stats = pool.stats()
+        assert stats['submitted'] == 1
+        assert stats['completed'] == 1
+        pool.shutdown()
+
+    def test_rejects_when_queue_full(self):
+        pool = BoundedExecutor('test_full', max_workers=1, max_queue=1)
+        release = threading.Event()
+        running = threading.Event()
+
+        def block():
+            running.set()
+            release.wait(1)
+
+        first = pool.submit(block)
+        running.wait(1)
+        queued = pool.submit(block)
+        with pytest.raises(PoolSaturated):
+            pool.submit(block)
+
+        stats = pool.stats()
+        assert stats['active'] == 1
+        assert stats['queued'] == 1
+        assert stats['rejected'] == 1
+        assert stats['saturation'] == 1.0
+
+        release.set()
+        first.result(1)
+        queued.result(1)
+        assert pool.stats()['queued'] == 0
+        pool.shutdown()
+
+    def test_cancelled_task_leaves_queue(self):
+        pool = BoundedExecutor('test_cancel', max_workers=1, max_queue=2)
+        release = threading.Event()
+        running = threading.Event()
+
+        def block():
+            running.set()
+            release.wait(1)
+
+        first = pool.submit(block)
+        running.wait(1)
+        queued = pool.submit(block)
+        assert queued.cancel()
+        assert pool.stats()['queued'] == 0
+
+        release.set()
+        first.result(1)
+        pool.shutdown()
+
+    def test_failures_are_counted(self):
+        pool = BoundedExecutor('test_fail', max_workers=1, max_queue=1)
+
+        def fail():
+            raise RuntimeError('upstream down')
+
+        with pytest.raises(RuntimeError):
+            pool.submit(fail).result(1)
+        assert pool.stats()['failed'] == 1
+        pool.shutdown()
+
+
+class TestPoolRegistry:
+
+    def test_pools_are_shared(self):
+        assert get_pool('serpapi') is get_pool('serpapi')
+        assert get_pool('serpapi') is not get_pool('trends')
+        assert 'serpapi' in pool_stats()
+
+    def test_unknown_pool(self):
+        with pytest.raises(KeyError):
+            get_pool('nope')
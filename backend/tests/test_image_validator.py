@@ -0,0 +1,122 @@
+import pytest
+import sys
+import os
+import threading
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services import image_validator
+
+
+class FakeResponse:
+
+    def __init__(self, status=200, content_type='image/jpeg', content=b'x' * 4096):
+        self.status_code = status
+        self.content = content
+        self.headers = {'Content-Type': content_type, 'Content-Length': str(len(content))}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+
+class FakeSession:
+    """Serves canned responses by URL and counts requests."""
+
+    def __init__(self, responses):
+        self.responses = responses
+        self.requests = []
+        self.lock = threading.Lock()
+
+    def _respond(self, method, url):
+        with self.lock:
+            self.requests.append((method, url))
+        response = self.responses[url]
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    def head(self, url, **kwargs):
+        return self._respond('HEAD', url)
+
+    def get(self, url, **kwargs):
+        return self._respond('GET', url)
+
+
+@pytest.fixture
+def fake_session(monkeypatch, tmp_path):
+    for cache in (image_validator._validity_cache, image_validator._thumbnail_index):
+        monkeypatch.setattr(cache, '_dir', tmp_path / cache.namespace)
+        cache.clear()
+    monkeypatch.setattr(image_validator.Config, 'THUMBNAIL_DIR', str(tmp_path / 'thumbnails'))
+
+    session = FakeSession({
+        'https://img.example/good.jpg': FakeResponse(),
+        'https://img.example/copy.jpg': FakeResponse(),
+        'https://img.example/dead.jpg': FakeResponse(status=404),
+        'https://img.example/pixel.gif': FakeResponse(content_type='image/gif', content=b'GIF89a'),
+        'https://img.example/page.html': FakeResponse(content_type='text/html'),
+        'https://img.example/timeout.jpg': requests.Timeout('slow'),
+    })
+    monkeypatch.setattr(image_validator, '_session', session)
+    yield session
+    for cache in (image_validator._validity_cache, image_validator._thumbnail_index):
+        cache.clear()
+
+
+class TestValidateImageUrl:
+
+    def test_valid_and_invalid(self, fake_session):
+        assert image_validator.validate_image_url('https://img.example/good.jpg')
+        assert not image_validator.validate_image_url('https://img.example/dead.jpg')
+        assert not image_validator.validate_image_url('https://img.example/pixel.gif')
+        assert not image_validator.validate_image_url('https://img.example/page.html')
+        assert not image_validator.validate_image_url('')
+
+    def test_results_are_cached_both_ways(self, fake_session):
+        for _ in range(3):
+            image_validator.validate_image_url('https://img.example/good.jpg')
+            image_validator.validate_image_url('https://img.example/dead.jpg')
+        assert len(fake_session.requests) == 2
+
+    def test_network_errors_are_not_cached(self, fake_session):
+        assert not image_validator.validate_image_url('https://img.example/timeout.jpg')
+        assert not image_validator.validate_image_url('https://img.example/timeout.jpg')
+        assert len(fake_session.requests) == 2
+
+
+class TestFilterValidProducts:
+
+    def test_keeps_order_and_unknowns(self, fake_session):
+        products = [
+            {'id': 'a', 'image_url': 'https://img.example/good.jpg'},
+            {'id': 'b', 'image_url': 'https://img.example/dead.jpg'},
+            {'id': 'c', 'image_url': 'https://img.example/timeout.jpg'},
+            {'id': 'd', 'image_url': 'https://img.example/copy.jpg'},
+        ]
+        valid = image_validator.filter_valid_products(products, timeout=5)
+        assert [p['id'] for p in valid] == ['a', 'c', 'd']
+
+
+class TestThumbnailStore:
+
+    def test_bytes_are_content_addressed(self, fake_session, monkeypatch, tmp_path):
+        monkeypatch.setattr(image_validator.Config, 'THUMBNAIL_STORE', True)
+
+        first = image_validator.fetch_image_bytes('https://img.example/good.jpg')
+        again = image_validator.fetch_image_bytes('https://img.example/good.jpg')
+        image_validator.fetch_image_bytes('https://img.example/copy.jpg')
+
+        assert first == again
+        assert len(fake_session.requests) == 2
+        # Identical bytes behind two URLs are stored once
+        assert len([p for p in (tmp_path / 'thumbnails').rglob('*') if p.is_file()]) == 1
+
+    def test_dead_image_returns_none(self, fake_session):
+        assert image_validator.fetch_image_bytes('https://img.example/dead.jpg') is None
+        assert not image_validator.validate_image_url('https://img.example/dead.jpg')
+        assert len(fake_session.requests) == 1
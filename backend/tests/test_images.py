@@ -0,0 +1,100 @@
+import pytest
+import sys
+import os
+import base64
+import io
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image
+
+from utils import images
+
+
+def data_uri(width, height, fmt='JPEG', mode='RGB', exif=None):
+    img = Image.new(mode, (width, height), (180, 120, 90) if mode == 'RGB' else (180, 120, 90, 128))
+    out = io.BytesIO()
+    kwargs = {'exif': exif} if exif is not None else {}
+    img.save(out, format=fmt, **kwargs)
+    media = 'jpeg' if fmt == 'JPEG' else fmt.lower()
+    return f'data:image/{media};base64,' + base64.b64encode(out.getvalue()).decode('ascii')
+
+
+def decode(uri):
+    return Image.open(io.BytesIO(base64.b64decode(uri.split(';base64,')[1])))
+
+
+class TestTokenEstimates:
+
+    def test_low_detail_is_flat(self):
+        assert images.estimate_tokens(4000, 3000, 'low') == 85
+
+    def test_high_detail_tiles(self):
+        # 4000x3000 -> 2048x1536 -> 1024x768: 2x2 tiles
+        assert images.vision_size(4000, 3000, 'high') == (1024, 768)
+        assert images.estimate_tokens(4000, 3000, 'high') == 85 + 170 * 4
+
+    def test_small_images_are_not_upscaled(self):
+        assert images.vision_size(300, 200, 'high') == (300, 200)
+
+
+class TestChooseDetail:
+
+    def test_full_board_uses_low(self):
+        assert images.choose_detail(3000, 2000, image_count=5) == 'low'
+
+    def test_single_large_image_uses_high(self):
+        assert images.choose_detail(3000, 2000, image_count=1) == 'high'
+
+    def test_small_image_uses_low(self):
+        assert images.choose_detail(400, 300, image_count=1) == 'low'
+
+
+class TestPrepareImage:
+
+    def test_downscales_to_vision_size(self):
+        prepared = images.prepare_image(data_uri(3000, 2000), image_count=1)
+        assert prepared['detail'] == 'high'
+        assert decode(prepared['url']).size == (1152, 768)
+        assert prepared['tokens_after'] == prepared['tokens_before']
+
+    def test_board_images_go_low(self):
+        prepared = images.prepare_image(data_uri(3000, 2000), image_count=4)
+        assert prepared['detail'] == 'low'
+        assert max(decode(prepared['url']).size) == 512
+        assert prepared['tokens_after'] == 85
+        assert prepared['bytes_out'] < prepared['bytes_in']
+
+    def test_strips_metadata(self):
+        exif = Image.Exif()
+        exif[0x010F] = 'PhoneMaker'  # camera make
+        prepared = images.prepare_image(data_uri(1600, 1200, exif=exif.tobytes()), image_count=1)
+        assert not decode(prepared['url']).getexif()
+
+    def test_png_with_alpha_becomes_jpeg(self):
+        prepared = images.prepare_image(data_uri(1200, 1200, fmt='PNG', mode='RGBA'), image_count=3)
+        assert prepared['url'].startswith('data:image/jpeg;base64,')
+
+    def test_small_image_is_still_stripped(self):
+        exif = Image.Exif()
+        exif[0x010F] = 'PhoneMaker'
+        prepared = images.prepare_image(data_uri(64, 48, exif=exif.tobytes()), image_count=1)
+        assert decode(prepared['url']).size == (64, 48)
+        assert not decode(prepared['url']).getexif()
+
+    def test_undecodable_image_is_rejected(self):
+        uri = 'data:image/jpeg;base64,' + base64.b64encode(b'not an image').decode('ascii')
+        with pytest.raises(ValueError):
+            images.prepare_image(uri)
+
+
+class TestPrepareImages:
+
+    def test_report_totals(self):
+        before = images.image_prep_stats()['images']
+        prepared, report = images.prepare_images([data_uri(3000, 2000), data_uri(2000, 3000), data_uri(800, 800)])
+        assert len(prepared) == 3
+        assert all(p['detail'] == 'low' for p in prepared)
+        assert report['tokens_saved'] > 0
+        assert report['bytes_saved'] == report['bytes_in'] - report['bytes_out']
+        assert images.image_prep_stats()['images'] == before + 3
@@ -1,10 +1,16 @@
 import pytest
+import base64
+import gzip
+import io
 import json
 import sys
 import os
+import time
+import zlib
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+import app as app_module
 from app import app
 
 # Test image (1x1 transparent PNG)
@@ -12,9 +18,10 @@ VALID_IMAGE = "data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcS
 
 
 @pytest.fixture
-def client():
-    """Create test client."""
+def client(monkeypatch):
+    """Create test client (rate limits off: the limiter's in-memory quota is shared across tests)."""
     app.config['TESTING'] = True
+    monkeypatch.setattr(app_module.limiter, 'enabled', False)
     with app.test_client() as client:
         yield client
 
@@ -29,6 +36,32 @@ class TestHealthEndpoint:
         assert data['service'] == 'moodboard-api'
 
 
+class TestMetricsEndpoint:
+
+    def test_disabled_without_token(self, client, monkeypatch):
+        monkeypatch.setattr(app_module.Config, 'METRICS_TOKEN', '')
+        assert client.get('/api/metrics').status_code == 404
+
+    def test_requires_bearer_token(self, client, monkeypatch):
+        monkeypatch.setattr(app_module.Config, 'METRICS_TOKEN', 'secret')
+        assert client.get('/api/metrics').status_code == 401
+        assert client.get('/api/metrics', headers={'Authorization': 'Bearer wrong'}).status_code == 401
+
+        response = client.get('/api/metrics', headers={'Authorization': 'Bearer secret'})
+        assert response.status_code == 200
+        data = json.loads(response.data)
+        assert {'caches', 'pools', 'trend_table', 'query_planner'} <= set(data)
+
+    def test_rate_limited(self, client, monkeypatch):
+        monkeypatch.setattr(app_module.Config, 'METRICS_TOKEN', 'secret')
+        monkeypatch.setattr(app_module.limiter, 'enabled', True)
+        app_module.limiter.reset()
+        statuses = [client.get('/api/metrics').status_code for _ in range(31)]
+        app_module.limiter.reset()
+        assert statuses[:30] == [401] * 30
+        assert statuses[30] == 429
+
+
 class TestMoodcheckValidation:
 
     def test_empty_request(self, client):
@@ -151,6 +184,296 @@ class TestMoodcheckSuccess:
         assert data['success'] is True
 
 
+class TestMoodcheckStreaming:
+
+    def test_stream_emits_stage_events(self, client, monkeypatch):
+        def fake_run_moodcheck(images, prompt, max_products=20, emit=None, decoded=None):
+            emit('vibe', {'vibe': {'name': 'Test Vibe'}})
+            emit('products', {'products': [], 'provisional': True})
+            return {'success': True, 'products': []}
+
+        monkeypatch.setattr(app_module, 'run_moodcheck', fake_run_moodcheck)
+        response = client.post('/api/moodcheck?stream=1',
+                               content_type='application/json',
+                               data=json.dumps({'prompt': 'coastal grandmother'}))
+
+        assert response.status_code == 200
+        assert response.mimetype == 'text/event-stream'
+        body = response.get_data(as_text=True)
+        events = [line[len('event: '):] for line in body.splitlines() if line.startswith('event: ')]
+        assert events == ['vibe', 'products', 'done']
+        assert '"name": "Test Vibe"' in body
+
+    def test_stream_is_rejected_when_jobs_pool_is_saturated(self, client, monkeypatch):
+        class FullPool:
+            def submit(self, fn, *args):
+                raise app_module.PoolSaturated('jobs pool saturated')
+
+        monkeypatch.setattr(app_module, 'get_pool', lambda name: FullPool())
+        response = client.post('/api/moodcheck?stream=1',
+                               content_type='application/json',
+                               data=json.dumps({'prompt': 'coastal grandmother'}))
+
+        assert response.status_code == 503
+        assert response.headers['Retry-After'] == '5'
+        assert json.loads(response.data)['success'] is False
+
+    def test_stream_validation_errors_are_plain_json(self, client):
+        response = client.post('/api/moodcheck',
+                               content_type='application/json',
+                               headers={'Accept': 'text/event-stream'},
+                               data='{}')
+        assert response.status_code == 400
+
+
+class TestMoodcheckUploads:
+
+    @pytest.fixture
+    def captured(self, monkeypatch):
+        calls = []
+
+        def fake_run_moodcheck(images, prompt, max_products=20, emit=None, decoded=None):
+            calls.append({'images': images, 'prompt': prompt, 'max_products': max_products, 'decoded': decoded})
+            return {'success': True, 'products': []}
+
+        monkeypatch.setattr(app_module, 'run_moodcheck', fake_run_moodcheck)
+        monkeypatch.setattr(app_module.limiter, 'enabled', False)
+        return calls
+
+    def test_multipart_raw_images(self, client, captured):
+        raw = base64.b64decode(VALID_IMAGE.split(',')[1])
+        response = client.post('/api/moodcheck', content_type='multipart/form-data', data={
+            'images': [(io.BytesIO(raw), 'a.png'), (io.BytesIO(raw), 'b.png')],
+            'prompt': 'beach day',
+            'max_products': '12',
+        })
+
+        assert response.status_code == 200
+        call = captured[0]
+        assert call['images'] == [VALID_IMAGE, VALID_IMAGE]
+        assert call['prompt'] == 'beach day'
+        assert call['max_products'] == 12
+        assert [bytes(d.data) for d in call['decoded']] == [raw, raw]
+
+    def test_multipart_rejects_non_images(self, client, captured):
+        response = client.post('/api/moodcheck', content_type='multipart/form-data', data={
+            'images': [(io.BytesIO(b'GIF89a' + b'\x00' * 64), 'a.gif')],
+        })
+        assert response.status_code == 400
+        assert 'Image 1 must be JPEG, PNG, or WEBP format' in response.get_json()['details']
+        assert not captured
+
+    @pytest.mark.parametrize('compress,encoding', [(gzip.compress, 'gzip'), (zlib.compress, 'deflate')])
+    def test_compressed_json_body(self, client, captured, compress, encoding):
+        body = json.dumps({'images': [VALID_IMAGE], 'prompt': 'beach day'}).encode()
+        response = client.post('/api/moodcheck', content_type='application/json',
+                               headers={'Content-Encoding': encoding}, data=compress(body))
+
+        assert response.status_code == 200
+        assert captured[0]['images'] == [VALID_IMAGE]
+
+    def test_decompressed_size_is_capped(self, client, captured, monkeypatch):
+        middleware = app_module.app.wsgi_app
+        monkeypatch.setattr(middleware, 'max_bytes', 64 * 1024)
+        # ~1MB of JSON that gzips to a few KB
+        body = json.dumps({'prompt': 'x', 'padding': ' ' * (1024 * 1024)}).encode()
+        response = client.post('/api/moodcheck', content_type='application/json',
+                               headers={'Content-Encoding': 'gzip'}, data=gzip.compress(body))
+
+        assert response.status_code == 413
+        assert response.get_json()['success'] is False
+        assert not captured
+
+    def test_truncated_gzip_is_bad_request(self, client, captured):
+        body = gzip.compress(json.dumps({'prompt': 'beach day'}).encode())
+        response = client.post('/api/moodcheck', content_type='application/json',
+                               headers={'Content-Encoding': 'gzip'}, data=body[:-12])
+        assert response.status_code == 400
+        assert not captured
+
+    def test_unknown_encoding_rejected(self, client, captured):
+        response = client.post('/api/moodcheck', content_type='application/json',
+                               headers={'Content-Encoding': 'br'}, data=b'...')
+        assert response.status_code == 415
+
+
+class TestMoodcheckJobs:
+
+    @pytest.fixture(autouse=True)
+    def fake_pipeline(self, monkeypatch, tmp_path):
+        from services import jobs
+        monkeypatch.setattr(jobs.Config, 'JOB_DIR', str(tmp_path / 'jobs'))
+        monkeypatch.setattr(app_module.limiter, 'enabled', False)
+        calls = []
+
+        def fake_run_moodcheck(images, prompt, max_products=20, emit=None, decoded=None):
+            calls.append(prompt)
+            emit('vibe', {'vibe': {'name': 'Test Vibe'}})
+            return {'success': True, 'vibe': {'name': 'Test Vibe'}, 'products': []}
+
+        monkeypatch.setattr(app_module, 'run_moodcheck', fake_run_moodcheck)
+        yield calls
+        jobs.clear_jobs()
+
+    def poll(self, client, url):
+        for _ in range(200):
+            job = client.get(url).get_json()['job']
+            if job['status'] in ('done', 'failed'):
+                return job
+            time.sleep(0.01)
+        raise AssertionError('job did not finish')
+
+    def test_job_runs_in_background(self, client):
+        response = client.post('/api/moodcheck/jobs', json={'prompt': 'coastal grandmother'})
+        assert response.status_code == 202
+        body = response.get_json()
+        assert response.headers['Location'].endswith(f"/api/moodcheck/jobs/{body['job_id']}")
+
+        job = self.poll(client, response.headers['Location'])
+        assert job['status'] == 'done'
+        assert job['result']['vibe']['name'] == 'Test Vibe'
+        assert job['stages'] == ['vibe']
+
+    def test_idempotent_retry_returns_same_job(self, client, fake_pipeline):
+        headers = {'Idempotency-Key': 'retry-1'}
+        first = client.post('/api/moodcheck/jobs', json={'prompt': 'beach day'}, headers=headers)
+        retry = client.post('/api/moodcheck/jobs', json={'prompt': 'beach day'}, headers=headers)
+
+        assert first.status_code == 202
+        assert retry.status_code == 200
+        assert retry.get_json()['job_id'] == first.get_json()['job_id']
+        self.poll(client, first.headers['Location'])
+        assert fake_pipeline == ['beach day']
+
+    def test_key_reused_with_different_body_is_422(self, client, fake_pipeline):
+        headers = {'Idempotency-Key': 'retry-2'}
+        first = client.post('/api/moodcheck/jobs', json={'prompt': 'beach day'}, headers=headers)
+        other = client.post('/api/moodcheck/jobs', json={'prompt': 'ski trip'}, headers=headers)
+
+        assert other.status_code == 422
+        assert other.get_json()['success'] is False
+        self.poll(client, first.headers['Location'])
+        assert fake_pipeline == ['beach day']
+
+    def test_invalid_request_is_rejected_up_front(self, client):
+        response = client.post('/api/moodcheck/jobs', json={})
+        assert response.status_code == 400
+
+    def test_unknown_job_is_404(self, client):
+        response = client.get('/api/moodcheck/jobs/' + '0' * 32)
+        assert response.status_code == 404
+        assert response.get_json()['success'] is False
+
+
+class TestMoreProducts:
+
+    @pytest.fixture(autouse=True)
+    def sessions(self, monkeypatch, tmp_path):
+        from services import product_sessions
+        monkeypatch.setattr(product_sessions._sessions, '_dir', tmp_path / 'product_sessions')
+        monkeypatch.setattr(app_module.limiter, 'enabled', False)
+        searched = []
+
+        def fake_fetch(queries, budget=None, vibe_profile=None):
+            searched.append(queries)
+            return [{'id': f's{i}', 'product_url': '', 'name': f'search {i}', 'vibe_score': 7} for i in range(3)]
+
+        monkeypatch.setattr(product_sessions, 'fetch_candidates', fake_fetch)
+        monkeypatch.setattr(product_sessions, 'score_candidates', lambda products, vibe_profile: products)
+        yield product_sessions, searched
+        product_sessions.clear_sessions()
+
+    def test_pages_from_session_pool(self, client, sessions):
+        product_sessions, searched = sessions
+        pool = [{'id': f'p{i}', 'product_url': '', 'name': f'pool {i}', 'vibe_score': 8} for i in range(6)]
+        session_id = product_sessions.create_session({'name': 'Boho'}, pool)
+
+        response = client.post('/api/more-products', json={'session_id': session_id, 'max_products': 4})
+        data = response.get_json()
+        assert response.status_code == 200
+        assert data['source'] == 'pool'
+        assert data['session_id'] == session_id
+        assert len(data['products']) == 4
+        assert searched == []
+
+    def test_expired_session_without_profile_is_gone(self, client):
+        response = client.post('/api/more-products', json={'session_id': '0' * 32})
+        assert response.status_code == 410
+        assert client.post('/api/more-products', json={}).status_code == 400
+
+    def test_vibe_profile_starts_a_session(self, client, sessions):
+        _, searched = sessions
+        response = client.post('/api/more-products', json={
+            'vibe_profile': {'name': 'Boho', 'key_pieces': ['maxi dress']},
+            'exclude_ids': ['s0'],
+        })
+        data = response.get_json()
+        assert response.status_code == 200
+        assert data['source'] == 'search'
+        assert [p['id'] for p in data['products']] == ['s1', 's2']
+        assert data['session_id']
+        assert len(searched) == 1
+
+    def test_seen_token_replaces_exclude_ids(self, client, sessions):
+        product_sessions, _ = sessions
+        seen = product_sessions.seen_filter([product_sessions.product_key({'id': 's0', 'product_url': ''})])
+        response = client.post('/api/more-products', json={
+            'vibe_profile': {'name': 'Boho', 'key_pieces': ['maxi dress']},
+            'seen': seen.to_token(),
+        })
+        data = response.get_json()
+        assert [p['id'] for p in data['products']] == ['s1', 's2']
+        assert 's1' in product_sessions.seen_filter(token=data['seen'])
+
+
+class TestTrendsBatch:
+
+    def test_returns_summaries_in_request_order(self, client, monkeypatch):
+        monkeypatch.setattr(app_module.limiter, 'enabled', False)
+        requested = []
+
+        def fake_summaries(keywords):
+            requested.append(keywords)
+            return [{'keyword': kw, 'direction': 'stable'} for kw in keywords]
+
+        monkeypatch.setattr(app_module, 'get_trend_summaries', fake_summaries)
+        response = client.get('/api/trends?k=boho,%20y2k,,&k=grunge')
+        assert response.status_code == 200
+        assert [t['keyword'] for t in response.get_json()['trends']] == ['boho', 'y2k', 'grunge']
+        assert requested == [['boho', 'y2k', 'grunge']]
+
+    def test_rejects_missing_or_too_many_keywords(self, client, monkeypatch):
+        monkeypatch.setattr(app_module.limiter, 'enabled', False)
+        assert client.get('/api/trends').status_code == 400
+        too_many = ','.join(f'k{i}' for i in range(app_module.Config.TRENDS_BATCH_MAX + 1))
+        response = client.get(f'/api/trends?k={too_many}')
+        assert response.status_code == 400
+        assert response.get_json()['success'] is False
+
+
+class TestRelatedTrends:
+
+    def test_related_endpoint(self, client, monkeypatch):
+        monkeypatch.setattr(app_module.limiter, 'enabled', False)
+        monkeypatch.setattr(app_module, 'get_related_queries', lambda keyword: ['boho wedding', 'boho dress'])
+        response = client.get('/api/trend/Boho/related')
+        assert response.status_code == 200
+        data = response.get_json()
+        assert data['keyword'] == 'boho'
+        assert data['related'] == ['boho wedding', 'boho dress']
+
+
+class TestAppFactory:
+
+    def test_create_app_builds_independent_apps(self):
+        other = app_module.create_app({'RATELIMIT_ENABLED': False})
+        assert other is not app
+        assert other.config['RATELIMIT_ENABLED'] is False
+        with other.test_client() as client:
+            assert client.get('/health').status_code == 200
+            assert client.get('/nonexistent').get_json()['success'] is False
+
+
 class TestCORS:
 
     def test_cors_headers(self, client):
@@ -0,0 +1,143 @@
+import pytest
+import sys
+import os
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services import jobs
+from services.pipeline import MoodcheckError
+from utils.executors import PoolSaturated
+
+
+@pytest.fixture
+def job_dir(monkeypatch, tmp_path):
+    monkeypatch.setattr(jobs.Config, 'JOB_DIR', str(tmp_path / 'jobs'))
+    jobs.clear_jobs()
+    yield tmp_path / 'jobs'
+    jobs.clear_jobs()
+
+
+def wait_for(job_id, status, stages=(), timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = jobs.get_job(job_id)
+        if job['status'] == status and all(stage in job['stages'] for stage in stages):
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job never reached {status}: {jobs.get_job(job_id)}")
+
+
+class TestSubmitJob:
+
+    def test_reports_progress_then_result(self, job_dir):
+        release = threading.Event()
+
+        def work(report):
+            report('vibe', {'vibe': {'name': 'Coastal'}})
+            release.wait(5)
+            return {'success': True, 'products': []}
+
+        job, created = jobs.submit_job(work)
+        assert created is True
+        assert job['status'] in ('queued', 'running')
+
+        running = wait_for(job['id'], 'running', stages=['vibe'])
+        assert running['stages'] == ['vibe']
+        assert running['partial']['vibe'] == {'vibe': {'name': 'Coastal'}}
+        assert 0 < running['progress'] < 1
+
+        release.set()
+        done = wait_for(job['id'], 'done')
+        assert done['result'] == {'success': True, 'products': []}
+        assert done['progress'] == 1.0
+        assert done['partial'] == {}
+
+    def test_failures_are_recorded(self, job_dir):
+        def fail(report):
+            raise MoodcheckError('Unable to analyze images. Please try again.')
+
+        def crash(report):
+            raise RuntimeError('boom')
+
+        failed, _ = jobs.submit_job(fail)
+        crashed, _ = jobs.submit_job(crash)
+        assert wait_for(failed['id'], 'failed')['error'] == 'Unable to analyze images. Please try again.'
+        assert wait_for(crashed['id'], 'failed')['error'] == 'Internal server error'
+
+    def test_unknown_job(self, job_dir):
+        assert jobs.get_job('0' * 32) is None
+        assert jobs.get_job('../../etc/passwd') is None
+
+
+class TestIdempotency:
+
+    def test_retry_attaches_to_existing_job(self, job_dir):
+        calls = []
+
+        def work(report):
+            calls.append(1)
+            return {'success': True}
+
+        first, created = jobs.submit_job(work, idempotency_key='abc')
+        again, created_again = jobs.submit_job(work, idempotency_key='abc')
+        other, _ = jobs.submit_job(work, idempotency_key='xyz')
+
+        assert created and not created_again
+        assert again['id'] == first['id']
+        assert other['id'] != first['id']
+        wait_for(first['id'], 'done')
+        wait_for(other['id'], 'done')
+        assert len(calls) == 2
+
+    def test_key_reused_with_a_different_request_is_rejected(self, job_dir):
+        job, _ = jobs.submit_job(lambda report: {'success': True}, idempotency_key='abc', fingerprint='request-1')
+        again, created = jobs.submit_job(lambda report: {}, idempotency_key='abc', fingerprint='request-1')
+        assert not created and again['id'] == job['id']
+
+        with pytest.raises(jobs.IdempotencyKeyReused):
+            jobs.submit_job(lambda report: {}, idempotency_key='abc', fingerprint='request-2')
+
+        # Also across workers, from the shared key file
+        jobs._keys.clear()
+        with pytest.raises(jobs.IdempotencyKeyReused):
+            jobs.submit_job(lambda report: {}, idempotency_key='abc', fingerprint='request-2')
+
+    def test_jobs_and_keys_are_visible_to_other_workers(self, job_dir):
+        job, _ = jobs.submit_job(lambda report: {'success': True}, idempotency_key='abc')
+        wait_for(job['id'], 'done')
+
+        # Another process sees only the shared job directory
+        jobs._jobs.clear()
+        jobs._keys.clear()
+
+        assert jobs.get_job(job['id'])['result'] == {'success': True}
+        again, created = jobs.submit_job(lambda report: {}, idempotency_key='abc')
+        assert not created and again['id'] == job['id']
+
+    def test_expired_key_starts_a_new_job(self, job_dir, monkeypatch):
+        job, _ = jobs.submit_job(lambda report: {'success': True}, idempotency_key='abc')
+        wait_for(job['id'], 'done')
+
+        # Age the finished job past its TTL
+        jobs._jobs[job['id']]['created_at'] -= jobs.Config.JOB_TTL + 1
+        jobs._save(jobs._jobs[job['id']])
+        assert jobs.get_job(job['id']) is None
+
+        again, created = jobs.submit_job(lambda report: {'success': True}, idempotency_key='abc')
+        assert created and again['id'] != job['id']
+
+    def test_saturated_pool_releases_the_key(self, job_dir, monkeypatch):
+        class FullPool:
+            def submit(self, *args):
+                raise PoolSaturated('jobs pool saturated')
+
+        monkeypatch.setattr(jobs, 'get_pool', lambda name: FullPool())
+        with pytest.raises(PoolSaturated):
+            jobs.submit_job(lambda report: {}, idempotency_key='abc')
+        monkeypatch.undo()
+        monkeypatch.setattr(jobs.Config, 'JOB_DIR', str(job_dir))
+
+        job, created = jobs.submit_job(lambda report: {'success': True}, idempotency_key='abc')
+        assert created
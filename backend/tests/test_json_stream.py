@@ -0,0 +1,50 @@
+import pytest
+import sys
+import os
+import json
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.json_stream import IncrementalObjectParser
+
+DOCUMENT = {
+    "name": "Old Money Tennis",
+    "style_archetype": {"primary": "old money", "secondary": None},
+    "search_queries": ["pleated tennis skirt women", "cable knit \"vest\", cream"],
+    "confidence": {"overall": 0.85, "notes": "braces } and [ in strings"},
+    "adaptable": True
+}
+
+
+def feed_in_chunks(text, size):
+    parser = IncrementalObjectParser()
+    fields = []
+    for i in range(0, len(text), size):
+        fields.extend(parser.feed(text[i:i + size]))
+    return parser, fields
+
+
+class TestIncrementalObjectParser:
+
+    @pytest.mark.parametrize('chunk_size', [1, 3, 17, 10000])
+    def test_yields_every_field_in_order(self, chunk_size):
+        parser, fields = feed_in_chunks(json.dumps(DOCUMENT, indent=2), chunk_size)
+        assert fields == list(DOCUMENT.items())
+        assert parser.done
+
+    def test_field_available_before_document_ends(self):
+        text = json.dumps(DOCUMENT)
+        cut = text.index('"confidence"')
+        parser = IncrementalObjectParser()
+        fields = dict(parser.feed(text[:cut]))
+        assert fields['search_queries'] == DOCUMENT['search_queries']
+        assert 'confidence' not in fields
+        assert not parser.done
+
+    def test_ignores_markdown_fence(self):
+        _, fields = feed_in_chunks('```json\n{"name": "Coquette"}\n```', 4)
+        assert fields == [('name', 'Coquette')]
+
+    def test_skips_unparseable_values(self):
+        _, fields = feed_in_chunks('{"brands": {"trending": ["a"],}, "name": "Y2K"}', 5)
+        assert fields == [('name', 'Y2K')]
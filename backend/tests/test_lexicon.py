@@ -0,0 +1,76 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.lexicon import Lexicon, tokenize
+from services.shopping import (
+    detect_item_type_from_prompt,
+    detect_product_category,
+    filter_by_item_type,
+    get_brand_score,
+    is_blocked_brand,
+    is_trusted_retailer,
+)
+from services.trends import extract_trendable_keywords
+
+
+class TestLexicon:
+
+    def test_tokenize_keeps_ampersands(self):
+        assert tokenize('H&M') == ['h', '&', 'm']
+        assert tokenize('J.Crew') == tokenize('j crew')
+
+    def test_word_boundaries(self):
+        lexicon = Lexicon({'brand': ['co', 'rag & bone']})
+        assert lexicon.labels('Co Collections') == {'brand'}
+        assert lexicon.labels('Coach') == frozenset()
+        assert lexicon.labels('Rag & Bone Denim') == {'brand'}
+
+    def test_matches_in_order(self):
+        lexicon = Lexicon({'a': ['quiet luxury'], 'b': ['luxury']})
+        assert lexicon.matches('quiet luxury knit') == [('a', 'quiet luxury'), ('b', 'luxury')]
+
+    def test_classify_batch(self):
+        lexicon = Lexicon({'shoes': ['boots'], 'bags': ['tote']})
+        assert lexicon.classify(['Suede Boots', 'Canvas Tote', None]) == [{'shoes'}, {'bags'}, frozenset()]
+
+
+class TestShoppingLookups:
+
+    def test_brand_score(self):
+        assert get_brand_score('Toteme') == 3
+        assert get_brand_score('Mirror Palais') == 4
+        assert get_brand_score('Madewell') == 1
+        assert get_brand_score('Coach') == 1  # not editorial "co"
+        assert get_brand_score('') == 0
+
+    def test_blocked_brand_checks_name(self):
+        assert is_blocked_brand('SHEIN')
+        assert is_blocked_brand('', 'Fashion Nova Ribbed Tank')
+        assert not is_blocked_brand('Wishbone Studio', 'Wishbone chair')
+
+    def test_trusted_retailer(self):
+        assert is_trusted_retailer('Nordstrom Rack')
+        assert is_trusted_retailer('J.Crew')
+        assert not is_trusted_retailer('Random Boutique')
+
+    def test_product_category_priority(self):
+        assert detect_product_category('Silk Shirt Dress') == 'Tops'
+        assert detect_product_category('Spring Midi Dress') == 'Dresses'
+        assert detect_product_category('Ceramic Vase') == 'Other'
+
+    def test_item_type_from_prompt(self):
+        assert detect_item_type_from_prompt('boho boots, please') == 'Shoes'
+        assert detect_item_type_from_prompt('spring vibes') is None
+
+    def test_filter_by_item_type(self):
+        products = [{'name': 'Leather Tote'}, {'name': 'Wool Coat'}]
+        assert filter_by_item_type(products, 'Bags') == [{'name': 'Leather Tote'}]
+
+
+class TestTrendableKeywords:
+
+    def test_known_terms_first(self):
+        keywords = extract_trendable_keywords('Quiet Luxury Old Money')
+        assert keywords[:2] == ['quiet luxury', 'old money']
@@ -0,0 +1,88 @@
+import pytest
+import sys
+import os
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services import palette
+
+PIXELS = palette.THUMB_SIZE * palette.THUMB_SIZE
+RED = [200, 30, 40]
+NAVY = [20, 30, 90]
+
+
+def thumbnail(rgb, background=(255, 255, 255), share=0.5):
+    """A flat-colored product on a white studio background."""
+    pixels = np.tile(np.array(background, dtype=np.uint8), (PIXELS, 1))
+    pixels[:int(PIXELS * share)] = rgb
+    return pixels
+
+
+@pytest.fixture
+def thumbnails(monkeypatch, tmp_path):
+    monkeypatch.setattr(palette._color_cache, '_dir', tmp_path)
+    palette._color_cache.clear()
+    images = {}
+    monkeypatch.setattr(palette, 'fetch_thumbnail', lambda url: images.get(url))
+    yield images
+    palette._color_cache.clear()
+
+
+class TestColorMath:
+
+    def test_rgb_to_lab_reference_points(self):
+        white, black = palette.rgb_to_lab(np.array([[255, 255, 255], [0, 0, 0]]))
+        assert white == pytest.approx([100, 0, 0], abs=0.1)
+        assert black == pytest.approx([0, 0, 0], abs=0.1)
+
+    def test_palette_lab_skips_bad_hex(self):
+        lab = palette.palette_lab([{'hex': '#C8141E'}, {'hex': 'nope'}, {'name': 'Camel'}])
+        assert lab.shape == (1, 3)
+
+    def test_dominant_color_ignores_background(self):
+        centers, weights = palette.dominant_colors(np.stack([thumbnail(RED)]))
+        top = centers[0][weights[0].argmax()]
+        assert np.linalg.norm(top - palette.rgb_to_lab(np.array(RED))) < 5
+
+    def test_distance_ranks_on_and_off_palette(self):
+        centers, weights = palette.dominant_colors(np.stack([thumbnail(RED), thumbnail(NAVY)]))
+        distances = palette.palette_distance(centers, weights, palette.palette_lab([{'hex': '#C81E28'}]))
+        assert distances[0] < 10 < 40 < distances[1]
+
+    def test_batch_of_240_is_fast(self):
+        rng = np.random.default_rng(0)
+        pixels = rng.integers(0, 256, size=(240, PIXELS, 3), dtype=np.uint8)
+        start = time.perf_counter()
+        palette.dominant_colors(pixels)
+        assert time.perf_counter() - start < 1.0
+
+
+class TestPrefilter:
+
+    def test_off_palette_products_move_back(self, thumbnails):
+        thumbnails['navy.jpg'] = thumbnail(NAVY)
+        thumbnails['red.jpg'] = thumbnail(RED)
+        products = [
+            {'id': 'navy', 'image_url': 'navy.jpg'},
+            {'id': 'unknown', 'image_url': 'missing.jpg'},
+            {'id': 'red', 'image_url': 'red.jpg'},
+        ]
+
+        ranked = palette.prefilter_by_palette(products, [{'name': 'Cherry', 'hex': '#C81E28'}])
+
+        assert [p['id'] for p in ranked] == ['unknown', 'red', 'navy']
+        assert ranked[1]['palette_distance'] < ranked[2]['palette_distance']
+        assert 'palette_distance' not in ranked[0]
+
+    def test_colors_are_cached_by_url(self, thumbnails):
+        thumbnails['red.jpg'] = thumbnail(RED)
+        palette.product_colors([{'image_url': 'red.jpg'}])
+        del thumbnails['red.jpg']
+        assert palette.product_colors([{'image_url': 'red.jpg'}])[0] is not None
+
+    def test_no_palette_is_a_no_op(self, thumbnails):
+        products = [{'id': 'a', 'image_url': 'a.jpg'}]
+        assert palette.prefilter_by_palette(products, []) == products
@@ -0,0 +1,182 @@
+import pytest
+import sys
+import os
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services import pipeline
+from services.pipeline import build_search_queries, coherence_swaps
+
+
+def product(pid):
+    return {'id': pid, 'product_url': f'https://example.com/{pid}', 'name': pid}
+
+
+class TestCoherenceSwaps:
+
+    def test_no_swaps(self):
+        items = [product('a'), product('b')]
+        assert coherence_swaps(items, list(items)) == []
+
+    def test_swap_patch_references_provisional_item(self):
+        provisional = [product('a'), product('b'), product('c')]
+        final = [product('a'), product('z'), product('c')]
+        swaps = coherence_swaps(provisional, final)
+        assert swaps == [{'replace_id': 'bhttps://example.com/b', 'product': product('z')}]
+
+
+class TestBuildSearchQueries:
+
+    def test_uses_profile_queries_without_item_type(self):
+        profile = {'name': 'Dark Academia', 'search_queries': ['tweed blazer women']}
+        assert build_search_queries(profile, 'moody', None) == ['tweed blazer women']
+
+    def test_item_type_focuses_queries(self):
+        profile = {'name': 'Boho', 'mood': 'free', 'textures': ['suede'], 'search_queries': ['x']}
+        queries = build_search_queries(profile, 'boho boots', 'Shoes')
+        assert queries[0] == 'Boho boot women'
+        assert all('boot' in q for q in queries)
+
+
+class TestRunMoodcheck:
+
+    PROFILE = {
+        'name': 'Quiet Luxury',
+        'mood': 'polished, calm',
+        'style_archetype': {'primary': 'quiet luxury'},
+        'color_palette': [{'name': 'camel', 'hex': '#C19A6B'}],
+        'key_pieces': ['cashmere sweater'],
+        'target_brands': {'contemporary': ['COS']},
+        'search_queries': ['cashmere sweater women'],
+        'textures': ['cashmere'],
+        'avoid': ['logos'],
+    }
+
+    def test_search_starts_before_vision_finishes(self, monkeypatch):
+        search_started = threading.Event()
+        events = []
+
+        def fake_extract_mood(images, prompt, on_field=None, decoded=None):
+            for name, value in self.PROFILE.items():
+                on_field(name, value)
+            # The rest of the response is still "generating"
+            assert search_started.wait(2)
+            return dict(self.PROFILE)
+
+        def fake_fetch_candidates(queries, budget=None, vibe_profile=None):
+            search_started.set()
+            return [product('a')]
+
+        monkeypatch.setattr(pipeline, 'extract_mood', fake_extract_mood)
+        monkeypatch.setattr(pipeline, 'fetch_candidates', fake_fetch_candidates)
+        monkeypatch.setattr(pipeline, 'score_candidates', lambda c, vibe_profile, reserve=None: c)
+        monkeypatch.setattr(pipeline, 'create_session', lambda profile, pool, seen, budget, reserve: 'session-1')
+        monkeypatch.setattr(pipeline, 'get_trend_summary', lambda name, style_archetype=None: {'direction': 'rising'})
+
+        result = pipeline.run_moodcheck([], 'quiet luxury', emit=lambda e, p: events.append(e))
+
+        assert result['products'] == [product('a')]
+        assert result['trend'] == {'direction': 'rising'}
+        assert result['session_id'] == 'session-1'
+        assert events[0] == 'vibe'
+        assert set(events) == {'vibe', 'trend', 'products', 'coherence'}
+
+    @pytest.fixture
+    def fake_stages(self, monkeypatch):
+        def fake_extract_mood(images, prompt, on_field=None, decoded=None):
+            for name, value in self.PROFILE.items():
+                on_field(name, value)
+            return dict(self.PROFILE)
+
+        monkeypatch.setattr(pipeline, 'extract_mood', fake_extract_mood)
+        monkeypatch.setattr(pipeline, 'fetch_candidates', lambda queries, budget=None, vibe_profile=None: [product('a')])
+        monkeypatch.setattr(pipeline, 'score_candidates', lambda c, vibe_profile, reserve=None: c)
+        monkeypatch.setattr(pipeline, 'create_session', lambda profile, pool, seen, budget, reserve: 'session-1')
+
+    def test_slow_trend_is_emitted_before_returning(self, monkeypatch, fake_stages):
+        events = []
+
+        def slow_trend(name, style_archetype=None):
+            time.sleep(0.2)
+            return {'direction': 'rising'}
+
+        monkeypatch.setattr(pipeline, 'get_trend_summary', slow_trend)
+        result = pipeline.run_moodcheck([], 'quiet luxury', emit=lambda e, p: events.append((e, p)))
+
+        assert ('trend', {'trend': {'direction': 'rising'}}) in events
+        assert result['trend'] == {'direction': 'rising'}
+
+    def test_trend_timeout_emits_empty_trend(self, monkeypatch, fake_stages):
+        events = []
+        release = threading.Event()
+
+        def hung_trend(name, style_archetype=None):
+            release.wait(2)
+            return {'direction': 'rising'}
+
+        monkeypatch.setattr(pipeline.Config, 'TREND_TIMEOUT', 0.05)
+        monkeypatch.setattr(pipeline, 'get_trend_summary', hung_trend)
+        try:
+            result = pipeline.run_moodcheck([], 'quiet luxury', emit=lambda e, p: events.append((e, p)))
+        finally:
+            release.set()
+
+        assert result['trend'] is None
+        assert ('trend', {'trend': None}) in events
+
+    def test_trend_is_sent_while_products_are_ranking(self, monkeypatch, fake_stages):
+        events = []
+        trend_sent = threading.Event()
+
+        def slow_trend(name, style_archetype=None):
+            time.sleep(0.1)
+            return {'direction': 'rising'}
+
+        def emit(event, payload):
+            events.append(event)
+            if event == 'trend':
+                trend_sent.set()
+
+        def slow_scoring(candidates, vibe_profile, reserve=None):
+            # Re-ranking outlasts the trend lookup
+            assert trend_sent.wait(2)
+            return candidates
+
+        monkeypatch.setattr(pipeline, 'get_trend_summary', slow_trend)
+        monkeypatch.setattr(pipeline, 'score_candidates', slow_scoring)
+        result = pipeline.run_moodcheck([], 'quiet luxury', emit=emit)
+
+        assert events[:2] == ['vibe', 'trend']
+        assert events.count('trend') == 1
+        assert result['trend'] == {'direction': 'rising'}
+
+    def test_coherence_swaps_patch_the_filtered_products(self, monkeypatch, fake_stages):
+        events = []
+        selected = [product(f'{i} leather boots') for i in range(5)] + [product('silk blouse')]
+        bench = [product('suede boots')]
+
+        def fake_coherence(selected_products, bench_products, vibe_profile, max_swaps):
+            assert product('silk blouse') not in selected_products
+            return selected_products[:2] + bench_products[:1] + selected_products[3:]
+
+        monkeypatch.setattr(pipeline, 'get_trend_summary', lambda name, style_archetype=None: None)
+        monkeypatch.setattr(pipeline, 'select_candidates', lambda pool, max_products: (list(selected), list(bench)))
+        monkeypatch.setattr(pipeline, 'score_outfit_coherence', fake_coherence)
+        result = pipeline.run_moodcheck([], 'quiet luxury boots', emit=lambda e, p: events.append((e, p)))
+
+        sent = next(p['products'] for e, p in events if e == 'products')
+        swaps = next(p['swaps'] for e, p in events if e == 'coherence')
+        assert swaps == [{'replace_id': pipeline.product_key(sent[2]), 'product': product('suede boots')}]
+        patched = [swap['product'] if pipeline.product_key(p) == swap['replace_id'] else p
+                   for p in sent for swap in swaps]
+        assert patched == result['products']
+
+    def test_vision_failure_raises_moodcheck_error(self, monkeypatch):
+        def failing_extract_mood(images, prompt, on_field=None, decoded=None):
+            raise RuntimeError('timeout')
+
+        monkeypatch.setattr(pipeline, 'extract_mood', failing_extract_mood)
+        with pytest.raises(pipeline.MoodcheckError):
+            pipeline.run_moodcheck([], 'boho')
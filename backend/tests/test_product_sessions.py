@@ -0,0 +1,152 @@
+import pytest
+import sys
+import os
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services import product_sessions
+from services.shopping import product_key
+
+PROFILE = {'name': 'Quiet Luxury', 'key_pieces': ['cashmere sweater'], 'color_palette': []}
+
+
+def product(pid, score=8):
+    return {'id': pid, 'product_url': f'https://example.com/{pid}', 'name': f'{pid} sweater', 'vibe_score': score}
+
+
+@pytest.fixture(autouse=True)
+def isolated_sessions(tmp_path, monkeypatch):
+    monkeypatch.setattr(product_sessions._sessions, '_dir', tmp_path / 'product_sessions')
+    product_sessions.clear_sessions()
+    yield
+    product_sessions.clear_sessions()
+
+
+@pytest.fixture
+def searches(monkeypatch):
+    """Record refill searches; each returns the products queued in `results`."""
+    calls = []
+    results = []
+
+    def fake_fetch(queries, budget=None, vibe_profile=None):
+        calls.append(queries)
+        return results.pop(0) if results else []
+
+    monkeypatch.setattr(product_sessions, 'fetch_candidates', fake_fetch)
+    monkeypatch.setattr(product_sessions, 'score_candidates', lambda products, vibe_profile: products)
+    return calls, results
+
+
+class TestNextPage:
+
+    def test_pages_come_from_the_pool(self, searches):
+        calls, _ = searches
+        pool = [product(f'p{i}') for i in range(10)]
+        session_id = product_sessions.create_session(PROFILE, pool, seen=product_sessions.seen_filter([product_key(pool[0])]))
+
+        first, info = product_sessions.next_page(session_id, max_products=4)
+        second, _ = product_sessions.next_page(session_id, max_products=4)
+
+        assert calls == []
+        assert info['source'] == 'pool'
+        assert info['remaining'] == 5
+        keys = [product_key(p) for p in first + second]
+        assert len(set(keys)) == 8
+        assert product_key(pool[0]) not in keys
+
+    def test_dry_pool_is_refilled_by_search(self, searches):
+        calls, results = searches
+        pool = [product('a'), product('b')]
+        session_id = product_sessions.create_session(PROFILE, pool)
+        results.append([product('a'), product('c'), product('d')])
+
+        page, info = product_sessions.next_page(session_id, max_products=4, exclude_ids=[product_key(product('b'))])
+
+        assert len(calls) == 1
+        assert info['source'] == 'search'
+        # 'b' was excluded by the client; 'a' came back from search but isn't repeated
+        assert sorted(p['id'] for p in page) == ['a', 'c', 'd']
+
+    def test_refills_rotate_through_queries(self, searches):
+        calls, _ = searches
+        session_id = product_sessions.create_session(PROFILE, [])
+        product_sessions.next_page(session_id, max_products=4)
+        product_sessions.next_page(session_id, max_products=4)
+        assert calls[0] != calls[1]
+
+    def test_refill_size_follows_page_size(self, searches):
+        calls, _ = searches
+        small = product_sessions.create_session(PROFILE, [])
+        large = product_sessions.create_session(PROFILE, [])
+        product_sessions.next_page(small, max_products=4)
+        product_sessions.next_page(large, max_products=20)
+        assert [len(queries) for queries in calls] == [1, 4]
+
+    def test_seen_token_carries_shown_products(self, searches):
+        pool = [product(f'p{i}') for i in range(6)]
+        session_id = product_sessions.create_session(PROFILE, pool)
+        page, info = product_sessions.next_page(session_id, max_products=4)
+
+        # The session expired: a new one built from the token skips the same products
+        seen = product_sessions.seen_filter(token=info['seen'])
+        fresh = product_sessions.create_session(PROFILE, pool, seen=seen)
+        rest, _ = product_sessions.next_page(fresh, max_products=4)
+        assert {p['id'] for p in page}.isdisjoint(p['id'] for p in rest)
+        assert len(rest) == 2
+
+    def test_reserve_is_scored_before_searching(self, searches):
+        calls, _ = searches
+        reserve = [product(f'r{i}') for i in range(6)]
+        session_id = product_sessions.create_session(PROFILE, [product('a')], reserve=reserve)
+
+        page, info = product_sessions.next_page(session_id, max_products=4)
+        assert calls == []
+        assert info['source'] == 'reserve'
+        assert len(page) == 4
+
+        # The queries the reserve made unnecessary are searched next
+        product_sessions.next_page(session_id, max_products=20)
+        assert calls[0] == product_sessions.build_more_queries(PROFILE)[:4]
+
+    def test_refill_does_not_hold_the_lock(self, searches, monkeypatch):
+        calls, results = searches
+        monkeypatch.setattr(product_sessions, '_locks', [threading.Lock()])
+        release = threading.Event()
+        fetch = product_sessions.fetch_candidates
+
+        def slow_fetch(queries, budget=None, vibe_profile=None):
+            release.wait(1)
+            return fetch(queries, budget, vibe_profile)
+
+        monkeypatch.setattr(product_sessions, 'fetch_candidates', slow_fetch)
+        session_id = product_sessions.create_session(PROFILE, [product(f'p{i}') for i in range(3)])
+        other = product_sessions.create_session(PROFILE, [product(f'o{i}') for i in range(4)])
+        results.append([product('c'), product('d')])
+
+        pages = []
+        refill = threading.Thread(target=lambda: pages.append(product_sessions.next_page(session_id, max_products=4)))
+        refill.start()
+        time.sleep(0.05)
+        # Neither another session on the stripe nor this session's pool waits on the search
+        assert product_sessions.next_page(other, max_products=4)[1]['source'] == 'pool'
+        shown, _ = product_sessions.next_page(session_id, max_products=2)
+        assert refill.is_alive()
+        release.set()
+        refill.join()
+
+        page, info = pages[0]
+        assert info['source'] == 'search'
+        # Merged into the newer state: the products shown meanwhile aren't repeated
+        assert {p['id'] for p in shown}.isdisjoint(p['id'] for p in page)
+        assert len(shown) + len(page) == 5
+        assert info['remaining'] == 0
+
+    def test_invalid_seen_token_is_ignored(self):
+        seen = product_sessions.seen_filter(['a'], token='not-a-token')
+        assert 'a' in seen
+
+    def test_unknown_session(self):
+        assert product_sessions.next_page('0' * 32) is None
+        assert product_sessions.get_session('../etc') is None
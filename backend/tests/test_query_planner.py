@@ -0,0 +1,95 @@
+import pytest
+import sys
+import os
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services import query_planner, shopping
+from services.query_planner import canonical_tokens, plan_queries
+
+
+class TestPlanQueries:
+
+    def test_canonical_tokens_ignore_case_order_and_noise(self):
+        assert canonical_tokens('Trending  Oversized Blazer women') == canonical_tokens('blazer, oversized')
+        assert canonical_tokens("J.Crew women's cardigan") == frozenset({'j', 'crew', 'cardigan'})
+        assert canonical_tokens('women fashion') == frozenset({'women', 'fashion'})
+
+    def test_collapses_near_duplicates_keeping_the_first(self):
+        plan = plan_queries([
+            'trending oversized blazer women',
+            'wide leg trousers',
+            'cream oversized blazer women',
+            'Wide Leg Trousers',
+        ])
+        assert plan.queries == ['trending oversized blazer women', 'wide leg trousers']
+        assert plan.collapsed == {
+            'cream oversized blazer women': 'trending oversized blazer women',
+            'Wide Leg Trousers': 'wide leg trousers',
+        }
+        assert plan.saved == 2
+
+    def test_distinct_queries_are_kept(self):
+        queries = ['silk slip dress', 'chunky loafers', 'cashmere crewneck sweater']
+        assert plan_queries(queries).queries == queries
+
+    def test_keep_protects_from_near_duplicate_collapse(self):
+        queries = ['oversized blazer', 'Toteme oversized blazer', 'Toteme oversized blazer']
+        plan = plan_queries(queries, keep=['Toteme oversized blazer'])
+        assert plan.queries == ['oversized blazer', 'Toteme oversized blazer']
+        assert plan.saved == 1
+
+    @pytest.mark.parametrize('threshold, expected', [(0.5, 1), (0.9, 2)])
+    def test_threshold(self, threshold, expected):
+        plan = plan_queries(['linen shirt', 'white linen shirt'], threshold=threshold)
+        assert len(plan.queries) == expected
+
+
+class TestSharedSearches:
+
+    @pytest.fixture(autouse=True)
+    def isolated_cache(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(shopping.search_cache, '_dir', tmp_path)
+        shopping.search_cache.clear()
+        yield
+        shopping.search_cache.clear()
+
+    def test_cache_is_keyed_on_the_normalized_query(self):
+        key = lambda q: shopping.search_cache_key(shopping.build_search_params(q, 20))
+        assert key('Linen  Blazer women') == key('linen blazer women')
+        # Near-duplicates are only collapsed within one request's plan
+        assert key('linen blazer women') != key('linen blazer')
+        assert key('trending linen blazer') != key('linen blazer')
+        assert key('blazer linen') != key('linen blazer')
+
+    def test_concurrent_identical_searches_run_once(self, monkeypatch):
+        calls = []
+        release = threading.Event()
+
+        def slow_fetch(params):
+            calls.append(params['q'])
+            release.wait(1)
+            return []
+
+        monkeypatch.setattr(shopping, '_fetch_shopping_results', slow_fetch)
+        before = query_planner.planner_stats()['shared']
+        threads = [threading.Thread(target=shopping.search_products, args=(q, 20))
+                   for q in ['oversized blazer women', 'Oversized Blazer women', 'oversized  blazer WOMEN']]
+        for t in threads:
+            t.start()
+        time.sleep(0.05)
+        release.set()
+        for t in threads:
+            t.join()
+
+        assert len(calls) == 1
+        assert query_planner.planner_stats()['shared'] == before + 2
+
+    def test_stats_accumulate(self):
+        before = query_planner.planner_stats()
+        plan_queries(['oversized blazer', 'trending oversized blazer'])
+        after = query_planner.planner_stats()
+        assert after['plans'] == before['plans'] + 1
+        assert after['saved'] == before['saved'] + 1
@@ -1,10 +1,18 @@
 import pytest
+import asyncio
+import concurrent.futures
 import sys
 import os
+import threading
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+import httpx
+
+from config import Config
+from services import shopping, shopping_async
 from services.shopping import format_product, detect_budget_from_prompt, search_all_queries
+from utils.aio import run_coroutine
 
 class TestFormatProduct:
 
@@ -99,3 +107,118 @@ class TestSearchAllQueries:
     def test_empty_queries(self):
         result = search_all_queries([], max_products=20)
         assert result == []
+
+    def test_near_duplicate_queries_are_searched_once(self, monkeypatch):
+        searched = []
+
+        def fake_search(query, num_results=10, min_price=None, max_price=None):
+            searched.append(query)
+            return []
+
+        monkeypatch.setattr(Config, 'SEARCH_BACKEND', 'threads')
+        monkeypatch.setattr(shopping, 'search_products', fake_search)
+        shopping.fetch_candidates(
+            ['oversized blazer women', 'wide leg trousers'],
+            vibe_profile={
+                'key_pieces': ['oversized blazer'],
+                'color_palette': [{'name': 'Cream', 'hex': '#FFFDD0'}],
+                'target_brands': {'contemporary': ['Toteme']},
+            }
+        )
+        assert 'trending oversized blazer women' in searched
+        assert not any(q.startswith('cream oversized blazer') for q in searched)
+        assert any('Toteme' in q for q in searched)
+        assert len(searched) == len(set(searched))
+
+
+class TestScoreCandidates:
+
+    def test_products_past_the_rerank_cut_go_to_the_reserve(self, monkeypatch):
+        def fake_rerank(products, vibe_profile):
+            products = products[:shopping.RERANK_MAX]
+            for p in products:
+                p['vibe_score'] = 8
+            return products
+
+        monkeypatch.setattr(shopping, 'rerank_products_with_ai', fake_rerank)
+        products = [{'name': f'sweater {i}', 'retailer': 'Nordstrom', 'product_url': f'https://example.com/{i}'}
+                    for i in range(shopping.RERANK_MAX + 10)]
+        reserve = []
+        scored = shopping.score_candidates(products, {'color_palette': []}, reserve=reserve)
+
+        assert len(scored) == shopping.RERANK_MAX
+        assert [p['name'] for p in reserve] == [f'sweater {i}' for i in range(shopping.RERANK_MAX, shopping.RERANK_MAX + 10)]
+
+
+class TestAsyncSearchBackend:
+
+    @pytest.fixture(autouse=True)
+    def mock_serpapi(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(shopping.search_cache, '_dir', tmp_path)
+        shopping.search_cache.clear()
+        self.requests = []
+
+        def handler(request):
+            self.requests.append(request.url.params['q'])
+            return httpx.Response(200, json={'shopping_results': [{
+                'product_id': request.url.params['q'].replace(' ', '-'),
+                'title': f"Reformation {request.url.params['q']}",
+                'price': '$120.00',
+                'source': 'Nordstrom',
+                'thumbnail': 'https://example.com/a.jpg',
+                'link': 'https://example.com/a',
+            }]})
+
+        monkeypatch.setattr(shopping_async, '_client', httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+        monkeypatch.setattr(shopping_async, '_semaphore', None)
+        yield
+        shopping.search_cache.clear()
+
+    def test_returns_same_product_shape_as_threaded_path(self):
+        results = shopping_async.search_queries_async(['silk blouse women', 'linen trousers'], num_results=20)
+        product = results['silk blouse women'][0]
+        assert product['id'] == 'gshop_silk-blouse-women'
+        assert product['price'] == 120.0
+        assert product['retailer'] == 'Nordstrom'
+        assert product['match_reason'] == 'silk blouse women'
+        assert sorted(self.requests) == ['linen trousers', 'silk blouse women']
+
+    def test_results_are_cached(self):
+        shopping_async.search_queries_async(['silk blouse women'])
+        shopping_async.search_queries_async(['Silk  Blouse women'])
+        assert self.requests == ['silk blouse women']
+
+    def test_timed_out_coroutines_are_cancelled(self):
+        cancelled = threading.Event()
+
+        async def slow_search():
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        with pytest.raises(concurrent.futures.TimeoutError):
+            run_coroutine(slow_search(), timeout=0.05)
+        assert cancelled.wait(1)
+
+    def test_slow_query_times_out_alone(self, monkeypatch):
+        fetch = shopping_async._fetch_shopping_results
+
+        async def slow_fetch(params):
+            if params['q'] == 'wool coat':
+                await asyncio.sleep(5)
+            return await fetch(params)
+
+        monkeypatch.setattr(Config, 'SEARCH_TIMEOUT', 0.05)
+        monkeypatch.setattr(shopping_async, '_fetch_shopping_results', slow_fetch)
+        results = list(shopping_async.iter_search_queries_async(['wool coat', 'silk blouse women']))
+
+        # The finished query comes first and keeps its products
+        assert results[0][0] == 'silk blouse women' and len(results[0][1]) == 1
+        assert results[1] == ('wool coat', [])
+
+    def test_fetch_candidates_with_async_backend(self, monkeypatch):
+        monkeypatch.setattr(Config, 'SEARCH_BACKEND', 'async')
+        candidates = shopping.fetch_candidates(['silk blouse women', 'wool coat'])
+        assert {p['match_reason'] for p in candidates} == {'trending silk blouse women', 'trending wool coat'}
@@ -0,0 +1,97 @@
+import pytest
+import sys
+import os
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services import trends, trend_analytics
+from services.trend_analytics import analyze_series, peak_label
+
+
+def scalar_change(data):
+    """The per-series arithmetic get_trend_summary used before vectorizing."""
+    current, previous = data[-1], data[0]
+    if previous > 0:
+        return ((current - previous) / previous) * 100
+    return 100 if current > 0 else 0
+
+
+def random_series(rng, length=90):
+    return [rng.randint(0, 100) for _ in range(length)]
+
+
+class TestAnalyzeSeries:
+
+    def test_matches_scalar_metrics(self):
+        rng = random.Random(7)
+        batch = [random_series(rng) for _ in range(30)] + [[0, 0, 5], [40, 20], [0, 0]]
+
+        for data, metrics in zip(batch, analyze_series(batch)):
+            change_pct = scalar_change(data)
+            assert metrics['change_pct'] == change_pct
+            assert metrics['change'] == (f"+{int(change_pct)}%" if change_pct >= 0 else f"{int(change_pct)}%")
+            assert metrics['peak_index'] == data.index(max(data))
+            assert metrics['current'] == data[-1]
+
+    def test_batch_results_equal_single_results(self):
+        rng = random.Random(11)
+        batch = [random_series(rng, length) for length in (90, 90, 12, 5, 90, 12)]
+        together = analyze_series(batch)
+        alone = [analyze_series([data])[0] for data in batch]
+        assert together == alone
+
+    def test_slope_and_ewma(self):
+        rising, flat = analyze_series([[0, 10, 20, 30], [50, 50, 50, 50]])
+        assert rising['slope'] == 10.0
+        assert rising['direction'] == 'rising'
+        assert flat['slope'] == 0.0
+        assert flat['ewma'] == 50.0
+        # y = 0, 2.5, 6.875, 12.66 with alpha 2 / (7 + 1)
+        assert rising['ewma'] == 12.7
+
+    def test_sparkline_keeps_spikes(self):
+        data = [10] * 90
+        data[47] = 100
+        data[12] = 0
+        sparkline = analyze_series([data])[0]['sparkline']
+        assert len(sparkline) == trend_analytics.SPARKLINE_POINTS
+        assert 100 in sparkline and 0 in sparkline
+        # Stride sampling (every 9th point) would have missed both
+        assert 100 not in data[::9] and 0 not in data[::9]
+
+    def test_short_series_sparkline_is_the_series(self):
+        assert analyze_series([[1, 2, 3]])[0]['sparkline'] == [1, 2, 3]
+
+    def test_too_short_series_rejected(self):
+        with pytest.raises(ValueError):
+            analyze_series([[5]])
+
+    def test_peak_label(self):
+        assert peak_label(89, 90) == 'now'
+        assert peak_label(85, 90) == 'this week'
+        assert peak_label(80, 90) == '1 week ago'
+        assert peak_label(40, 90) == '1 month ago'
+        assert peak_label(0, 90) == '3 months ago'
+
+
+class TestTrendSummaries:
+
+    def test_batch_summaries_match_single_summaries(self, monkeypatch):
+        rng = random.Random(3)
+        data = {kw: random_series(rng) for kw in ('boho style', 'y2k style', 'grunge style')}
+
+        def fake_find(keywords):
+            for kw in keywords:
+                if kw in data:
+                    return kw, {'keyword': kw, 'data': data[kw], 'dates': []}
+            return None, None
+
+        monkeypatch.setattr(trends, 'find_trend_data', fake_find)
+        keywords = ['Boho', 'Y2K', 'Lunar', 'Grunge', 'Boho']
+        batch = trends.get_trend_summaries(keywords)
+
+        assert [s['keyword'] for s in batch] == keywords
+        assert batch == [trends.get_trend_summary(kw) for kw in keywords]
+        assert batch[2]['direction'] == 'unknown'
+        assert batch[0]['searched_term'] == 'boho style'
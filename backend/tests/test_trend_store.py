@@ -0,0 +1,139 @@
+import pytest
+import sys
+import os
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services import trends, trend_cache, trend_store, trend_table
+
+
+@pytest.fixture(autouse=True)
+def isolated_store(tmp_path, monkeypatch):
+    """Point the store (and trend cache) at a temp dir and start each test empty."""
+    monkeypatch.setattr(trend_store.Config, 'TREND_STORE_DIR', str(tmp_path / 'store'))
+    monkeypatch.setattr(trend_cache._cache, '_dir', tmp_path / 'trends')
+    trend_cache.clear_cache()
+    trend_table.clear()
+    trend_store.clear()
+    yield tmp_path / 'store'
+    trend_store.clear()
+    trend_cache.clear_cache()
+
+
+def days_ago(n_days, count):
+    """ISO dates for `count` consecutive days ending n_days ago."""
+    end = date.today() - timedelta(days=n_days)
+    return [(end - timedelta(days=count - 1 - i)).isoformat() for i in range(count)]
+
+
+class TestIngest:
+
+    def test_round_trip_rescales_window_to_100(self):
+        trend_store.ingest('Boho', days_ago(0, 4), [10, 20, 40, 50])
+        stored = trend_store.read_series('boho')
+        assert stored['data'] == [20, 40, 80, 100]
+        assert stored['dates'] == days_ago(0, 4)
+        assert stored['source'] == 'store'
+        assert trend_store.read_series('y2k') is None
+
+    def test_incremental_append_is_stitched_onto_existing_scale(self):
+        trend_store.ingest('boho', days_ago(2, 4), [10, 20, 30, 40])
+        # A newer window on its own scale (doubled), overlapping two days
+        trend_store.ingest('boho', days_ago(0, 4), [60, 80, 100, 100])
+
+        stored = trend_store.read_series('boho')
+        assert stored['dates'] == days_ago(0, 6)
+        # Rescaled by 70 / 140 before appending: ..., 30, 40, 50, 50
+        assert stored['data'] == [20, 40, 60, 80, 100, 100]
+
+    def test_rows_and_days_grow(self):
+        trend_store.ingest('boho', days_ago(0, 3), [1, 2, 3])
+        trend_store.ingest('y2k', days_ago(0, 3), [3, 2, 1])
+        # Older history than anything stored moves the start back
+        trend_store.ingest('grunge', days_ago(500, 2), [5, 5])
+
+        assert trend_store.read_series('boho')['data'] == [33, 67, 100]
+        assert trend_store.read_series('y2k')['data'] == [100, 67, 33]
+        assert trend_store.last_date('grunge') == date.today() - timedelta(days=500)
+        # Too old to serve
+        assert trend_store.read_series('grunge') is None
+        assert trend_store.store_stats()['keywords'] == 3
+
+    def test_regrow_writes_a_new_generation(self, tmp_path):
+        trend_store.ingest('boho', days_ago(0, 3), [1, 2, 3])
+        index, matrix = trend_store._current_view()
+        trend_store.ingest('grunge', days_ago(500, 2), [5, 5])
+
+        files = sorted(p.name for p in (tmp_path / 'store').glob('series*.f32'))
+        assert files == [trend_store._read_index(tmp_path / 'store')['data']]
+        assert files != [index['data']]
+        # A reader still holding the old index and map sees consistent rows
+        entry = index['keywords']['boho']
+        assert list(matrix[entry['row'], entry['last'] - 2:entry['last'] + 1]) == [1, 2, 3]
+        assert trend_store.read_series('boho')['data'] == [33, 67, 100]
+
+    def test_file_not_matching_the_index_is_not_mapped(self, tmp_path):
+        trend_store.ingest('boho', days_ago(0, 3), [1, 2, 3])
+        index = trend_store._read_index(tmp_path / 'store')
+        index['days'] += 7
+        with pytest.raises(ValueError):
+            trend_store._open_matrix(tmp_path / 'store', index, 'r')
+
+    def test_window_is_limited_to_recent_days(self):
+        trend_store.ingest('boho', days_ago(0, 200), list(range(200)))
+        stored = trend_store.read_series('boho')
+        assert len(stored['data']) == trend_store.WINDOW_DAYS
+        assert stored['data'][-1] == 100
+
+    def test_ingest_csv_export(self):
+        dates = days_ago(0, 3)
+        export = (
+            "Category: All categories\n\n"
+            "Day,quiet luxury: (United States),mob wife: (United States)\n"
+            f"{dates[0]},50,<1\n{dates[1]},75,10\n{dates[2]},100,20\n"
+        )
+        assert trend_store.ingest_csv(export) == {'quiet luxury': 3, 'mob wife': 3}
+        assert trend_store.read_series('quiet luxury')['data'] == [50, 75, 100]
+        assert trend_store.read_series('mob wife')['data'] == [2, 50, 100]
+
+        with pytest.raises(ValueError):
+            trend_store.ingest_csv("not,a,trends,export\n")
+
+
+class TestStoreFirst:
+
+    def test_summary_reads_store_without_upstream(self, monkeypatch):
+        def no_network(keywords, timeframe=None):
+            raise AssertionError('live Google Trends call')
+
+        monkeypatch.setattr(trends, '_fetch_trend_batch', no_network)
+        trend_store.ingest('boho style', days_ago(0, 30), [20] * 29 + [60])
+
+        summary = trends.get_trend_summary('Boho Dream', {'primary': 'boho'})
+        assert summary['searched_term'] == 'boho style'
+        assert summary['direction'] == 'rising'
+
+    def test_refresh_fetches_one_month_once_stored(self, monkeypatch):
+        timeframes = []
+
+        def fake_batch(keywords, timeframe=trends.TIMEFRAME_3M):
+            timeframes.append(timeframe)
+            count = 90 if timeframe == trends.TIMEFRAME_3M else 30
+            return {kw: {'keyword': kw, 'data': [50] * count, 'dates': days_ago(0, count)} for kw in keywords}
+
+        monkeypatch.setattr(trends, '_fetch_trend_batch', fake_batch)
+        assert len(trends.refresh_stored_trend('boho')['data']) == 90
+        assert len(trends.refresh_stored_trend('boho')['data']) == 90
+        assert timeframes == [trends.TIMEFRAME_3M, trends.TIMEFRAME_1M]
+
+    def test_failed_refresh_raises_instead_of_returning_stored_history(self, monkeypatch):
+        trend_store.ingest('boho', days_ago(0, 30), [50] * 30)
+
+        def failing_batch(keywords, timeframe=trends.TIMEFRAME_3M):
+            return {kw: {'keyword': kw, 'data': [], 'error': 'unavailable'} for kw in keywords}
+
+        monkeypatch.setattr(trends, '_fetch_trend_batch', failing_batch)
+        with pytest.raises(trend_cache.TrendUnavailable):
+            trends.refresh_stored_trend('boho')
+        assert len(trend_store.read_series('boho')['data']) == 30
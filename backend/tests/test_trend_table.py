@@ -0,0 +1,141 @@
+import pytest
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services import trends, trend_cache, trend_table
+
+
+@pytest.fixture(autouse=True)
+def isolated_table(tmp_path, monkeypatch):
+    """Point the table and trend cache at a temp dir and start each test empty."""
+    monkeypatch.setattr(trend_table.Config, 'TREND_TABLE_PATH', str(tmp_path / 'trend_table.json'))
+    monkeypatch.setattr(trend_table.Config, 'TREND_TABLE_PACE', 0)
+    monkeypatch.setattr(trend_table.Config, 'TREND_STORE_DIR', str(tmp_path / 'store'))
+    monkeypatch.setattr(trend_cache._cache, '_dir', tmp_path / 'trends')
+    trend_cache.clear_cache()
+    trend_table.clear()
+    yield tmp_path
+    trend_table.stop()
+    trend_table.clear()
+    trend_cache.clear_cache()
+
+
+def series(keyword, data=(10, 20, 40)):
+    return {'keyword': keyword, 'data': list(data), 'dates': ['2024-01-01', '2024-01-02', '2024-01-03']}
+
+
+class TestRefresh:
+
+    def test_refresh_builds_table_and_saves_it(self, isolated_table):
+        assert trend_table.is_ready() is False
+        assert trend_table.refresh(['Boho', 'coquette'], series) is True
+
+        assert trend_table.is_ready()
+        assert trend_table.lookup('boho')['data'] == [10, 20, 40]
+        assert trend_table.table_stats()['keywords'] == 2
+
+        # Another worker loads the same table from disk
+        trend_table.clear()
+        assert trend_table.load() is True
+        assert trend_table.is_ready()
+        assert trend_table.lookup('coquette')['keyword'] == 'coquette'
+        assert trend_table.load() is False  # unchanged since
+
+    def test_failed_fetch_keeps_previous_entry(self):
+        trend_table.refresh(['boho', 'y2k'], series)
+
+        def flaky(keyword):
+            if keyword == 'boho':
+                return {'keyword': keyword, 'data': [], 'error': 'unavailable'}
+            return series(keyword, (5, 50))
+
+        assert trend_table.refresh(['boho', 'y2k'], flaky) is True
+        assert trend_table.lookup('boho')['data'] == [10, 20, 40]
+        assert trend_table.lookup('y2k')['data'] == [5, 50]
+        assert trend_table.table_stats()['fetch_failures'] == 1
+
+    def test_throttled_refresh_stops_and_is_not_ready(self, monkeypatch):
+        monkeypatch.setattr(trend_table, 'MAX_CONSECUTIVE_FAILURES', 2)
+        calls = []
+
+        def throttled(keyword):
+            calls.append(keyword)
+            return {'keyword': keyword, 'data': [], 'error': 'unavailable'}
+
+        assert trend_table.refresh(['a', 'b', 'c', 'd'], throttled) is False
+        assert calls == ['a', 'b']
+        assert trend_table.is_ready() is False
+        stats = trend_table.table_stats()
+        assert stats['failed_refreshes'] == 1
+        assert stats['last_error']
+
+    def test_raising_fetch_counts_as_failure(self, monkeypatch):
+        monkeypatch.setattr(trend_table, 'MAX_CONSECUTIVE_FAILURES', 2)
+
+        def raising(keyword):
+            raise trend_cache.TrendUnavailable({'keyword': keyword, 'data': [], 'error': 'unavailable'})
+
+        before = trend_table.table_stats()['fetch_failures']
+        assert trend_table.refresh(['a', 'b', 'c'], raising) is False
+        assert trend_table.table_stats()['fetch_failures'] == before + 2
+        assert trend_table.is_ready() is False
+
+
+class TestLeader:
+
+    def test_only_one_holder_of_the_lock_refreshes(self, isolated_table):
+        assert trend_table._try_lead() is True
+        holder = trend_table._lock_file
+
+        # A second worker (its own open file description) can't take the lock
+        trend_table._lock_file = None
+        assert trend_table._try_lead() is False
+
+        # Until the holder exits
+        holder.close()
+        assert trend_table._try_lead() is True
+        assert trend_table.table_stats()['leader'] is True
+
+
+class TestServedFromTable:
+
+    def test_summary_uses_table_without_live_lookups(self, monkeypatch):
+        def no_network(keywords):
+            raise AssertionError('live Google Trends call')
+
+        monkeypatch.setattr(trends, '_fetch_trend_batch', no_network)
+        trend_table.refresh(['boho style', 'fashion trends'], lambda kw: series(kw, (10, 10, 40)))
+
+        summary = trends.get_trend_summary('Boho Dream', {'primary': 'boho'})
+        assert summary['searched_term'] == 'boho style'
+        assert summary['direction'] == 'rising'
+
+        # Outside the table, the generic fallback answers
+        summary = trends.get_trend_summary('Lunar Punk')
+        assert summary['searched_term'] == 'fashion trends'
+
+    def test_table_miss_falls_through_to_live_lookup(self, monkeypatch):
+        fetched = []
+
+        def fake_batch(keywords, timeframe=None):
+            fetched.extend(keywords)
+            return {kw: {**series(kw, (10, 10, 40)), 'batch_peak': 40} for kw in keywords}
+
+        monkeypatch.setattr(trends, '_fetch_trend_batch', fake_batch)
+        trend_table.refresh(['boho style'], series)
+        assert trend_table.is_ready()
+
+        summaries = trends.get_trend_summaries(['Lunar Punk'])
+        assert summaries[0]['searched_term'] == 'lunar style'
+        assert summaries[0]['direction'] == 'rising'
+        assert 'lunar style' in fetched
+
+    def test_universe_covers_what_vibes_try(self):
+        universe = set(trends.trend_universe())
+        assert 'quiet luxury' in universe
+        assert 'dark academia aesthetic' in universe
+        assert 'french style' in universe
+        assert 'fashion trends' in universe
+        assert len(universe) == len(trends.trend_universe())
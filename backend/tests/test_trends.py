@@ -0,0 +1,246 @@
+import pytest
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services import trends, trend_cache
+
+
+@pytest.fixture(autouse=True)
+def isolated_cache(tmp_path, monkeypatch):
+    """Point the trend cache and store at a temp dir and start each test empty."""
+    monkeypatch.setattr(trend_cache._cache, '_dir', tmp_path / 'trends')
+    monkeypatch.setattr(trend_cache._related_cache, '_dir', tmp_path / 'trend_related')
+    monkeypatch.setattr(trends.Config, 'TREND_STORE_DIR', str(tmp_path / 'store'))
+    trend_cache.clear_cache()
+    yield
+    trend_cache.clear_cache()
+
+
+class TestTrendCache:
+
+    def test_successful_data_is_cached(self, monkeypatch):
+        calls = []
+
+        def fake_fetch(keyword):
+            calls.append(keyword)
+            return {'keyword': keyword, 'data': [10, 20], 'dates': ['2024-01-01', '2024-01-02']}
+
+        monkeypatch.setattr(trends, '_fetch_trend_data', fake_fetch)
+        assert trends.get_trend_data('Quiet Luxury')['data'] == [10, 20]
+        assert trends.get_trend_data('quiet luxury')['data'] == [10, 20]
+        assert calls == ['quiet luxury']
+
+    def test_no_data_is_negatively_cached(self, monkeypatch):
+        calls = []
+
+        def fake_fetch(keyword):
+            calls.append(keyword)
+            return {'keyword': keyword, 'data': [], 'error': 'no_data'}
+
+        monkeypatch.setattr(trends, '_fetch_trend_data', fake_fetch)
+        trends.get_trend_data('obscure vibe')
+        result = trends.get_trend_data('obscure vibe')
+        assert result['error'] == 'no_data'
+        assert len(calls) == 1
+
+    def test_unavailable_is_not_cached(self, monkeypatch):
+        calls = []
+
+        def fake_fetch(keyword):
+            calls.append(keyword)
+            return {'keyword': keyword, 'data': [], 'error': 'unavailable'}
+
+        monkeypatch.setattr(trends, '_fetch_trend_data', fake_fetch)
+        assert trends.get_trend_data('boho')['error'] == 'unavailable'
+        trends.get_trend_data('boho')
+        assert len(calls) == 2
+        assert trend_cache.get_cached('boho') is None
+
+    def test_use_cache_false_bypasses_cache(self, monkeypatch):
+        calls = []
+
+        def fake_fetch(keyword):
+            calls.append(keyword)
+            return {'keyword': keyword, 'data': [1, 2]}
+
+        monkeypatch.setattr(trends, '_fetch_trend_data', fake_fetch)
+        trends.get_trend_data('y2k', use_cache=False)
+        trends.get_trend_data('y2k', use_cache=False)
+        assert len(calls) == 2
+
+
+class FakeTrendReq:
+    """Stands in for pytrends.TrendReq; series are given per keyword on a shared 0-100 scale."""
+
+    instances = 0
+
+    def __init__(self, series=None, fail=False, related=None, **kwargs):
+        FakeTrendReq.instances += 1
+        self.series = series or {}
+        self.related = related or {}
+        self.fail = fail
+        self.payloads = []
+
+    def build_payload(self, keywords, timeframe):
+        self.payloads.append(list(keywords))
+        self.keywords = keywords
+
+    def interest_over_time(self):
+        import pandas as pd
+        if self.fail:
+            raise Exception('429 Too Many Requests')
+        columns = {kw: self.series[kw] for kw in self.keywords if kw in self.series}
+        if not columns:
+            return pd.DataFrame()
+        return pd.DataFrame(columns, index=pd.date_range('2024-01-01', periods=len(next(iter(columns.values())))))
+
+    def related_queries(self):
+        import pandas as pd
+        if self.fail:
+            raise Exception('429 Too Many Requests')
+        return {
+            kw: {kind: pd.DataFrame({'query': queries}) if queries is not None else None
+                 for kind, queries in self.related.get(kw, {'rising': None, 'top': None}).items()}
+            for kw in self.keywords
+        }
+
+
+@pytest.fixture
+def fake_session(monkeypatch):
+    session = FakeTrendReq()
+    monkeypatch.setattr(trends, '_checkout_session', lambda: session)
+    return session
+
+
+class TestTrendBatch:
+
+    def test_variants_share_one_request_and_first_with_data_wins(self, fake_session):
+        fake_session.series = {
+            'boho style': [0, 0, 0],
+            'boho aesthetic': [20, 40, 50],
+            'boho': [80, 90, 100],
+        }
+
+        keyword, data = trends.find_trend_data(['boho style', 'boho aesthetic', 'boho', 'fashion trends'])
+
+        # 'boho style' was dominated, so it is checked alone before 'boho aesthetic' wins
+        assert fake_session.payloads == [['boho style', 'boho aesthetic', 'boho', 'fashion trends'], ['boho style']]
+        assert keyword == 'boho aesthetic'
+        # Rescaled so the keyword's own peak is 100
+        assert data['data'] == [40, 80, 100]
+
+    def test_cached_winner_skips_the_request(self, fake_session):
+        trend_cache.set_cached('boho style', {'keyword': 'boho style', 'data': [], 'error': 'no_data'})
+        trend_cache.set_cached('boho aesthetic', {'keyword': 'boho aesthetic', 'data': [1, 2]})
+
+        keyword, _ = trends.find_trend_data(['boho style', 'boho aesthetic', 'boho'])
+
+        assert keyword == 'boho aesthetic'
+        assert fake_session.payloads == []
+
+    def test_dwarfed_variants_are_not_negatively_cached(self, fake_session):
+        fake_session.series = {'huge trend': [90, 100], 'tiny trend': [0, 0]}
+        trends.find_trend_data(['huge trend', 'tiny trend'])
+        assert trend_cache.get_cached('tiny trend') is None
+        assert trend_cache.get_cached('huge trend')['data'] == [90, 100]
+        assert fake_session.payloads == [['huge trend', 'tiny trend']]
+
+    def test_dominated_variants_are_refetched_in_one_request(self, fake_session, monkeypatch):
+        fake_session.series = {'a trend': [0, 0], 'b trend': [0, 0], 'huge trend': [90, 100]}
+        real_fetch = trends._fetch_trend_batch
+
+        def fetch(keywords):
+            if keywords == ['a trend', 'b trend']:
+                fake_session.series = {'a trend': [0, 0], 'b trend': [5, 10]}
+            return real_fetch(keywords)
+
+        monkeypatch.setattr(trends, '_fetch_trend_batch', fetch)
+        keyword, data = trends.find_trend_data(['a trend', 'b trend', 'huge trend'])
+
+        assert keyword == 'b trend'
+        assert data['data'] == [50, 100]
+        # The re-check leaves out the variant that dwarfed them
+        assert fake_session.payloads == [['a trend', 'b trend', 'huge trend'], ['a trend', 'b trend']]
+
+    def test_dominated_preferred_variant_is_refetched_alone(self, fake_session, monkeypatch):
+        fake_session.series = {'tiny trend': [0, 0], 'huge trend': [90, 100]}
+        real_fetch = trends._fetch_trend_batch
+
+        def fetch(keywords):
+            if keywords == ['tiny trend']:
+                fake_session.series = {'tiny trend': [5, 10]}
+            return real_fetch(keywords)
+
+        monkeypatch.setattr(trends, '_fetch_trend_batch', fetch)
+        keyword, data = trends.find_trend_data(['tiny trend', 'huge trend'])
+
+        assert keyword == 'tiny trend'
+        assert data['data'] == [50, 100]
+        assert fake_session.payloads[-1] == ['tiny trend']
+
+    def test_low_resolution_winner_is_refetched_alone(self, fake_session, monkeypatch):
+        fake_session.series = {'quiet luxury': [1, 2, 3], 'fashion trends': [100, 100, 100]}
+        solo = {'quiet luxury': [30, 60, 100]}
+        real_fetch = trends._fetch_trend_batch
+
+        def fetch(keywords):
+            if len(keywords) == 1:
+                fake_session.series = solo
+            return real_fetch(keywords)
+
+        monkeypatch.setattr(trends, '_fetch_trend_batch', fetch)
+        keyword, data = trends.find_trend_data(['quiet luxury', 'fashion trends'])
+
+        assert keyword == 'quiet luxury'
+        assert data['data'] == [30, 60, 100]
+        assert fake_session.payloads[-1] == ['quiet luxury']
+
+    def test_failed_request_is_unavailable_and_drops_the_session(self, monkeypatch):
+        import pytrends.request
+        FakeTrendReq.instances = 0
+        monkeypatch.setattr(pytrends.request, 'TrendReq', lambda **kwargs: FakeTrendReq(fail=True))
+        monkeypatch.setattr(trends, '_sessions', trends.queue.LifoQueue())
+
+        assert trends.find_trend_data(['boho']) == (None, None)
+        assert trends.get_trend_data('boho')['error'] == 'unavailable'
+        assert FakeTrendReq.instances == 2
+        assert trends._sessions.empty()
+
+    def test_sessions_are_reused(self, monkeypatch):
+        import pytrends.request
+        FakeTrendReq.instances = 0
+        monkeypatch.setattr(pytrends.request, 'TrendReq', lambda **kwargs: FakeTrendReq(series={'boho': [1, 2]}))
+        monkeypatch.setattr(trends, '_sessions', trends.queue.LifoQueue())
+
+        trends.get_trend_data('boho', use_cache=False)
+        trends.get_trend_data('boho', use_cache=False)
+
+        assert FakeTrendReq.instances == 1
+
+
+class TestRelatedQueries:
+
+    def test_batches_keywords_and_caches(self, fake_session, monkeypatch):
+        monkeypatch.setattr(trends.Config, 'TREND_BATCH_SIZE', 2)
+        fake_session.related = {
+            'boho': {'rising': ['Boho Wedding', 'boho'], 'top': ['boho dress', 'boho wedding']},
+            'y2k': {'rising': None, 'top': ['y2k outfits']},
+        }
+
+        related = trends.get_related_batch(['Boho', 'y2k', 'grunge'])
+
+        assert fake_session.payloads == [['boho', 'y2k'], ['grunge']]
+        assert related == {'boho': ['boho wedding', 'boho dress'], 'y2k': ['y2k outfits'], 'grunge': []}
+        # Served from the cache (empty results too) from now on
+        assert trends.get_related_queries('boho') == ['boho wedding', 'boho dress']
+        assert trends.get_related_queries('grunge') == []
+        assert len(fake_session.payloads) == 2
+
+    def test_failure_is_empty_and_not_cached(self, fake_session):
+        fake_session.fail = True
+        assert trends.get_related_queries('boho') == []
+        fake_session.fail = False
+        fake_session.related = {'boho': {'rising': ['boho chic'], 'top': None}}
+        assert trends.get_related_queries('boho') == ['boho chic']
@@ -5,6 +5,10 @@ import os
 # Add parent directory to path so we can import our modules
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+import base64
+import hashlib
+
+from utils import validation
 from utils.validation import validate_moodcheck_request, validate_image, extract_image_data
 
 # A tiny valid PNG image in base64 (1x1 transparent pixel)
@@ -85,6 +89,12 @@ class TestValidateMoodcheckRequest:
         assert is_valid is False
         assert "'images' must be an array" in errors
 
+    def test_decoded_images_align_with_request(self):
+        decoded = []
+        is_valid, _ = validate_moodcheck_request({"images": [VALID_IMAGE] * 2}, decoded)
+        assert is_valid is True
+        assert len(decoded) == 2
+
 
 class TestValidateImage:
 
@@ -113,6 +123,47 @@ class TestValidateImage:
         errors = validate_image("data:image/png;base64,not-valid-base64!!!", 1)
         assert "Image 1 has invalid base64 encoding" in errors
 
+    def test_rejects_mismatched_magic_bytes(self):
+        gif = "data:image/png;base64," + base64.b64encode(b"GIF89a" + b"\x00" * 64).decode()
+        assert "Image 1 must be JPEG, PNG, or WEBP format" in validate_image(gif, 1)
+
+    def test_accepts_webp_magic_bytes(self):
+        webp = "data:image/webp;base64," + base64.b64encode(b"RIFF\x24\x00\x00\x00WEBPVP8 " + b"\x00" * 32).decode()
+        assert validate_image(webp, 1) == []
+
+    def test_size_limit_checked_before_decoding(self, monkeypatch):
+        monkeypatch.setattr(validation, 'decode_base64_payload', lambda *args: pytest.fail('decoded'))
+        oversized = "data:image/png;base64," + "A" * (7 * 1024 * 1024)
+        assert "Image 1 exceeds 5MB limit" in validate_image(oversized, 1)
+
+    def test_decoded_bytes_and_hash_are_handed_on(self, monkeypatch):
+        # Small chunks so the payload is decoded in several steps
+        monkeypatch.setattr(validation, 'DECODE_CHUNK', 8)
+        raw = base64.b64decode(VALID_IMAGE.split(',')[1])
+        decoded = []
+        assert validate_image(VALID_IMAGE, 1, decoded) == []
+        assert decoded[0].data == raw
+        assert isinstance(decoded[0].data, bytes)
+        assert decoded[0].sha256 == hashlib.sha256(raw).hexdigest()
+        assert decoded[0].media_type == "image/png"
+
+    def test_truncated_base64(self):
+        errors = validate_image(VALID_IMAGE[:-3], 1)
+        assert "Image 1 has invalid base64 encoding" in errors
+
+    @pytest.mark.parametrize('chunk', [8, validation.DECODE_CHUNK])
+    def test_unpadded_and_line_wrapped_base64(self, monkeypatch, chunk):
+        monkeypatch.setattr(validation, 'DECODE_CHUNK', chunk)
+        header, payload = VALID_IMAGE.split(',')
+        raw = base64.b64decode(payload)
+        unpadded = payload.rstrip('=')
+        wrapped = '\n'.join(payload[i:i + 76] for i in range(0, len(payload), 76))
+
+        for image in (f"{header},{unpadded}", f"{header},{wrapped}\n", f"{header},\r\n{unpadded}"):
+            decoded = []
+            assert validate_image(image, 1, decoded) == []
+            assert decoded[0].data == raw
+
 
 class TestExtractImageData:
 
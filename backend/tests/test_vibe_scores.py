@@ -0,0 +1,135 @@
+import pytest
+import sys
+import os
+import json
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services import shopping, vibe_scores
+from services.pipeline import build_vibe
+
+MOOD_PROFILE = {
+    'name': 'Quiet Luxury',
+    'mood': 'understated, polished',
+    'style_archetype': {'primary': 'minimalist', 'secondary': 'classic'},
+    'color_palette': [{'name': 'Camel', 'hex': '#C19A6B'}, {'name': 'Ivory', 'hex': '#FFFFF0'}],
+    'key_pieces': ['cashmere sweater'],
+    'textures': ['cashmere'],
+    'search_queries': ['cashmere sweater'],
+}
+
+
+def product(pid):
+    return {
+        'id': pid,
+        'product_url': f'https://shop.example/{pid}',
+        'image_url': f'https://img.example/{pid}.jpg',
+        'name': f'Cashmere Sweater {pid}',
+        'brand': 'Toteme',
+        'price': 300,
+    }
+
+
+class FakeOpenAI:
+    """Scores every image (or listed product) 8 and records what was sent."""
+
+    def __init__(self):
+        self.calls = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, model, messages, **kwargs):
+        content = messages[0]['content']
+        if isinstance(content, list):
+            count = sum(1 for part in content if part['type'] == 'image_url')
+            scores = [{'index': i + 1, 'score': 8} for i in range(count)]
+        else:
+            count = content.count('"brand"')
+            scores = [{'index': i, 'score': 8} for i in range(count)]
+        self.calls.append((model, count))
+        message = SimpleNamespace(content=json.dumps(scores))
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+@pytest.fixture
+def fake_openai(monkeypatch, tmp_path):
+    monkeypatch.setattr(vibe_scores._cache, '_dir', tmp_path)
+    vibe_scores.clear_scores()
+    fake = FakeOpenAI()
+    monkeypatch.setattr(shopping, 'client', fake)
+    yield fake
+    vibe_scores.clear_scores()
+
+
+class TestVibeFingerprint:
+
+    def test_client_vibe_matches_full_profile(self):
+        assert vibe_scores.vibe_fingerprint(build_vibe(MOOD_PROFILE)) == vibe_scores.vibe_fingerprint(MOOD_PROFILE)
+
+    def test_palette_changes_fingerprint(self):
+        other = dict(MOOD_PROFILE, color_palette=[{'name': 'Black', 'hex': '#000000'}])
+        assert vibe_scores.vibe_fingerprint(other) != vibe_scores.vibe_fingerprint(MOOD_PROFILE)
+
+
+class TestStoredScores:
+
+    def test_visual_rerank_only_sends_unscored_products(self, fake_openai):
+        first = [product(str(i)) for i in range(5)]
+        shopping.rerank_products_with_ai(first, MOOD_PROFILE)
+        assert fake_openai.calls == [('gpt-4o', 5)]
+
+        # Three seen products plus two new ones
+        second = [product(str(i)) for i in range(3, 8)]
+        ranked = shopping.rerank_products_with_ai(second, build_vibe(MOOD_PROFILE))
+        assert fake_openai.calls[-1] == ('gpt-4o', 3)
+        assert len(ranked) == 5
+        assert all(p['vibe_score'] == 8 and p['visual_scored'] for p in ranked)
+
+    def test_fully_scored_batch_skips_model(self, fake_openai):
+        products = [product(str(i)) for i in range(3)]
+        shopping.rerank_products_with_ai(products, MOOD_PROFILE)
+        shopping.rerank_products_with_ai([product(str(i)) for i in range(3)], MOOD_PROFILE)
+        assert len(fake_openai.calls) == 1
+
+    def test_text_scores_do_not_satisfy_visual_rerank(self, fake_openai):
+        products = [product(str(i)) for i in range(3)]
+        shopping._rerank_text_only(products, MOOD_PROFILE)
+        shopping.rerank_products_with_ai([product(str(i)) for i in range(3)], MOOD_PROFILE)
+        assert [model for model, _ in fake_openai.calls] == ['gpt-4o-mini', 'gpt-4o']
+
+        # ...but the text re-ranker accepts either
+        shopping._rerank_text_only([product(str(i)) for i in range(3)], MOOD_PROFILE)
+        assert len(fake_openai.calls) == 2
+
+
+class TestChunkedRerank:
+
+    def test_visual_chunks_and_text_tier(self, fake_openai, monkeypatch):
+        monkeypatch.setattr(shopping.Config, 'RERANK_VISUAL_LIMIT', 6)
+        monkeypatch.setattr(shopping.Config, 'RERANK_CHUNK_SIZE', 4)
+        products = [product(str(i)) for i in range(10)]
+
+        ranked = shopping.rerank_products_with_ai(products, MOOD_PROFILE)
+
+        assert sorted(fake_openai.calls) == [('gpt-4o', 2), ('gpt-4o', 4), ('gpt-4o-mini', 4)]
+        # Equal scores keep the original order
+        assert [p['id'] for p in ranked] == [str(i) for i in range(10)]
+        assert [p['visual_scored'] for p in ranked] == [True] * 6 + [False] * 4
+
+    def test_failed_chunk_falls_back_to_text(self, fake_openai, monkeypatch):
+        monkeypatch.setattr(shopping.Config, 'RERANK_CHUNK_SIZE', 2)
+        create = fake_openai.create
+
+        def flaky_create(model, messages, **kwargs):
+            content = messages[0]['content']
+            if isinstance(content, list) and any('/0.jpg' in str(part) for part in content):
+                raise RuntimeError('rate limited')
+            return create(model, messages, **kwargs)
+
+        monkeypatch.setattr(fake_openai.chat.completions, 'create', flaky_create)
+        products = [product(str(i)) for i in range(4)]
+
+        ranked = shopping.rerank_products_with_ai(products, MOOD_PROFILE)
+
+        assert [p['id'] for p in ranked] == ['0', '1', '2', '3']
+        assert [p['visual_scored'] for p in ranked] == [False, False, True, True]
@@ -1,10 +1,18 @@
 import pytest
 import sys
 import os
+import json
+from types import SimpleNamespace
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from services import vision
 from services.vision import clean_json_response, MOOD_EXTRACTION_PROMPT_WITH_IMAGES, MOOD_EXTRACTION_PROMPT_TEXT_ONLY
+from services.vision import dedupe_images, mood_cache_key
+
+# 1x1 PNGs that differ only in pixel data
+IMAGE_A = "data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNk+M9QDwADhgGAWjR9awAAAABJRU5ErkJggg=="
+IMAGE_B = "data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mP8z8BQDwAEhQGAhKmMIQAAAABJRU5ErkJggg=="
 
 class TestCleanJsonResponse:
 
@@ -47,3 +55,66 @@ class TestMoodExtractionPrompt:
         """Verify both prompts have a placeholder for user input."""
         assert '{user_prompt}' in MOOD_EXTRACTION_PROMPT_WITH_IMAGES
         assert '{user_prompt}' in MOOD_EXTRACTION_PROMPT_TEXT_ONLY
+
+
+class TestMoodCache:
+
+    def test_dedupe_images(self):
+        unique, digests = dedupe_images([IMAGE_A, IMAGE_B, IMAGE_A])
+        assert unique == [IMAGE_A, IMAGE_B]
+        assert len(digests) == 2
+
+    def test_dedupe_uses_validation_hashes(self):
+        from utils.validation import validate_moodcheck_request
+        decoded = []
+        validate_moodcheck_request({"images": [IMAGE_A, IMAGE_B, IMAGE_A]}, decoded)
+        assert dedupe_images([IMAGE_A, IMAGE_B, IMAGE_A], decoded) == dedupe_images([IMAGE_A, IMAGE_B, IMAGE_A])
+
+    def test_cache_key_ignores_order_and_prompt_formatting(self):
+        _, digests = dedupe_images([IMAGE_A, IMAGE_B])
+        key = mood_cache_key(digests, "Casual  Summer", "summer")
+        assert key == mood_cache_key(list(reversed(digests)), "casual summer ", "summer")
+        assert key != mood_cache_key(digests, "casual summer", "fall")
+        assert key != mood_cache_key(digests[:1], "casual summer", "summer")
+
+    def test_extract_mood_uses_cache(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(vision.mood_cache, '_dir', tmp_path)
+        vision.mood_cache.clear()
+        calls = []
+
+        def fake_extract(images, prompt, season, decoded=None):
+            calls.append(len(images))
+            return {'name': 'Test Vibe'}
+
+        monkeypatch.setattr(vision, '_extract_mood_uncached', fake_extract)
+        assert vision.extract_mood([IMAGE_A, IMAGE_A], 'boho')['name'] == 'Test Vibe'
+        assert vision.extract_mood([IMAGE_A], ' Boho')['name'] == 'Test Vibe'
+        assert calls == [1]
+        vision.mood_cache.clear()
+
+
+class TestStreamingExtraction:
+
+    def test_fields_reported_while_streaming(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(vision.mood_cache, '_dir', tmp_path)
+        vision.mood_cache.clear()
+        profile = {
+            'name': 'Coastal', 'mood': 'breezy', 'color_palette': [], 'key_pieces': [],
+            'target_brands': {}, 'search_queries': ['linen shirt women'], 'textures': [], 'avoid': []
+        }
+        text = json.dumps(profile)
+        chunks = [
+            SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text[i:i + 7]))])
+            for i in range(0, len(text), 7)
+        ]
+        monkeypatch.setattr(vision.client.chat.completions, 'create', lambda **kwargs: iter(chunks))
+
+        seen = []
+        result = vision.extract_mood([], 'coastal', on_field=lambda name, value: seen.append(name))
+
+        assert result['name'] == 'Coastal'
+        assert seen[:8] == list(profile.keys())
+        # Fallback fields added after parsing are reported too, exactly once
+        assert 'gender' in seen
+        assert len(seen) == len(set(seen))
+        vision.mood_cache.clear()
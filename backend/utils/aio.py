@@ -0,0 +1,41 @@
+import asyncio
+import concurrent.futures
+import threading
+from typing import Any, Coroutine, Optional
+
+# One long-lived event loop per process, running in a daemon thread, so
+# async clients (and their connection pools) survive across requests.
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_lock = threading.Lock()
+
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    """Return the shared background event loop, starting it on first use."""
+    global _loop
+    with _lock:
+        if _loop is None or _loop.is_closed():
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, name='aio-loop', daemon=True)
+            thread.start()
+            _loop = loop
+        return _loop
+
+
+def run_coroutine(coro: Coroutine, timeout: Optional[float] = None) -> Any:
+    """
+    Run a coroutine on the shared loop from synchronous code and wait for it.
+
+    Args:
+        coro: Coroutine to run
+        timeout: Seconds to wait before raising TimeoutError; the coroutine
+            is cancelled then, so abandoned work doesn't pile up on the loop
+
+    Returns:
+        The coroutine's result
+    """
+    future = asyncio.run_coroutine_threadsafe(coro, get_loop())
+    try:
+        return future.result(timeout)
+    except concurrent.futures.TimeoutError:
+        future.cancel()
+        raise
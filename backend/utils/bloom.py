@@ -0,0 +1,83 @@
+import base64
+import hashlib
+import struct
+import zlib
+from typing import Iterable
+
+# Token header: bit count, hash count
+_HEADER = struct.Struct('>IB')
+# Refuse tokens claiming more bits than this (a token is client-supplied)
+MAX_BITS = 1 << 16
+
+
+class BloomFilter:
+    """
+    Fixed-size set of strings with no false negatives and a small false
+    positive rate.
+
+    Used for "already shown" product keys: its size doesn't grow with the
+    number of keys added, so it can be stored per session or handed to the
+    client as a short token. With the defaults (8192 bits, 6 hashes) about
+    0.2% of lookups are false positives after 600 keys.
+
+    Usage:
+        seen = BloomFilter()
+        seen.update(['id-1', 'id-2'])
+        'id-1' in seen                                 # True
+        'id-1' in BloomFilter.from_token(seen.to_token())  # True
+    """
+
+    def __init__(self, num_bits: int = 8192, num_hashes: int = 6):
+        if num_bits <= 0 or num_bits % 8 or num_bits > MAX_BITS:
+            raise ValueError(f"num_bits must be a positive multiple of 8 up to {MAX_BITS}")
+        if not 0 < num_hashes < 256:
+            raise ValueError("num_hashes must be between 1 and 255")
+        self.num_bits = num_bits
+        self.num_hashes = num_hashes
+        self._bits = bytearray(num_bits // 8)
+
+    def _positions(self, key: str):
+        # Double hashing: position i is h1 + i*h2 (Kirsch & Mitzenmacher)
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        h1, h2 = struct.unpack('>QQ', digest)
+        h2 |= 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def add(self, key: str) -> None:
+        for pos in self._positions(key):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+
+    def update(self, keys: Iterable[str]) -> None:
+        for key in keys:
+            self.add(key)
+
+    def __contains__(self, key: str) -> bool:
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+    def to_token(self) -> str:
+        """URL-safe string form (compressed; short while the filter is sparse)."""
+        raw = _HEADER.pack(self.num_bits, self.num_hashes) + zlib.compress(bytes(self._bits), 9)
+        return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+    @classmethod
+    def from_token(cls, token: str) -> 'BloomFilter':
+        """
+        Rebuild a filter from to_token output.
+
+        Raises:
+            ValueError: If the token is malformed
+        """
+        try:
+            raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+            num_bits, num_hashes = _HEADER.unpack_from(raw)
+            bloom = cls(num_bits, num_hashes)
+            # Bounded decompress: a token can't expand past the filter size
+            decompressor = zlib.decompressobj()
+            bits = decompressor.decompress(raw[_HEADER.size:], len(bloom._bits) + 1)
+        except (ValueError, TypeError, struct.error, zlib.error) as e:
+            raise ValueError(f"Invalid filter token: {e}") from e
+        if len(bits) != len(bloom._bits) or not decompressor.eof:
+            raise ValueError("Invalid filter token: wrong size")
+        bloom._bits[:] = bits
+        return bloom
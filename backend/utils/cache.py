@@ -0,0 +1,435 @@
+import copy
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from config import Config
+from utils.executors import PoolSaturated, get_pool
+
+logger = logging.getLogger(__name__)
+
+# Every TieredCache registers itself here so stats can be reported in one place
+_registry: Dict[str, 'TieredCache'] = {}
+
+# How often (in writes) the disk tier is swept for expired/excess files
+DISK_PRUNE_EVERY = 200
+
+# Disk writes go to a temp file in the cache dir first, then os.replace
+TMP_PREFIX = '.tmp-'
+
+
+class SingleFlight:
+    """
+    Collapse concurrent calls for the same key into a single execution.
+
+    The first caller for a key runs the function; callers arriving while it is
+    in flight block and receive the same result (or exception).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, dict] = {}
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Run fn once per key across concurrent callers.
+
+        Returns:
+            tuple: (result, shared) where shared is True if this caller
+            waited on another caller's execution
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = {'event': threading.Event(), 'result': None, 'error': None}
+                self._calls[key] = call
+
+        if not leader:
+            call['event'].wait()
+            if call['error'] is not None:
+                raise call['error']
+            return call['result'], True
+
+        try:
+            call['result'] = fn()
+        except BaseException as e:
+            call['error'] = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call['event'].set()
+
+        return call['result'], False
+
+
+class TieredCache:
+    """
+    Two-tier TTL cache: a bounded in-process LRU in front of a JSON file store.
+
+    Entries are fresh for ttl seconds. With stale_ttl set, get_or_load keeps
+    serving an expired entry for that much longer while a background reload
+    runs (stale-while-revalidate).
+
+    The disk tier lives under Config.CACHE_DIR/<namespace> and is shared by
+    every worker process on the machine. Files are written to a temp file and
+    atomically renamed, so readers never see a partial entry.
+
+    Values must be JSON-serializable. Reads return deep copies so callers can
+    mutate results freely.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        ttl: int,
+        max_entries: int = 512,
+        stale_ttl: int = 0,
+        refresh_ahead: Optional[float] = None,
+        hot_hits: int = 2,
+        disk: bool = True,
+        max_disk_entries: int = 10000,
+        directory: Optional[str] = None,
+        refresh_pool: Optional[str] = None
+    ):
+        """
+        Args:
+            namespace: Cache name (also the disk subdirectory and stats key)
+            ttl: Seconds an entry stays fresh
+            max_entries: Memory LRU capacity
+            stale_ttl: Seconds past expiry an entry may still be served by
+                get_or_load while it is revalidated in the background
+            refresh_ahead: Fraction of ttl after which a hot entry is reloaded
+                in the background (e.g. 0.8), or None to disable
+            hot_hits: Memory hits an entry needs before refresh-ahead applies
+            disk: Whether to use the shared disk tier
+            max_disk_entries: Soft cap on files kept in the disk tier
+            directory: Override the disk location (defaults to Config.CACHE_DIR)
+            refresh_pool: Shared pool (utils/executors.py) that runs background
+                reloads, or None for a thread per reload
+        """
+        self.namespace = namespace
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.stale_ttl = stale_ttl
+        self.refresh_ahead = refresh_ahead
+        self.hot_hits = hot_hits
+        self.max_disk_entries = max_disk_entries
+        self.refresh_pool = refresh_pool
+
+        base_dir = directory if directory is not None else Config.CACHE_DIR
+        self._dir = Path(base_dir) / namespace if disk and base_dir else None
+
+        self._memory: 'OrderedDict[str, dict]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._flight = SingleFlight()
+        self._refreshing = set()
+        self._writes = 0
+        self._stats = {
+            'hits': 0,
+            'disk_hits': 0,
+            'stale_hits': 0,
+            'misses': 0,
+            'evictions': 0,
+            'refreshes': 0,
+            'coalesced': 0,
+            'load_errors': 0,
+        }
+
+        _registry[namespace] = self
+
+    @staticmethod
+    def make_key(*parts) -> str:
+        """Build a stable key from any JSON-serializable parts."""
+        raw = json.dumps(parts, sort_keys=True, separators=(',', ':'), default=str)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def get(self, key: str, default: Any = None, allow_stale: bool = False) -> Any:
+        """Return a copy of a fresh (or, with allow_stale, still servable) cached value, or default."""
+        entry = self._lookup(key, allow_stale=allow_stale)
+        if entry is None:
+            self._count('misses')
+            return default
+        return copy.deepcopy(entry['value'])
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
+        """Store a value in both tiers."""
+        now = time.time()
+        entry = {
+            'value': value,
+            'stored_at': now,
+            'expires_at': now + (ttl if ttl is not None else self.ttl),
+        }
+        self._remember(key, entry)
+        self._write_disk(key, entry)
+
+    def delete(self, key: str) -> None:
+        """Remove a key from both tiers."""
+        with self._lock:
+            self._memory.pop(key, None)
+        path = self._path(key)
+        if path is not None:
+            try:
+                path.unlink()
+            except OSError:
+                pass
+
+    def clear(self) -> int:
+        """Clear both tiers. Returns number of entries removed."""
+        with self._lock:
+            count = len(self._memory)
+            self._memory.clear()
+
+        if self._dir is not None and self._dir.exists():
+            for cache_file in self._entry_files():
+                try:
+                    cache_file.unlink()
+                    count += 1
+                except OSError:
+                    pass
+
+        return count
+
+    def get_or_load(
+        self,
+        key: str,
+        loader: Callable[[], Any],
+        ttl: Optional[Union[int, Callable[[Any], int]]] = None
+    ) -> Any:
+        """
+        Return the cached value for key, calling loader on a miss.
+
+        Concurrent misses for the same key share one loader call. Stale entries,
+        and hot entries past the refresh-ahead point, are reloaded in the
+        background while the current value is returned. Loader exceptions
+        propagate and nothing is cached.
+
+        Args:
+            key: Cache key
+            loader: Zero-argument function producing the value
+            ttl: Seconds to keep the loaded value, or a function of the value
+                returning seconds (e.g. shorter TTLs for negative results)
+        """
+        entry = self._lookup(key, allow_stale=True)
+        if entry is not None:
+            if entry['expires_at'] <= time.time() or self._should_refresh(entry):
+                self._refresh_in_background(key, loader, ttl)
+            return copy.deepcopy(entry['value'])
+
+        self._count('misses')
+        value, shared = self._flight.do(key, lambda: self._load(key, loader, ttl))
+        if shared:
+            self._count('coalesced')
+        return copy.deepcopy(value)
+
+    def stats(self) -> dict:
+        """Counters and sizing info for this cache."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['size'] = len(self._memory)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 3) if lookups else 0.0
+        stats['max_entries'] = self.max_entries
+        stats['ttl'] = self.ttl
+        stats['disk'] = self._dir is not None
+        return stats
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self._stats[name] += amount
+
+    def _lookup(self, key: str, allow_stale: bool = False) -> Optional[dict]:
+        """
+        Find an entry in memory, then on disk. Counts hits only.
+
+        Expired entries inside the stale window are returned when allow_stale
+        is set; otherwise only fresh entries are.
+        """
+        now = time.time()
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry['expires_at'] + self.stale_ttl <= now:
+                    del self._memory[key]
+                elif entry['expires_at'] > now or allow_stale:
+                    self._memory.move_to_end(key)
+                    entry['hits'] = entry.get('hits', 0) + 1
+                    self._stats['hits'] += 1
+                    if entry['expires_at'] <= now:
+                        self._stats['stale_hits'] += 1
+                    return entry
+
+        entry = self._read_disk(key)
+        if entry is None or entry['expires_at'] + self.stale_ttl <= now:
+            return None
+        if entry['expires_at'] <= now and not allow_stale:
+            return None
+
+        self._remember(key, entry)
+        with self._lock:
+            self._stats['hits'] += 1
+            self._stats['disk_hits'] += 1
+            if entry['expires_at'] <= now:
+                self._stats['stale_hits'] += 1
+        return entry
+
+    def _remember(self, key: str, entry: dict) -> None:
+        """Insert into the memory LRU, evicting the oldest entries."""
+        entry = dict(entry)
+        entry.setdefault('hits', 0)
+        with self._lock:
+            self._memory[key] = entry
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def _load(self, key: str, loader: Callable[[], Any], ttl) -> Any:
+        try:
+            value = loader()
+        except Exception:
+            self._count('load_errors')
+            raise
+        self.set(key, value, ttl(value) if callable(ttl) else ttl)
+        return value
+
+    def _should_refresh(self, entry: dict) -> bool:
+        if not self.refresh_ahead:
+            return False
+        if entry.get('hits', 0) < self.hot_hits:
+            return False
+        lifetime = entry['expires_at'] - entry['stored_at']
+        return time.time() >= entry['stored_at'] + lifetime * self.refresh_ahead
+
+    def _refresh_in_background(self, key: str, loader: Callable[[], Any], ttl) -> None:
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def refresh():
+            self._count('refreshes')
+            try:
+                self._flight.do(key, lambda: self._load(key, loader, ttl))
+            except Exception as e:
+                logger.warning(f"Background refresh failed for {self.namespace}: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        if self.refresh_pool is None:
+            threading.Thread(target=refresh, daemon=True).start()
+            return
+        try:
+            get_pool(self.refresh_pool).submit(refresh)
+        except PoolSaturated:
+            # Refreshes are best effort; the next hit will try again
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def _path(self, key: str) -> Optional[Path]:
+        if self._dir is None:
+            return None
+        return self._dir / f"{key}.json"
+
+    def _read_disk(self, key: str) -> Optional[dict]:
+        path = self._path(key)
+        if path is None or not path.exists():
+            return None
+        try:
+            with open(path, 'r') as f:
+                entry = json.load(f)
+            if 'value' not in entry or 'expires_at' not in entry:
+                raise KeyError('value')
+            return entry
+        except (OSError, ValueError, KeyError):
+            # Corrupted or concurrently removed entry
+            try:
+                path.unlink()
+            except OSError:
+                pass
+            return None
+
+    def _write_disk(self, key: str, entry: dict) -> None:
+        path = self._path(key)
+        if path is None:
+            return
+
+        payload = {k: entry[k] for k in ('value', 'stored_at', 'expires_at')}
+        try:
+            self._dir.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self._dir, prefix=TMP_PREFIX, suffix='.json')
+            try:
+                with os.fdopen(fd, 'w') as f:
+                    json.dump(payload, f)
+                os.replace(tmp_path, path)
+            except BaseException:
+                try:
+                    os.unlink(tmp_path)
+                except OSError:
+                    pass
+                raise
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning(f"Cache write failed for {self.namespace}: {e}")
+            return
+
+        with self._lock:
+            self._writes += 1
+            prune = self._writes % DISK_PRUNE_EVERY == 0
+        if prune:
+            self._prune_disk()
+
+    def _entry_files(self) -> List[Path]:
+        """Disk tier entry files, without other writers' in-progress temp files."""
+        return [p for p in self._dir.glob('*.json') if not p.name.startswith(TMP_PREFIX)]
+
+    def _prune_disk(self) -> None:
+        """Drop expired files and trim the disk tier to max_disk_entries."""
+        now = time.time()
+        files = []
+        for cache_file in self._entry_files():
+            try:
+                mtime = cache_file.stat().st_mtime
+                with open(cache_file, 'r') as f:
+                    expires_at = json.load(f).get('expires_at', 0)
+            except (OSError, ValueError):
+                expires_at = 0
+                mtime = 0
+            if expires_at + self.stale_ttl <= now:
+                try:
+                    cache_file.unlink()
+                except OSError:
+                    pass
+            else:
+                files.append((mtime, cache_file))
+
+        excess = len(files) - self.max_disk_entries
+        if excess > 0:
+            files.sort()
+            for _, cache_file in files[:excess]:
+                try:
+                    cache_file.unlink()
+                except OSError:
+                    pass
+
+
+def cache_stats() -> Dict[str, dict]:
+    """Stats for every cache created in this process, keyed by namespace."""
+    return {name: cache.stats() for name, cache in sorted(_registry.items())}
@@ -0,0 +1,173 @@
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class PoolSaturated(Exception):
+    """A pool's queue is full; the caller should degrade or run the work itself."""
+
+
+class BoundedExecutor:
+    """
+    A named thread pool with a cap on queued (not yet started) tasks.
+
+    Pools act as bulkheads: each upstream gets its own workers, so a slow
+    dependency can only exhaust its own pool. When the queue is full, submit
+    raises PoolSaturated instead of letting work pile up unboundedly.
+
+    Tracks queue wait time, run time and saturation for /api/metrics.
+    """
+
+    def __init__(self, name: str, max_workers: int, max_queue: int):
+        """
+        Args:
+            name: Pool name (also the worker thread name prefix)
+            max_workers: Maximum worker threads
+            max_queue: Maximum tasks waiting for a worker
+        """
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f'pool-{name}')
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._active = 0
+        self._stats = {
+            'submitted': 0,
+            'completed': 0,
+            'failed': 0,
+            'rejected': 0,
+            'peak_queued': 0,
+            'peak_active': 0,
+            'wait_total': 0.0,
+            'wait_max': 0.0,
+            'run_total': 0.0,
+        }
+
+    def submit(self, fn: Callable[..., Any], *args, **kwargs) -> Future:
+        """
+        Schedule fn(*args, **kwargs) on the pool.
+
+        Raises:
+            PoolSaturated: If max_queue tasks are already waiting
+        """
+        with self._lock:
+            if self._queued >= self.max_queue:
+                self._stats['rejected'] += 1
+                raise PoolSaturated(f"{self.name} pool saturated ({self._queued} queued)")
+            self._queued += 1
+            self._stats['submitted'] += 1
+            self._stats['peak_queued'] = max(self._stats['peak_queued'], self._queued)
+
+        enqueued_at = time.perf_counter()
+        started = threading.Event()
+
+        def run():
+            started.set()
+            start = time.perf_counter()
+            wait = start - enqueued_at
+            with self._lock:
+                self._queued -= 1
+                self._active += 1
+                self._stats['peak_active'] = max(self._stats['peak_active'], self._active)
+                self._stats['wait_total'] += wait
+                self._stats['wait_max'] = max(self._stats['wait_max'], wait)
+            failed = False
+            try:
+                return fn(*args, **kwargs)
+            except BaseException:
+                failed = True
+                raise
+            finally:
+                elapsed = time.perf_counter() - start
+                with self._lock:
+                    self._active -= 1
+                    self._stats['completed'] += 1
+                    self._stats['run_total'] += elapsed
+                    if failed:
+                        self._stats['failed'] += 1
+
+        def on_done(future: Future):
+            # Cancelled before a worker picked it up
+            if not started.is_set():
+                with self._lock:
+                    self._queued -= 1
+
+        try:
+            future = self._executor.submit(run)
+        except RuntimeError:
+            with self._lock:
+                self._queued -= 1
+            raise
+        future.add_done_callback(on_done)
+        return future
+
+    def stats(self) -> dict:
+        """Counters, queue depth and timing for this pool."""
+        with self._lock:
+            stats = dict(self._stats)
+            queued = self._queued
+            active = self._active
+        started = stats['submitted'] - stats['rejected'] - queued
+        wait_total = stats.pop('wait_total')
+        run_total = stats.pop('run_total')
+        stats.update({
+            'max_workers': self.max_workers,
+            'max_queue': self.max_queue,
+            'active': active,
+            'queued': queued,
+            'saturation': round(active / self.max_workers, 3),
+            'avg_wait_ms': round(wait_total / started * 1000, 1) if started > 0 else 0.0,
+            'max_wait_ms': round(stats.pop('wait_max') * 1000, 1),
+            'avg_run_ms': round(run_total / stats['completed'] * 1000, 1) if stats['completed'] else 0.0,
+        })
+        return stats
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait, cancel_futures=not wait)
+
+
+# Pool name -> worker count. Work must never block on a task queued in its own
+# pool: 'pipeline' holds per-request coordination (it waits on the others),
+# the rest hold leaf calls to one upstream each.
+def _pool_sizes() -> Dict[str, int]:
+    return {
+        'pipeline': Config.PIPELINE_POOL_SIZE,
+        'serpapi': Config.SERPAPI_POOL_SIZE,
+        'openai': Config.OPENAI_POOL_SIZE,
+        'trends': Config.TRENDS_POOL_SIZE,
+        'images': Config.IMAGES_POOL_SIZE,
+        'cpu': Config.CPU_POOL_SIZE,
+        'jobs': Config.JOBS_POOL_SIZE,
+    }
+
+
+_pools: Dict[str, BoundedExecutor] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(name: str) -> BoundedExecutor:
+    """
+    Return the shared pool with this name, creating it on first use.
+
+    Raises:
+        KeyError: For an unknown pool name
+    """
+    pool = _pools.get(name)
+    if pool is not None:
+        return pool
+    with _pools_lock:
+        if name not in _pools:
+            _pools[name] = BoundedExecutor(name, _pool_sizes()[name], Config.POOL_QUEUE_LIMIT)
+        return _pools[name]
+
+
+def pool_stats() -> Dict[str, dict]:
+    """Stats for every pool created in this process, keyed by name."""
+    return {name: pool.stats() for name, pool in sorted(_pools.items())}
@@ -0,0 +1,177 @@
+import base64
+import io
+import logging
+import math
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from PIL import Image, ImageOps
+
+from config import Config
+from utils.executors import PoolSaturated, get_pool
+
+logger = logging.getLogger(__name__)
+
+# GPT-4o image accounting: 'low' is a flat 85 tokens on a 512px image;
+# 'high' fits the image in 2048x2048, scales the short side to 768 and
+# charges 85 + 170 per 512px tile
+LOW_DETAIL_SIZE = 512
+HIGH_DETAIL_MAX = 2048
+HIGH_DETAIL_SHORT_SIDE = 768
+BASE_TOKENS = 85
+TILE_TOKENS = 170
+TILE_SIZE = 512
+
+# Running totals across requests, reported by /api/metrics
+_stats_lock = threading.Lock()
+_stats = {
+    'images': 0,
+    'bytes_in': 0,
+    'bytes_out': 0,
+    'tokens_before': 0,
+    'tokens_after': 0,
+}
+
+
+def vision_size(width: int, height: int, detail: str) -> Tuple[int, int]:
+    """The resolution the model actually looks at for this detail level."""
+    if detail == 'low':
+        scale = min(1.0, LOW_DETAIL_SIZE / max(width, height))
+    else:
+        scale = min(1.0, HIGH_DETAIL_MAX / max(width, height))
+        short_side = min(width, height) * scale
+        if short_side > HIGH_DETAIL_SHORT_SIDE:
+            scale *= HIGH_DETAIL_SHORT_SIDE / short_side
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def estimate_tokens(width: int, height: int, detail: str) -> int:
+    """Estimated input tokens for one image at the given detail level."""
+    if detail == 'low':
+        return BASE_TOKENS
+    w, h = vision_size(width, height, 'high')
+    return BASE_TOKENS + TILE_TOKENS * math.ceil(w / TILE_SIZE) * math.ceil(h / TILE_SIZE)
+
+
+def choose_detail(width: int, height: int, image_count: int) -> str:
+    """
+    'high' only pays off for a few images with detail to see; a full board
+    of five reads fine at 'low', and small images gain nothing from tiles.
+    """
+    if image_count > Config.VISION_HIGH_DETAIL_MAX_IMAGES:
+        return 'low'
+    if max(width, height) <= LOW_DETAIL_SIZE:
+        return 'low'
+    return 'high'
+
+
+def prepare_image(image: str, image_count: int = 1, raw: Optional[bytes] = None) -> Dict:
+    """
+    Decode a data URI, strip metadata, downscale to what the vision model
+    uses and re-encode as JPEG. The re-encode is always what is sent, so no
+    EXIF/GPS data reaches the model, even when it isn't smaller.
+
+    Args:
+        image: Image data URI (data:image/...;base64,...)
+        image_count: Images on the board (drives the detail choice)
+        raw: The already decoded bytes of image, if the caller has them
+
+    Returns:
+        Dict with 'url' (data URI to send), 'detail', and the byte/token
+        figures before and after
+
+    Raises:
+        ValueError: If the image can't be decoded
+    """
+    try:
+        if raw is None:
+            raw = base64.b64decode(image.partition(';base64,')[2])
+        img = Image.open(io.BytesIO(raw))
+        # Apply the EXIF rotation before the metadata is dropped
+        img = ImageOps.exif_transpose(img)
+        width, height = img.size
+        detail = choose_detail(width, height, image_count)
+        target = vision_size(width, height, detail)
+
+        if img.mode in ('RGBA', 'LA', 'P'):
+            img = img.convert('RGBA')
+            background = Image.new('RGB', img.size, (255, 255, 255))
+            background.paste(img, mask=img.split()[-1])
+            img = background
+        elif img.mode != 'RGB':
+            img = img.convert('RGB')
+        if target != (width, height):
+            img = img.resize(target, Image.LANCZOS)
+
+        out = io.BytesIO()
+        img.save(out, format='JPEG', quality=Config.VISION_JPEG_QUALITY, optimize=True)
+        encoded = out.getvalue()
+    except Exception as e:
+        raise ValueError(f"Image can't be decoded: {e}") from e
+
+    return {
+        'url': 'data:image/jpeg;base64,' + base64.b64encode(encoded).decode('ascii'),
+        'detail': detail,
+        'bytes_in': len(raw),
+        'bytes_out': len(encoded),
+        'tokens_before': estimate_tokens(width, height, 'high'),
+        'tokens_after': estimate_tokens(width, height, detail),
+    }
+
+
+def prepare_images(images: List[str], decoded: Optional[list] = None) -> Tuple[List[Dict], Dict]:
+    """
+    Prepare every image on a board for the vision model, in parallel on the
+    shared 'cpu' pool.
+
+    Args:
+        images: Image data URIs
+        decoded: Optional DecodedImages (or None entries) aligned with images
+
+    Returns:
+        tuple: (prepared, report) where prepared is aligned with images and
+        report totals bytes and estimated tokens before/after
+    """
+    if not images:
+        return [], {}
+
+    count = len(images)
+    raws = [
+        getattr(image, 'data', None)
+        for image in (decoded if decoded is not None and len(decoded) == count else [None] * count)
+    ]
+    futures = []
+    for image, raw in zip(images, raws):
+        try:
+            futures.append(get_pool('cpu').submit(prepare_image, image, count, raw))
+        except PoolSaturated:
+            futures.append(None)
+    prepared = [
+        future.result() if future is not None else prepare_image(image, count, raw)
+        for image, raw, future in zip(images, raws, futures)
+    ]
+
+    report = {
+        'images': count,
+        'bytes_in': sum(p['bytes_in'] for p in prepared),
+        'bytes_out': sum(p['bytes_out'] for p in prepared),
+        'tokens_before': sum(p['tokens_before'] for p in prepared),
+        'tokens_after': sum(p['tokens_after'] for p in prepared),
+    }
+    report['bytes_saved'] = report['bytes_in'] - report['bytes_out']
+    report['tokens_saved'] = report['tokens_before'] - report['tokens_after']
+
+    with _stats_lock:
+        for name in _stats:
+            _stats[name] += report[name]
+
+    return prepared, report
+
+
+def image_prep_stats() -> Dict:
+    """Cumulative preprocessing savings since the process started."""
+    with _stats_lock:
+        stats = dict(_stats)
+    stats['bytes_saved'] = stats['bytes_in'] - stats['bytes_out']
+    stats['tokens_saved'] = stats['tokens_before'] - stats['tokens_after']
+    return stats
@@ -0,0 +1,106 @@
+import json
+from typing import Any, List, Optional, Tuple
+
+
+class IncrementalObjectParser:
+    """
+    Parse a JSON object as it streams in, yielding each top-level field as
+    soon as its value is complete.
+
+    Text before the opening brace (e.g. a markdown code fence) is ignored.
+    Fields whose value doesn't parse on its own are skipped; the caller is
+    expected to parse the full text at the end for validation.
+
+    Usage:
+        parser = IncrementalObjectParser()
+        for chunk in stream:
+            for key, value in parser.feed(chunk):
+                ...
+    """
+
+    def __init__(self):
+        self._buffer = ''
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._started = False
+        self._done = False
+        self._key_start: Optional[int] = None
+        self._key: Optional[str] = None
+        self._value_start: Optional[int] = None
+
+    @property
+    def done(self) -> bool:
+        """True once the top-level object has closed."""
+        return self._done
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        """
+        Add streamed text and return the (key, value) pairs completed by it.
+        """
+        self._buffer += chunk
+        completed = []
+        buffer = self._buffer
+
+        while self._pos < len(buffer) and not self._done:
+            char = buffer[self._pos]
+
+            if not self._started:
+                if char == '{':
+                    self._started = True
+                    self._depth = 1
+                self._pos += 1
+                continue
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == '\\':
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._depth == 1 and self._value_start is None and self._key_start is not None:
+                        key = self._parse(self._key_start, self._pos + 1)
+                        self._key = key if isinstance(key, str) else None
+                        self._key_start = None
+                self._pos += 1
+                continue
+
+            if char == '"':
+                self._in_string = True
+                if self._depth == 1 and self._value_start is None:
+                    self._key_start = self._pos
+            elif char in '{[':
+                self._depth += 1
+            elif char in '}]':
+                self._depth -= 1
+                if self._depth == 0:
+                    self._complete_field(self._pos, completed)
+                    self._done = True
+            elif char == ':' and self._depth == 1 and self._value_start is None:
+                self._value_start = self._pos + 1
+            elif char == ',' and self._depth == 1:
+                self._complete_field(self._pos, completed)
+
+            self._pos += 1
+
+        return completed
+
+    def _complete_field(self, end: int, completed: list) -> None:
+        if self._key is not None and self._value_start is not None:
+            value = self._parse(self._value_start, end)
+            if value is not _INVALID:
+                completed.append((self._key, value))
+        self._key = None
+        self._key_start = None
+        self._value_start = None
+
+    def _parse(self, start: int, end: int) -> Any:
+        try:
+            return json.loads(self._buffer[start:end])
+        except ValueError:
+            return _INVALID
+
+
+_INVALID = object()
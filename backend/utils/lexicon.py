@@ -0,0 +1,84 @@
+import re
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, List, Tuple
+
+# Words are runs of letters/digits; '&' and '+' are kept as tokens so
+# "h&m" and "rag & bone" match as written. Other punctuation separates
+# words, so "J.Crew" and "j crew" are the same phrase.
+_TOKEN_RE = re.compile(r"[a-z0-9]+|[&+]")
+
+# Trie node key marking the end of a term (tokens never contain a space)
+_END = ' '
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase and split text into lexicon tokens."""
+    return _TOKEN_RE.findall(text.lower()) if text else []
+
+
+class Lexicon:
+    """
+    Whole-word phrase matcher over labelled term lists.
+
+    Terms are compiled once into a token trie, so matching a text costs one
+    walk over its tokens regardless of how many terms there are. Matches
+    respect word boundaries: "co" matches "Co Collections" but not "Coach".
+
+    Usage:
+        brands = Lexicon({'blocked': {'shein', 'fashion nova'}})
+        brands.labels('Fashion Nova Ribbed Tank')  # frozenset({'blocked'})
+    """
+
+    def __init__(self, groups: Dict[str, Iterable[str]], cache_size: int = 4096):
+        """
+        Args:
+            groups: Label -> terms carrying that label
+            cache_size: Distinct texts whose labels are memoized (brand and
+                retailer names repeat heavily across a result set)
+        """
+        self._root: dict = {}
+        self.size = 0
+        for label, terms in groups.items():
+            for term in terms:
+                tokens = tokenize(term)
+                if not tokens:
+                    continue
+                node = self._root
+                for token in tokens:
+                    node = node.setdefault(token, {})
+                node.setdefault(_END, []).append((label, term))
+                self.size += 1
+        self.labels = lru_cache(maxsize=cache_size)(self._labels)
+
+    def matches(self, text: str) -> List[Tuple[str, str]]:
+        """
+        All (label, term) pairs found in text, in order of appearance.
+        Overlapping matches are all reported.
+        """
+        tokens = tokenize(text)
+        found = []
+        root = self._root
+        for start in range(len(tokens)):
+            node = root.get(tokens[start])
+            position = start + 1
+            while node is not None:
+                terminal = node.get(_END)
+                if terminal:
+                    found.extend(terminal)
+                if position >= len(tokens):
+                    break
+                node = node.get(tokens[position])
+                position += 1
+        return found
+
+    def _labels(self, text: str) -> FrozenSet[str]:
+        return frozenset(label for label, _ in self.matches(text))
+
+    def classify(self, texts: Iterable[str]) -> List[FrozenSet[str]]:
+        """Labels for each text in a batch."""
+        labels = self.labels
+        return [labels(text or '') for text in texts]
+
+    def terms(self, text: str, label: str) -> List[str]:
+        """Terms with the given label found in text, in order of appearance."""
+        return [term for found_label, term in self.matches(text) if found_label == label]
@@ -0,0 +1,112 @@
+import io
+import json
+import zlib
+
+from werkzeug.exceptions import BadRequest, RequestEntityTooLarge
+from werkzeug.wsgi import get_input_stream
+
+# Content-Encodings we inflate. 'deflate' is the zlib format (RFC 9110);
+# wbits=MAX_WBITS|32 lets zlib detect the gzip or zlib header by itself
+SUPPORTED_ENCODINGS = ('gzip', 'x-gzip', 'deflate')
+_AUTO_WBITS = zlib.MAX_WBITS | 32
+
+# Compressed bytes read from the client per step
+READ_CHUNK = 64 * 1024
+
+
+class DecompressingStream(io.RawIOBase):
+    """
+    File-like view of a gzip/deflate request body that inflates as it is
+    read, so the decompressed body is never held in memory at once.
+
+    Raises RequestEntityTooLarge as soon as more than limit decompressed
+    bytes have been produced (a small compressed body can't expand without
+    bound), and BadRequest if the compressed data is malformed or truncated.
+    """
+
+    def __init__(self, stream, limit: int):
+        self._stream = stream
+        self._limit = limit
+        self._inflater = zlib.decompressobj(_AUTO_WBITS)
+        self._produced = 0
+        self._source_done = False
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        size = len(buffer)
+        if not size:
+            return 0
+
+        data = b''
+        while not data:
+            if self._inflater.unconsumed_tail:
+                compressed = self._inflater.unconsumed_tail
+            elif self._inflater.eof:
+                return 0
+            elif self._source_done:
+                raise BadRequest('Compressed request body is truncated')
+            else:
+                compressed = self._stream.read(READ_CHUNK)
+                if not compressed:
+                    self._source_done = True
+                    continue
+            try:
+                # max_length bounds how much a single step may expand
+                data = self._inflater.decompress(compressed, size)
+            except zlib.error as e:
+                raise BadRequest('Malformed compressed request body') from e
+
+        self._produced += len(data)
+        if self._produced > self._limit:
+            raise RequestEntityTooLarge()
+        buffer[:len(data)] = data
+        return len(data)
+
+
+class DecompressRequestMiddleware:
+    """
+    WSGI middleware that accepts gzip/deflate request bodies.
+
+    A request with Content-Encoding gzip or deflate has its input replaced
+    by a DecompressingStream, so Flask (get_json, multipart parsing) reads
+    the inflated body as if it had been sent uncompressed. Compressed and
+    decompressed sizes are both capped at max_bytes. Other encodings are
+    rejected with 415.
+    """
+
+    def __init__(self, app, max_bytes: int):
+        self.app = app
+        self.max_bytes = max_bytes
+
+    def __call__(self, environ, start_response):
+        encoding = environ.get('HTTP_CONTENT_ENCODING', '').strip().lower()
+        if encoding in ('', 'identity'):
+            return self.app(environ, start_response)
+
+        if encoding not in SUPPORTED_ENCODINGS:
+            return _json_error(start_response, '415 Unsupported Media Type',
+                               f"Unsupported Content-Encoding '{encoding}'")
+
+        try:
+            # Bounded by Content-Length (or the server), and by max_bytes
+            source = get_input_stream(environ, max_content_length=self.max_bytes)
+        except RequestEntityTooLarge:
+            return _json_error(start_response, '413 Request Entity Too Large', 'Request too large')
+
+        environ['wsgi.input'] = DecompressingStream(source, self.max_bytes)
+        # The inflated length isn't known up front; the stream ends itself
+        environ['wsgi.input_terminated'] = True
+        environ.pop('CONTENT_LENGTH', None)
+        environ.pop('HTTP_CONTENT_ENCODING', None)
+        return self.app(environ, start_response)
+
+
+def _json_error(start_response, status: str, message: str):
+    body = json.dumps({'success': False, 'error': message}).encode('utf-8')
+    start_response(status, [
+        ('Content-Type', 'application/json'),
+        ('Content-Length', str(len(body)))
+    ])
+    return [body]
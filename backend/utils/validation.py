@@ -1,14 +1,44 @@
 import base64
+import binascii
+import hashlib
 import re
+from typing import NamedTuple, Optional
 
-def validate_moodcheck_request(data):
+MAX_IMAGE_BYTES = 5 * 1024 * 1024  # 5MB
+
+# Base64 characters decoded per step; a multiple of 4 so chunks align to whole groups
+DECODE_CHUNK = 256 * 1024
+
+_WHITESPACE = re.compile(r'\s+')
+
+_MAGIC = (
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+)
+
+
+class DecodedImage(NamedTuple):
+    """A validated upload, decoded once and shared with later stages."""
+    data: bytes
+    sha256: str
+    media_type: str
+
+    def data_uri(self) -> str:
+        """The image as a data URI (what the vision model is sent)."""
+        return f"data:{self.media_type};base64," + base64.b64encode(self.data).decode('ascii')
+
+
+def validate_moodcheck_request(data, decoded=None):
     """
     Validate the moodcheck request data.
 
     Requires at least one of: images OR prompt (or both).
 
     Args:
-        data: Request JSON data
+        data: Request data; images are data URIs (JSON body) or file-like
+            objects (multipart upload)
+        decoded: Optional list to receive a DecodedImage per image (aligned
+            with data['images'] when the request is valid)
 
     Returns:
         tuple: (is_valid: bool, errors: list)
@@ -41,7 +71,8 @@ def validate_moodcheck_request(data):
             errors.append("Maximum 5 images allowed")
 
         for i, img in enumerate(images):
-            img_errors = validate_image(img, i + 1)
+            validator = validate_image_file if hasattr(img, 'read') else validate_image
+            img_errors = validator(img, i + 1, decoded)
             errors.extend(img_errors)
 
     # Validate prompt length
@@ -51,13 +82,19 @@ def validate_moodcheck_request(data):
     return len(errors) == 0, errors
 
 
-def validate_image(image_data, index):
+def validate_image(image_data, index, decoded=None):
     """
     Validate a single base64 image.
 
+    The size limit is checked before anything is decoded. The payload is
+    then decoded in chunks into one preallocated buffer (hashing as it goes)
+    and its magic bytes are checked against JPEG/PNG/WEBP.
+
     Args:
         image_data: Base64 encoded image string
         index: Image number (for error messages)
+        decoded: Optional list; a valid image's DecodedImage is appended so
+            later stages don't decode the payload again
 
     Returns:
         list: List of error messages (empty if valid)
@@ -80,31 +117,137 @@ def validate_image(image_data, index):
         errors.append(f"Image {index} must be JPEG, PNG, or WEBP format")
         return errors
 
-    # Extract base64 data
+    # Format is: data:image/jpeg;base64,/9j/4AAQ...
+    marker = image_data.find(';base64,')
+    if marker == -1:
+        errors.append(f"Image {index} must be base64 encoded")
+        return errors
+    start = marker + len(';base64,')
+
+    # Line-wrapped (MIME style) base64 is valid; drop the whitespace so the
+    # decode chunks stay aligned to whole groups
+    if _WHITESPACE.search(image_data, start):
+        image_data, start = _WHITESPACE.sub('', image_data[start:]), 0
+
+    # Check size from the encoded length (base64 is ~33% larger than binary)
+    size = decoded_size(image_data, start)
+    if size > MAX_IMAGE_BYTES:
+        errors.append(f"Image {index} exceeds 5MB limit")
+        return errors
+
     try:
-        # Format is: data:image/jpeg;base64,/9j/4AAQ...
-        if ';base64,' not in image_data:
-            errors.append(f"Image {index} must be base64 encoded")
-            return errors
+        image = decode_base64_payload(image_data, start, size)
+    except ValueError:
+        errors.append(f"Image {index} has invalid base64 encoding")
+        return errors
 
-        base64_data = image_data.split(';base64,')[1]
+    if sniff_image_type(image.data) is None:
+        errors.append(f"Image {index} must be JPEG, PNG, or WEBP format")
+        return errors
 
-        # Check size (base64 is ~33% larger than binary)
-        estimated_size = len(base64_data) * 0.75
-        max_size = 5 * 1024 * 1024  # 5MB
+    if decoded is not None:
+        decoded.append(image)
 
-        if estimated_size > max_size:
-            errors.append(f"Image {index} exceeds 5MB limit")
+    return errors
 
-        # Verify it's valid base64
-        base64.b64decode(base64_data)
 
-    except Exception as e:
-        errors.append(f"Image {index} has invalid base64 encoding")
+def validate_image_file(image_file, index, decoded=None):
+    """
+    Validate a single raw image upload (a multipart file part).
+
+    The size is checked from the spooled file before it is read, then the
+    magic bytes are checked against JPEG/PNG/WEBP.
+
+    Args:
+        image_file: Seekable file-like object with the image bytes
+        index: Image number (for error messages)
+        decoded: Optional list; a valid image's DecodedImage is appended
+
+    Returns:
+        list: List of error messages (empty if valid)
+    """
+    errors = []
+
+    try:
+        image_file.seek(0, 2)
+        size = image_file.tell()
+        image_file.seek(0)
+    except (AttributeError, OSError):
+        size = None
+    if size is not None and size > MAX_IMAGE_BYTES:
+        errors.append(f"Image {index} exceeds 5MB limit")
+        return errors
+
+    data = image_file.read(MAX_IMAGE_BYTES + 1)
+    if len(data) > MAX_IMAGE_BYTES:
+        errors.append(f"Image {index} exceeds 5MB limit")
+        return errors
+
+    media_type = sniff_image_type(data)
+    if media_type is None:
+        errors.append(f"Image {index} must be JPEG, PNG, or WEBP format")
+        return errors
+
+    if decoded is not None:
+        decoded.append(DecodedImage(data, hashlib.sha256(data).hexdigest(), media_type))
 
     return errors
 
 
+def decoded_size(image_data: str, start: int) -> int:
+    """Exact decoded length of a padded or unpadded base64 payload, without decoding it."""
+    length = len(image_data) - start
+    padding = 0
+    if length >= 2 and image_data.endswith('=='):
+        padding = 2
+    elif length and image_data.endswith('='):
+        padding = 1
+    return (length - padding) * 3 // 4
+
+
+def decode_base64_payload(image_data: str, start: int, size: int) -> DecodedImage:
+    """
+    Decode image_data[start:] chunk by chunk into a buffer of the given size.
+
+    The payload must not contain whitespace. Missing trailing padding is
+    restored on the last chunk.
+
+    Raises:
+        ValueError: If the payload isn't valid base64
+    """
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    digest = hashlib.sha256()
+    offset = 0
+    try:
+        for pos in range(start, len(image_data), DECODE_CHUNK):
+            text = image_data[pos:pos + DECODE_CHUNK]
+            if pos + DECODE_CHUNK >= len(image_data):
+                text += '=' * (-len(text) % 4)
+            chunk = base64.b64decode(text, validate=True)
+            view[offset:offset + len(chunk)] = chunk
+            digest.update(chunk)
+            offset += len(chunk)
+    except (binascii.Error, ValueError) as e:
+        raise ValueError(str(e)) from e
+
+    if offset != size:
+        raise ValueError('base64 payload is truncated')
+    data = bytes(buffer)
+    return DecodedImage(data, digest.hexdigest(), sniff_image_type(data) or '')
+
+
+def sniff_image_type(data) -> Optional[str]:
+    """Media type from the file's magic bytes (JPEG, PNG or WEBP), or None."""
+    head = bytes(data[:12])
+    for magic, media_type in _MAGIC:
+        if head.startswith(magic):
+            return media_type
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'image/webp'
+    return None
+
+
 def extract_image_data(image_uri):
     """
     Extract media type and base64 data from a data URI.
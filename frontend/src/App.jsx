@@ -42,7 +42,9 @@ function AppContent() {
       setResults({
         mood: data.vibe,
         trend: data.trend,
-        products: data.products
+        products: data.products,
+        sessionId: data.session_id,
+        seen: data.seen
       })
       // Pre-select item type filter if backend detected one
       if (data.detected_item_type) {
@@ -75,11 +77,12 @@ function AppContent() {
 
     setIsLoadingMore(true)
     try {
-      // Get IDs of existing products to exclude
-      const existingIds = results.products.map(p => p.id + (p.product_url || ''))
-
-      // Fetch new products
-      const newProducts = await getMoreProducts(results.mood, existingIds)
+      // Fetch new products (the session / seen token track what's been shown)
+      const { products: newProducts, sessionId, seen } = await getMoreProducts(results.mood, {
+        sessionId: results.sessionId,
+        seen: results.seen
+      })
+      setResults(prev => ({ ...prev, sessionId, seen }))
 
       if (newProducts && newProducts.length > 0) {
         // Append new products to existing ones
@@ -121,7 +124,7 @@ function AppContent() {
         : `${results.mood.name} from ${retailer}`
 
       const data = await getMoodcheck([], filterPrompt, { maxProducts: 50 })
-      setResults(prev => ({ ...prev, products: data.products }))
+      setResults(prev => ({ ...prev, products: data.products, sessionId: data.session_id, seen: data.seen }))
       setFiltersState(DEFAULT_FILTERS)
       setDisplayedCount(20)
     } catch (err) {
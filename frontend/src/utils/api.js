@@ -44,8 +44,12 @@ export async function getMoodcheck(images, prompt, options = {}) {
     return data
 }
 
-// Fetch more products for an existing vibe
-export async function getMoreProducts(vibeProfile, existingProductIds = []) {
+// Fetch more products for an existing vibe. With the moodcheck's session id
+// the next page comes from products the backend already fetched and scored;
+// the vibe profile is only sent when there is no (live) session, together
+// with the `seen` token so already shown products are skipped. The request
+// stays the same size however many pages have been loaded.
+export async function getMoreProducts(vibeProfile, { sessionId = null, seen = null } = {}) {
     const API_URL = import.meta.env.VITE_API_URL || 'http://localhost:5001'
 
     const response = await fetch(`${API_URL}/api/more-products`, {
@@ -54,12 +58,16 @@ export async function getMoreProducts(vibeProfile, existingProductIds = []) {
             'Content-Type': 'application/json',
         },
         body: JSON.stringify({
-            vibe_profile: vibeProfile,
-            exclude_ids: existingProductIds,
+            ...(sessionId ? { session_id: sessionId } : { vibe_profile: vibeProfile, seen }),
             max_products: 20
         })
     })
 
+    // Session expired: start over from the vibe profile
+    if (response.status === 410 && sessionId) {
+        return getMoreProducts(vibeProfile, { seen })
+    }
+
     if (!response.ok) {
         const error = await response.json().catch(() => ({}))
         throw new Error(error.error || 'Failed to load more products')
@@ -71,5 +79,5 @@ export async function getMoreProducts(vibeProfile, existingProductIds = []) {
         throw new Error(data.error || 'Failed to load more products')
     }
 
-    return data.products
+    return { products: data.products, sessionId: data.session_id, seen: data.seen }
 }